@@ -0,0 +1,275 @@
+import datetime
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import ClassVar, Iterator
+
+import numpy as np
+import pandas as pd
+
+DATETIME_DTYPE = np.dtype('M8[us]')
+
+
+def _column_dtype(value) -> np.dtype:
+    # the starting type of a user column is taken from its first value, and promoted by _promoted_dtype
+    if isinstance(value, (bool, np.bool_)):
+        return np.dtype(bool)
+    if isinstance(value, (int, np.integer)):
+        return np.dtype(np.int64)
+    if isinstance(value, (float, np.floating)):
+        return np.dtype(np.float64)
+    if isinstance(value, (datetime.datetime, np.datetime64)):
+        return DATETIME_DTYPE
+    return np.dtype(object)
+
+
+def _promoted_dtype(dtype: np.dtype, values: tuple) -> np.dtype:
+    """
+    :return: the type a user column of dtype needs to hold values as well. Numbers are promoted to the wider
+             number type, as numpy does (a float makes an integer column float64). Values that are not numbers,
+             such as None or strings, make the column an object column, so no value is truncated or converted.
+    """
+    if dtype == object:
+        return dtype
+    if dtype.kind == 'M':
+        if all(isinstance(value, (datetime.datetime, np.datetime64)) for value in values):
+            return dtype
+        return np.dtype(object)
+    batch = np.asarray(values)
+    if batch.ndim != 1 or batch.dtype.kind not in 'biuf':
+        return np.dtype(object)
+    return np.result_type(dtype, batch.dtype)
+
+
+def _rows(arrays: list[np.ndarray], start: int, stop: int) -> list[list]:
+    # tolist converts datetime64[us] to datetime and numbers to python types, as the old row lists held
+    columns = [array[start:stop].astype(DATETIME_DTYPE) if array.dtype.kind == 'M' else array[start:stop]
+               for array in arrays]
+    return [list(row) for row in zip(*(column.tolist() for column in columns))]
+
+
+def _import_parquet():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError('Writing the equity curve to parquet requires pyarrow. '
+                          'Install it with: pip install pyarrow') from e
+    return pa, pq
+
+
+@dataclass(repr=False)
+class EquityCurve:
+    """
+    Records the portfolio value of each bar in numpy columns: the quote datetime, the value, and one column
+    for each extra value passed to append. The type of an extra column is taken from its first value and
+    promoted when a later value does not fit: an integer column becomes float64 when a float is appended, and
+    any column becomes an object column when a value that is not of its kind, such as None, is appended.
+    Appended rows are kept in a list and moved to the columns PENDING_ROWS at a time, so an append is a list
+    append and the conversion to numpy is done for many rows at once. The columns are allocated ahead and
+    doubled when they are full.
+    With flush_rows, the rows are written to parquet files in folder every flush_rows rows and the
+    columns start again, so a long backtest does not keep its whole equity curve in memory.
+    The curve can be used like the list of [quote_datetime, value, *args] rows the portfolio used to keep:
+    it can be indexed, sliced and iterated, and passed to pd.DataFrame.
+    """
+
+    PENDING_ROWS: ClassVar[int] = 4096
+
+    column_names: list[str] = field(default=None)
+    """names of the extra columns. Extra columns without a name are called arg_0, arg_1, ..."""
+    capacity: int = field(default=1024)
+    flush_rows: int = field(default=0)
+    """write the rows to disk every flush_rows rows. 0 keeps every row in memory."""
+    folder: str | Path = field(default=None)
+    """folder for the flushed parquet files"""
+    _datetimes: np.ndarray = field(init=False, default=None)
+    _values: np.ndarray = field(init=False, default=None)
+    _columns: list[np.ndarray] = field(init=False, default=None)
+    _size: int = field(init=False, default=0)
+    _pending: list[tuple] = field(init=False, default_factory=list)
+    _width: int = field(init=False, default=None)
+    """number of extra values in each row, set by the first row"""
+    _parts: list[tuple[Path, int]] = field(init=False, default_factory=list)
+    _flushed_rows: int = field(init=False, default=0)
+    _part_cache: tuple[int, list[np.ndarray]] = field(init=False, default=None)
+    """the columns of the last flushed part that was read"""
+
+    def __post_init__(self):
+        if self.capacity < 1:
+            raise ValueError('Equity curve capacity must be at least 1.')
+        self.column_names = [] if self.column_names is None else list(self.column_names)
+        self.folder = None if self.folder is None else Path(self.folder)
+        if self.flush_rows:
+            if self.folder is None:
+                raise ValueError('A folder is required to flush the equity curve to disk.')
+            _import_parquet()
+            self.folder.mkdir(parents=True, exist_ok=True)
+            if any(self.folder.glob('part-*.parquet')):
+                raise ValueError(f'{self.folder} already holds an equity curve.')
+        self._allocate(self.capacity)
+
+    def __repr__(self) -> str:
+        return f'<EquityCurve rows={len(self)} columns={len(self.names)}>'
+
+    def __len__(self) -> int:
+        return self._flushed_rows + self._size + len(self._pending)
+
+    def __getitem__(self, index: int | slice) -> list:
+        """
+        :return: the row as [quote_datetime, value, *args], the same as the lists the portfolio used to keep.
+                 A slice returns a list of rows.
+        """
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('Equity curve index out of range.')
+        for part, (_, rows) in enumerate(self._parts):
+            if index < rows:
+                return _rows(self._part_columns(part), index, index + 1)[0]
+            index -= rows
+        self._commit()
+        return _rows(self._arrays(), index, index + 1)[0]
+
+    def __iter__(self) -> Iterator[list]:
+        for part, (_, rows) in enumerate(self._parts):
+            yield from _rows(self._part_columns(part), 0, rows)
+        self._commit()
+        yield from _rows(self._arrays(), 0, self._size)
+
+    @property
+    def datetimes(self) -> np.ndarray:
+        self._commit()
+        return self._datetimes
+
+    @property
+    def values(self) -> np.ndarray:
+        self._commit()
+        return self._values
+
+    @property
+    def columns(self) -> list[np.ndarray] | None:
+        self._commit()
+        return self._columns
+
+    @property
+    def names(self) -> list[str]:
+        width = self._width or 0
+        names = self.column_names[:width] + [f'arg_{i}' for i in range(len(self.column_names), width)]
+        return ['quote_datetime', 'value'] + names
+
+    def _arrays(self) -> list[np.ndarray]:
+        return [self._datetimes, self._values] + (self._columns or [])
+
+    def _part_columns(self, part: int) -> list[np.ndarray]:
+        # the last part read is kept, so reading its rows one by one reads the file once
+        if self._part_cache is None or self._part_cache[0] != part:
+            frame = pd.read_parquet(self._parts[part][0])
+            self._part_cache = part, [frame[name].to_numpy() for name in frame.columns]
+        return self._part_cache[1]
+
+    def _allocate(self, capacity: int) -> None:
+        # new arrays, so data frames exported earlier keep their rows
+        size = self._size
+        datetimes = np.empty(capacity, dtype=DATETIME_DTYPE)
+        values = np.empty(capacity, dtype=np.float64)
+        columns = None if self._columns is None else [np.empty(capacity, dtype=c.dtype) for c in self._columns]
+        if size:
+            datetimes[:size] = self._datetimes[:size]
+            values[:size] = self._values[:size]
+            for new, old in zip(columns, self._columns):
+                new[:size] = old[:size]
+        self._datetimes, self._values, self._columns = datetimes, values, columns
+
+    def append(self, quote_datetime: datetime.datetime, value: float, *args) -> None:
+        if self._width is None:
+            self._width = len(args)
+        elif len(args) != self._width:
+            raise ValueError(f'Expected {self._width} extra values, got {len(args)}.')
+        self._pending.append((quote_datetime, value) + args)
+        if self.flush_rows and self._size + len(self._pending) >= self.flush_rows:
+            self.flush()
+        elif len(self._pending) >= self.PENDING_ROWS:
+            self._commit()
+
+    def _commit(self) -> None:
+        """
+        Moves the pending rows to the columns.
+        """
+        pending = self._pending
+        if not pending:
+            return
+        if self._columns is None:
+            self._columns = [np.empty(len(self._values), dtype=_column_dtype(arg)) for arg in pending[0][2:]]
+        capacity = len(self._values)
+        while self._size + len(pending) > capacity:
+            capacity *= 2
+        if capacity > len(self._values):
+            self._allocate(capacity)
+        start, end = self._size, self._size + len(pending)
+        arrays = self._arrays()
+        for i, values in enumerate(zip(*pending)):
+            array = arrays[i]
+            if i >= 2:
+                dtype = _promoted_dtype(array.dtype, values)
+                if dtype != array.dtype:
+                    array = self._promote_column(i - 2, dtype)
+            if array.dtype == DATETIME_DTYPE:
+                # pandas converts datetimes about ten times faster than numpy
+                array[start:end] = pd.to_datetime(list(values)).to_numpy().astype(DATETIME_DTYPE)
+            elif array.dtype == object:
+                # one at a time, so a value that is itself a sequence is not spread over the rows
+                for i, value in enumerate(values, start):
+                    array[i] = value
+            else:
+                array[start:end] = values
+        self._size = end
+        pending.clear()
+
+    def _promote_column(self, column: int, dtype: np.dtype) -> np.ndarray:
+        old = self._columns[column]
+        new = np.empty(len(old), dtype=dtype)
+        new[:self._size] = old[:self._size]
+        self._columns[column] = new
+        return new
+
+    def _buffer_columns(self) -> dict[str, np.ndarray]:
+        self._commit()
+        return {name: array[:self._size] for name, array in zip(self.names, self._arrays())}
+
+    def flush(self) -> None:
+        """
+        Writes the rows in memory to a new parquet file in the folder and empties the columns.
+        """
+        self._commit()
+        if self._size == 0:
+            return
+        if self.folder is None:
+            raise ValueError('A folder is required to flush the equity curve to disk.')
+        pa, pq = _import_parquet()
+        path = self.folder.joinpath(f'part-{len(self._parts):05d}.parquet')
+        pq.write_table(pa.table(self._buffer_columns()), path)
+        self._parts.append((path, self._size))
+        self._flushed_rows += self._size
+        self._size = 0
+        self._allocate(len(self._values))
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        :return: data frame with a column for the quote datetime, the value and each extra value. When no rows
+                 were flushed, the data frame uses the recorder's arrays without copying them.
+        """
+        frame = pd.DataFrame(self._buffer_columns(), copy=False)
+        if not self._parts:
+            return frame
+        return pd.concat([pd.read_parquet(path) for path, _ in self._parts] + [frame], ignore_index=True)
+
+    def to_parquet(self, path: str | Path) -> None:
+        """
+        Writes the whole equity curve to one parquet file.
+        """
+        pa, pq = _import_parquet()
+        tables = [pq.read_table(part) for part, _ in self._parts] + [pa.table(self._buffer_columns())]
+        # a column promoted after a part was written has a wider type in the later parts
+        pq.write_table(pa.concat_tables(tables, promote_options='permissive'), path)
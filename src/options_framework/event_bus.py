@@ -0,0 +1,75 @@
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Iterator
+
+
+@dataclass(repr=False, slots=True)
+class EventBus:
+    """
+    Delivers the events the framework sends to itself on each bar. The handlers of an event are kept in a tuple
+    that is rebuilt when a handler subscribes or unsubscribes, so emitting an event is one dictionary lookup and
+    a loop over the tuple. Handlers are held with strong references and called in the order they subscribed.
+
+    emit delivers an event right away. post delivers it right away too, unless a batch is open: then the event
+    is queued and delivered, in order, when the outermost batch ends. The portfolio emits the events that keep
+    its cash and positions in sync, and posts the events meant for other listeners, so those listeners see
+    the portfolio after the bar has been processed.
+    """
+
+    _handlers: dict[str, tuple[Callable, ...]] = field(init=False, default_factory=dict)
+    _queue: list[tuple[str, tuple]] = field(init=False, default_factory=list)
+    _batch_depth: int = field(init=False, default=0)
+
+    def __repr__(self) -> str:
+        return f'<EventBus events={sorted(self._handlers)} queued={len(self._queue)}>'
+
+    def subscribe(self, event: str, handler: Callable) -> None:
+        handlers = self._handlers.get(event, ())
+        if handler not in handlers:
+            self._handlers[event] = handlers + (handler,)
+
+    def unsubscribe(self, event: str, handler: Callable) -> None:
+        handlers = tuple(h for h in self._handlers.get(event, ()) if h != handler)
+        if handlers:
+            self._handlers[event] = handlers
+        else:
+            self._handlers.pop(event, None)
+
+    def handlers(self, event: str) -> tuple[Callable, ...]:
+        return self._handlers.get(event, ())
+
+    def emit(self, event: str, *args) -> None:
+        for handler in self._handlers.get(event, ()):
+            handler(*args)
+
+    def post(self, event: str, *args) -> None:
+        if self._batch_depth:
+            self._queue.append((event, args))
+        else:
+            self.emit(event, *args)
+
+    @contextmanager
+    def batch(self) -> Iterator['EventBus']:
+        """
+        Queues the posted events until the outermost batch ends. The queued events are delivered even when
+        the batch ends with an exception, so listeners do not miss a position that was closed before it.
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self.flush()
+
+    def flush(self) -> None:
+        # a handler that raises leaves the events behind it in the queue for the next flush
+        queue = self._queue
+        i = 0
+        try:
+            while i < len(queue):
+                event, args = queue[i]
+                i += 1
+                self.emit(event, *args)
+        finally:
+            del queue[:i]
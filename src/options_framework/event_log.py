@@ -0,0 +1,139 @@
+import atexit
+import datetime
+import json
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from options_framework.config import settings
+
+DEBUG, INFO, WARNING, OFF = 10, 20, 30, 100
+LEVELS = {'debug': DEBUG, 'info': INFO, 'warning': WARNING, 'off': OFF}
+LEVEL_NAMES = {DEBUG: 'debug', INFO: 'info', WARNING: 'warning'}
+
+
+def _json_default(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return str(value)
+
+
+@dataclass(repr=False)
+class MemorySink:
+    """Keeps the last "capacity" records in memory"""
+
+    capacity: int = field(default=10_000)
+    records: deque = field(init=False, default=None)
+
+    def __post_init__(self):
+        self.records = deque(maxlen=self.capacity)
+
+    def __repr__(self) -> str:
+        return f'<MemorySink records={len(self.records)}/{self.capacity}>'
+
+    def write(self, record: dict) -> None:
+        self.records.append(record)
+
+    def flush(self) -> None:
+        pass
+
+
+@dataclass(repr=False)
+class JsonlSink:
+    """
+    Appends records to a JSON lines file. Records are buffered in memory and written "buffer_size" at a time,
+    so a backtest does not wait on the file for each event.
+    """
+
+    path: str | Path
+    buffer_size: int = field(default=1000)
+    _buffer: list = field(init=False, default_factory=list)
+    _lock: threading.Lock = field(init=False, default_factory=threading.Lock)
+
+    def __post_init__(self):
+        self.path = Path(self.path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def __repr__(self) -> str:
+        return f'<JsonlSink {self.path} buffered={len(self._buffer)}>'
+
+    def write(self, record: dict) -> None:
+        self._buffer.append(record)
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            records, self._buffer = self._buffer, []
+            if not records:
+                return
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(''.join(json.dumps(r, default=_json_default) + '\n' for r in records))
+
+
+@dataclass(repr=False)
+class EventLog:
+    """
+    A structured log of portfolio events. Each event is a dictionary with the level, the event name and its
+    fields. Events below the log level are dropped before a record is built, so a disabled log only costs a
+    method call.
+    """
+
+    level: int = field(default=WARNING)
+    sinks: list = field(default_factory=list)
+
+    def __repr__(self) -> str:
+        return f'<EventLog level={LEVEL_NAMES.get(self.level, "off")} sinks={self.sinks}>'
+
+    def is_enabled(self, level: int) -> bool:
+        return level >= self.level
+
+    def log(self, level: int, event: str, **fields) -> None:
+        if level >= self.level:
+            self._write(level, event, fields)
+
+    def debug(self, event: str, **fields) -> None:
+        if DEBUG >= self.level:
+            self._write(DEBUG, event, fields)
+
+    def info(self, event: str, **fields) -> None:
+        if INFO >= self.level:
+            self._write(INFO, event, fields)
+
+    def warning(self, event: str, **fields) -> None:
+        if WARNING >= self.level:
+            self._write(WARNING, event, fields)
+
+    def _write(self, level: int, event: str, fields: dict) -> None:
+        record = {'level': LEVEL_NAMES[level], 'event': event}
+        record.update(fields)
+        for sink in self.sinks:
+            sink.write(record)
+
+    def flush(self) -> None:
+        for sink in self.sinks:
+            sink.flush()
+
+
+_event_log: EventLog | None = None
+
+
+def get_event_log() -> EventLog:
+    """
+    The event log shared by the process, created from the settings the first time it is used:
+    "event_log_level" is debug, info, warning (default) or off. Events go to a JSON lines file when
+    "event_log_file" is set, and otherwise to a memory sink holding the last "event_log_capacity" events.
+    """
+    global _event_log
+    if _event_log is None:
+        level_name = settings.get('event_log_level', 'warning')
+        if level_name not in LEVELS:
+            raise ValueError(f'Unknown event_log_level "{level_name}". Must be one of {", ".join(LEVELS)}.')
+        if settings.get('event_log_file'):
+            sink = JsonlSink(settings['event_log_file'], buffer_size=settings.get('event_log_buffer', 1000))
+        else:
+            sink = MemorySink(capacity=settings.get('event_log_capacity', 10_000))
+        _event_log = EventLog(level=LEVELS[level_name], sinks=[sink])
+        atexit.register(_event_log.flush)
+    return _event_log
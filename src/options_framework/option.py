@@ -1,34 +1,66 @@
+import itertools
 from collections import namedtuple
-from dataclasses import dataclass, field
+from collections.abc import Mapping
+from dataclasses import dataclass, field, InitVar
 from decimal import Decimal
 from typing import Optional
 import datetime
 import numbers
+import sys
 
 import pandas as pd
 import numpy as np
 from options_framework.option_types import OptionPositionType, OptionStatus
-from options_framework.utils.helpers import decimalize_0, decimalize_2, decimalize_4
+from options_framework.utils.helpers import cents, decimalize_0, decimalize_2, decimalize_4, whole
 from options_framework.config import settings
+from options_framework.event_bus import EventBus
 
 from pydispatch import Dispatcher
 
 TradeOpenInfo = namedtuple("TradeOpen", "option_id instance_id date quantity price premium fees spot_price")
 TradeCloseInfo = namedtuple("TradeClose", "option_id instance_id date quantity price premium profit_loss profit_loss_percent fees spot_price")
+Contract = namedtuple("Contract", "option_id symbol strike expiration option_type")
 
+CONTRACT_CACHE_SIZE = 100_000
+_contracts: dict[str | int, Contract] = {}
 
-@dataclass(repr=False, kw_only=True, slots=True)
-class Option(Dispatcher):
+
+def intern_contract(row: Mapping) -> Contract:
+    """
+    :param row: an option chain row
+    :return: the contract of the row. There is one contract for each option_id, so the options created for
+             the same contract on different bars share their id, symbol, strike and expiration objects.
+             The cache is emptied when it holds CONTRACT_CACHE_SIZE contracts.
+    """
+    contract = _contracts.get(row['option_id'])
+    if contract is None:
+        if len(_contracts) >= CONTRACT_CACHE_SIZE:
+            _contracts.clear()
+        option_id, symbol, option_type = row['option_id'], row['symbol'], row['option_type']
+        contract = Contract(option_id=sys.intern(option_id) if type(option_id) is str else option_id,
+                            symbol=sys.intern(symbol), strike=row['strike'], expiration=row['expiration'],
+                            option_type=sys.intern(option_type))
+        _contracts[contract.option_id] = contract
+    return contract
+
+
+class OptionEvents(Dispatcher):
+    """
+    The pydispatch events of an option. An option only creates one when something binds to it.
+    """
+    _events_ = ["open_transaction_completed", "close_transaction_completed", "option_expired", "fees_incurred"]
+
+
+@dataclass(repr=False, kw_only=True, slots=True, weakref_slot=True)
+class Option:
     """
     The Option class holds all the values that pertain to a single option. The option can have just basic option information
     without any price or other current values. These values are id, symbol, strike, expiration and option type.
     Quote information can be set when the option is created and also using the update method.
     The trade_open and trade_close methods are used to capture open/close price and dates.
+    Listeners bound with bind receive the events of OptionEvents.
     """
 
-    _events_ = ["open_transaction_completed", "close_transaction_completed", "option_expired", "fees_incurred"]
-
-
     # immutable fields
     option_id: str | int = field(compare=True)
     """The unique identifier of the option contract"""
@@ -96,9 +128,47 @@ class Option(Dispatcher):
     user_defined: dict = field(default_factory=lambda: {}, compare=False)
     incur_fees: bool = field(default=True, compare=False)
     fee_per_contract: float = field(default=0.65, compare=False)
+    cents_arithmetic: bool = field(init=False, default=True, compare=False)
+    """Values and fees are calculated with integer cents instead of Decimal. Set by the "numeric_mode" setting."""
+    event_bus: Optional[EventBus] = field(init=False, default=None, compare=False)
+    """The bus of the portfolio that holds the option. Events are sent to it directly, without pydispatch."""
+    _dispatcher: Optional[OptionEvents] = field(init=False, default=None, compare=False)
+    """Created by the first bind, so options that nothing listens to do not create pydispatch events"""
+    _state_before_open: tuple | None = field(init=False, default=None, compare=False)
+    """status, quantity, position type, total fees and user defined values before open_trade, for cancel_trade"""
+    validate: InitVar[bool] = True
+    """False skips the checks of the required fields, for rows that come from the option chain"""
+
+    @classmethod
+    def from_row(cls, row: Mapping) -> 'Option':
+        """
+        Creates an option from a row of the option chain (option_chain.options or Timeslot.get_row)
+        without checking the required fields, which the chain always has. The id, symbol, strike, expiration
+        and option type come from the interned contract of the row.
+        :param row: the option chain row
+        :return: the option
+        """
+        contract = intern_contract(row)
+        return cls(option_id=contract.option_id, symbol=contract.symbol, strike=contract.strike,
+                   expiration=contract.expiration, option_type=contract.option_type,
+                   quote_datetime=row['quote_datetime'], spot_price=row['spot_price'], bid=row['bid'],
+                   ask=row['ask'], price=row['price'], delta=row.get('delta'), gamma=row.get('gamma'),
+                   theta=row.get('theta'), vega=row.get('vega'), rho=row.get('rho'),
+                   open_interest=row.get('open_interest'), volume=row.get('volume'),
+                   implied_volatility=row.get('implied_volatility'), validate=False)
+
+    def __post_init__(self, validate: bool):
+        if validate:
+            self._check_required_fields()
+        self.price = round(self.price, 2)
+        self.incur_fees = settings.get('incur_fees', True)
+        self.fee_per_contract = settings.get('standard_fee', 0.65)
+        numeric_mode = settings.get('numeric_mode', 'cents')
+        if numeric_mode not in ('cents', 'decimal'):
+            raise ValueError(f'Unknown numeric_mode "{numeric_mode}". Must be "cents" or "decimal".')
+        self.cents_arithmetic = numeric_mode == 'cents'
 
-    def __post_init__(self):
-        # check for required fields
+    def _check_required_fields(self):
         if self.option_id is None:
             raise ValueError("option_id cannot be None")
         if self.symbol is None:
@@ -121,9 +191,6 @@ class Option(Dispatcher):
             raise ValueError("ask cannot be None")
         if self.price is None:
             raise ValueError("price cannot be None")
-        self.price = round(self.price, 2)
-        self.incur_fees = settings.get('incur_fees', True)
-        self.fee_per_contract = settings.get('standard_fee', 0.65)
 
         # make sure the quote date is not past the expiration date
         if self.quote_datetime.date() > self.expiration:
@@ -135,12 +202,41 @@ class Option(Dispatcher):
         return f'<{self.option_type.upper()}({self.option_id}) {self.symbol} {self.strike} ' \
             + f'{datetime.datetime.strftime(self.expiration, "%Y-%m-%d")}{long_short}>'
 
+    def bind(self, **kwargs):
+        if self._dispatcher is None:
+            self._dispatcher = OptionEvents()
+        self._dispatcher.bind(**kwargs)
+
+    def unbind(self, *args):
+        if self._dispatcher is not None:
+            self._dispatcher.unbind(*args)
+
+    def emit(self, event: str, *args, **kwargs):
+        if self._dispatcher is not None:
+            self._dispatcher.emit(event, *args, **kwargs)
+
+    def _notify(self, event: str, *args) -> None:
+        # pydispatch is only called when something was bound to the option
+        if self.event_bus is not None:
+            self.event_bus.emit(event, *args)
+        if self._dispatcher is not None:
+            self._dispatcher.emit(event, *args)
+
     def _incur_fees(self, *, quantity: int | Decimal) -> float:
         """
         Calculates fees for a transaction and adds to the total fees
         :return: fees that were added to the option
         :rtype: float
         """
+        if self.cents_arithmetic:
+            fees = cents(self.fee_per_contract) * abs(whole(quantity))
+            total_fees = cents(self.total_fees) + fees
+            # a zero result falls through to Decimal, which keeps the sign of a negative zero
+            if fees and total_fees:
+                self.total_fees = total_fees / 100
+                fees = fees / 100
+                self._notify("fees_incurred", fees)
+                return fees
         fee = decimalize_2(self.fee_per_contract)
         qty = decimalize_0(quantity)
         fees = fee * abs(qty)
@@ -148,7 +244,7 @@ class Option(Dispatcher):
         self.total_fees = float(total_fees)
         fees = float(fees)
 
-        self.emit("fees_incurred", fees)
+        self._notify("fees_incurred", fees)
         #print(f'emit fees {self.option_id}')
 
         return fees
@@ -168,7 +264,7 @@ class Option(Dispatcher):
         expiration_date, exp_time = self.expiration, datetime.time(16, 00)
         if ((quote_date > expiration_date) or (quote_date == expiration_date and quote_time >= exp_time)):
             self.status |= OptionStatus.EXPIRED
-            self.emit("option_expired", self.instance_id)
+            self._notify("option_expired", self.instance_id)
             #print(f'emit expire {self.option_id}')
             return True
         return False
@@ -182,7 +278,14 @@ class Option(Dispatcher):
         if self.is_expired():
             self.close_trade(quantity=self.quantity)
             return
+        self.update_quote(updates)
 
+    def update_quote(self, updates: dict):
+        """
+        Sets the quote fields from a chain row without checking for expiration. Used when the caller settles
+        expirations, as the portfolio does from its expiration calendar.
+        """
+        self.quote_datetime = updates['quote_datetime']
         self.spot_price = updates['spot_price']
         self.bid = float(decimalize_2(updates['bid']))
         self.ask = float(decimalize_2(updates['ask']))
@@ -233,6 +336,8 @@ class Option(Dispatcher):
         price = float(price)
         quantity = int(quantity)
 
+        self._state_before_open = (self.status, self.quantity, self.position_type, self.total_fees,
+                                   dict(self.user_defined))
         for key, value in kwargs.items():
             self.user_defined[key] = value
 
@@ -252,11 +357,23 @@ class Option(Dispatcher):
         self.quantity = quantity
         self.status = OptionStatus.TRADE_IS_OPEN
 
-        self.emit("open_transaction_completed", trade_open_info)
+        self._notify("open_transaction_completed", trade_open_info)
         #print(f'emit open {self.option_id}')
 
         return trade_open_info
 
+    def cancel_trade(self) -> None:
+        """
+        Undoes open_trade, for a trade that was opened but not accepted, such as a position the portfolio rejected.
+        The status, quantity, position type, total fees and user defined values are set back to what they were
+        before open_trade. Events already sent for the open are not taken back.
+        """
+        if OptionStatus.TRADE_IS_OPEN not in self.status or self.trade_close_records:
+            raise ValueError(f"Cannot cancel a trade that is not open or has been partly closed. ({self.symbol})")
+        self.status, self.quantity, self.position_type, self.total_fees, self.user_defined = self._state_before_open
+        self._state_before_open = None
+        self.trade_open_info = None
+
     def close_trade(self, *, quantity: int | None = None, **kwargs: dict) -> TradeCloseInfo:
         """
         Calculates the closing price and sets the close date, price and profit/loss info for the
@@ -329,7 +446,7 @@ class Option(Dispatcher):
             self.status |= OptionStatus.TRADE_PARTIALLY_CLOSED
 
         self._calculate_trade_close_info()
-        self.emit("close_transaction_completed", trade_close_record)
+        self._notify("close_transaction_completed", trade_close_record)
         #print(f'emit close {self.option_id}')
 
         return trade_close_record
@@ -434,6 +551,10 @@ class Option(Dispatcher):
 
     @property
     def current_value(self) -> float:
+        if self.cents_arithmetic:
+            current_value = cents(self.price) * whole(self.quantity)
+            if current_value:
+                return float(current_value)
         current_price = decimalize_2(self.price)
         quantity = decimalize_0(self.quantity)
         current_value = current_price * 100 * quantity
@@ -442,8 +563,12 @@ class Option(Dispatcher):
     @property
     def trade_value(self) -> float:
         price = self.trade_price
-        trade_price = decimalize_2(price)
         quantity = self.quantity if self.status == OptionStatus.INITIALIZED else self.trade_open_info.quantity
+        if self.cents_arithmetic:
+            trade_value = cents(price) * whole(quantity)
+            if trade_value:
+                return float(trade_value)
+        trade_price = decimalize_2(price)
         quantity = decimalize_0(quantity)
         trade_value = trade_price * 100 * quantity
         return float(trade_value)
@@ -466,6 +591,10 @@ class Option(Dispatcher):
         if OptionStatus.TRADE_IS_OPEN not in self.status and OptionStatus.TRADE_IS_CLOSED not in self.status:
             raise Exception("This option has no transactions.")
 
+        if self.cents_arithmetic:
+            current_value = (cents(self.price) - cents(self.trade_open_info.price)) * whole(self.quantity)
+            if current_value:
+                return float(current_value)
         trade_price = decimalize_2(self.trade_open_info.price)
         current_price = decimalize_2(self.price)
         open_quantity = decimalize_0(self.quantity)
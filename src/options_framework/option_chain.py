@@ -1,8 +1,8 @@
 import datetime
 import os
-import dill as pickle
-import glob
+from collections.abc import Mapping
 
+import numpy as np
 import pandas as pd
 from pandas import DataFrame, Series
 from dataclasses import dataclass, field
@@ -12,10 +12,18 @@ from pydispatch import Dispatcher
 from pathlib import Path
 
 from options_framework.option import Option
+from options_framework.event_bus import EventBus
+from options_framework.option_types import OptionStatus, SelectFilter
+from options_framework.position_book import PositionBook
 from options_framework.utils.helpers import distinct
 from typing import Optional
 from options_framework.config import settings
 from options_framework.utils.helpers import decimalize_0, decimalize_2, decimalize_4
+from options_framework.storage.contract_store import ContractSeriesStore
+from options_framework.storage.prefetcher import TimeslotPrefetcher
+from options_framework.storage.timeslot import Timeslot, records_to_columns
+from options_framework.storage.timeslot_cache import TimeslotCache, get_timeslot_cache
+from options_framework.storage.timeslot_store import TimeslotStore, get_timeslot_store
 
 @dataclass
 class OptionChain():
@@ -23,105 +31,250 @@ class OptionChain():
     symbol: str
     quote_datetime: datetime.datetime
     end_datetime: datetime.datetime
+    lazy_loading: bool = field(default=None)
+    select_filter: SelectFilter = field(default=None)
+    event_bus: EventBus = field(default=None, repr=False)
+    """the chain emits quotes_changed on the bus with the held options whose quotes it changed"""
+    settle_expirations: bool = field(default=True)
+    """close held options that have expired. The portfolio settles expirations itself and turns this off."""
     timeslots_folder: Path = field(init=False, default=None, repr=False)
     datetimes: list = field(init=False, default_factory=lambda: [], repr=False)
-    expirations: list = field(init=False, default_factory=lambda: [], repr=False)
-    options: list = field(init=False, default_factory=lambda: [], repr=False)
-    expiration_strikes: dict = field(init=False, default_factory=lambda: {}, repr=False)
+    timeslot_store: TimeslotStore = field(init=False, default=None, repr=False)
+    contract_store: ContractSeriesStore = field(init=False, default=None, repr=False)
+    prefetcher: TimeslotPrefetcher = field(init=False, default=None, repr=False)
+    timeslot_cache: TimeslotCache = field(init=False, default=None, repr=False)
+    position_book: PositionBook = field(init=False, default=None, repr=False)
+    _timeslot: Timeslot = field(init=False, default=None, repr=False)
+    _pending_datetime: datetime.datetime = field(init=False, default=None, repr=False)
+    _datetime_positions: dict = field(init=False, default_factory=lambda: {}, repr=False)
+    _cursor: int = field(init=False, default=0, repr=False)
 
     def __post_init__(self):
-        self.timeslots_folder = options_folder = Path(settings['options_directory'], settings['data_frequency'], self.symbol, 'timeslots')
+        self.lazy_loading = settings.get('lazy_chain_loading', False) if self.lazy_loading is None \
+            else self.lazy_loading
+        self.timeslot_store = get_timeslot_store(self.symbol)
+        self.timeslots_folder = self.timeslot_store.folder
+        self.timeslot_cache = get_timeslot_cache()
+        if settings.get('contract_series', False):
+            self.contract_store = ContractSeriesStore(self.symbol)
         self.datetimes = datetimes = self.get_datetimes_in_date_range()
+        self._datetime_positions = {d: i for i, d in enumerate(datetimes)}
+        if settings.get('prefetch_enabled', False):
+            self.prefetcher = TimeslotPrefetcher(self._read_timeslot,
+                                                 depth=settings.get('prefetch_depth', 2),
+                                                 decode=not self.lazy_loading)
 
     def on_next(self, quote_datetime: datetime.datetime):
-        # find quote datetime in datetimes list
+        # find quote datetime in datetimes list. Datetimes before the cursor have already been used.
         self.quote_datetime = quote_datetime
         #print(f'next {self.symbol} {quote_datetime}')
-        try:
-            dt = next(d for d in self.datetimes if d == quote_datetime)
-        except StopIteration:
+        position = self._datetime_positions.get(quote_datetime)
+        self._timeslot, self._pending_datetime = None, None
+        if position is None or position < self._cursor:
             # There are no matching timeslots for the quote given
-            self.options = []
-            self.expirations = []
-            self.expiration_strikes = {}
             return
 
-        options = self.load_timeslot(quote_datetime=quote_datetime)
-        if options is None:
-            return # no options for this time slot
+        # advance past this timeslot, but keep the last one available
+        if len(self.datetimes) - self._cursor > 1:
+            self._cursor = position + 1
 
-        idx_quote = self.datetimes.index(quote_datetime)
-        if len(self.datetimes) > 1:
-            self.datetimes = self.datetimes[idx_quote + 1:]
-        self.options = options
+        if self.lazy_loading:
+            # the timeslot is loaded the first time the chain or a held option needs it
+            self._pending_datetime = quote_datetime
+        else:
+            self._timeslot = self.load_timeslot(quote_datetime=quote_datetime)
+        if self.prefetcher is not None:
+            # in lazy mode the current timeslot has not been used yet, so it stays in the prefetch queue
+            start = position if self.lazy_loading else position + 1
+            self.prefetcher.prefetch(self.datetimes[start:start + self.prefetcher.depth])
 
-        expirations = [x['expiration'] for x in options]
-        expirations = list(set(expirations))
-        expirations.sort()
-        self.expirations = expirations
-        expiration_strikes = [(x['expiration'], x['strike']) for x in options]
-        expiration_strikes = list(set(expiration_strikes))
-        expiration_strikes = sorted(expiration_strikes,key=lambda x: (x[0], x[1]))
-        expiration_strikes = {exp: [s for (e, s) in expiration_strikes if e == exp] for exp in expirations}
-        self.expiration_strikes = expiration_strikes
+    @property
+    def timeslot(self) -> Timeslot | None:
+        if self._pending_datetime is not None:
+            self._timeslot = self.load_timeslot(quote_datetime=self._pending_datetime)
+            self._pending_datetime = None
+        return self._timeslot
 
+    @property
+    def options(self) -> list[dict]:
+        timeslot = self.timeslot
+        if timeslot is None:
+            return []
+        return timeslot.records
 
-    def load_timeslot(self, quote_datetime: datetime.datetime) -> list[Option]:
-        ym_str = datetime.datetime.strftime(quote_datetime, '%Y_%m')
-        folder = self.timeslots_folder.joinpath(ym_str)
-        dt_str = datetime.datetime.strftime(quote_datetime, '%Y_%m_%d_%H_%M')
-        find_timeslot = folder.glob(f'{dt_str}.pkl')
-        try:
-            ts_file = next(find_timeslot)
-        except StopIteration:
-            raise ValueError(f'Cannot find option chain for {self.symbol} on {quote_datetime}.')
+    @property
+    def expirations(self) -> list[datetime.date]:
+        # the chain index is only built if the chain is queried for this timeslot
+        timeslot = self.timeslot
+        if timeslot is None:
+            return []
+        return timeslot.chain_index.expiration_list
 
-        with open(ts_file, 'rb') as f:
-            options_data = pickle.load(f)
-        return options_data
+    @property
+    def expiration_strikes(self) -> dict[datetime.date, list[float]]:
+        timeslot = self.timeslot
+        if timeslot is None:
+            return {}
+        return timeslot.chain_index.expiration_strikes
 
+    # The spread factories select their options with these queries. They are binary searches over the
+    # sorted expirations, strikes and deltas of the timeslot indexes, so the options of the chain are not scanned.
+    def nearest_expiration(self, expiration: datetime.date) -> datetime.date | None:
+        """
+        :return: the first expiration on or after the date, or None if there is none
+        """
+        timeslot = self.timeslot
+        return None if timeslot is None else timeslot.chain_index.nearest_expiration(expiration)
 
-    def get_folder_as_date(self, folder):
-        return folder, datetime.datetime.strptime(folder.name, '%Y_%m').date()
+    def strike_at_or_above(self, expiration: datetime.date, strike: float) -> float | None:
+        timeslot = self.timeslot
+        return None if timeslot is None else timeslot.chain_index.strike_at_or_above(expiration, strike)
 
+    def strike_at_or_below(self, expiration: datetime.date, strike: float) -> float | None:
+        timeslot = self.timeslot
+        return None if timeslot is None else timeslot.chain_index.strike_at_or_below(expiration, strike)
 
-    def get_datetimes_in_date_range(self):
-        folders_list = self.timeslots_folder.glob('*')
+    def row(self, expiration: datetime.date, strike: float, option_type: str) -> dict | None:
+        """
+        :return: the option dictionary with the exact expiration, strike and option type, or None
+        """
+        timeslot = self.timeslot
+        if timeslot is None:
+            return None
+        for i in timeslot.chain_index.strike_rows(expiration, strike).tolist():
+            row = timeslot.get_row(i)
+            if row['option_type'] == option_type:
+                return row
+        return None
 
-        start_folder = datetime.date(self.quote_datetime.year, self.quote_datetime.month, 1)
-        end_folder = datetime.date(self.end_datetime.year, self.end_datetime.month, 1)
-        end = self.end_datetime + datetime.timedelta(days=1) # Need to add a day so we can capture all the times from that day.
+    def row_at_or_below_delta(self, expiration: datetime.date, option_type: str, delta: float) -> dict | None:
+        """
+        :return: the option dictionary of the expiration and option type with the highest delta at or below
+                 the delta, or None
+        """
+        timeslot = self.timeslot
+        if timeslot is None:
+            return None
+        i = int(timeslot.delta_index(expiration, option_type).rows_at_or_below(delta))
+        return None if i < 0 else timeslot.get_row(i)
 
-        datetimes = []
-        while True:
-            try:
-                fol, folder_dt = self.get_folder_as_date(next(folders_list))
+    def row_at_or_above_delta(self, expiration: datetime.date, option_type: str, delta: float) -> dict | None:
+        """
+        :return: the option dictionary of the expiration and option type with the lowest delta at or above
+                 the delta, or None
+        """
+        timeslot = self.timeslot
+        if timeslot is None:
+            return None
+        i = int(timeslot.delta_index(expiration, option_type).rows_at_or_above(delta))
+        return None if i < 0 else timeslot.get_row(i)
 
-                if folder_dt >= start_folder:
-                    if folder_dt <= end_folder:
-                        fol_dts = [datetime.datetime.strptime(f.stem, '%Y_%m_%d_%H_%M') for f in fol.iterdir()]
-                        datetimes.extend(fol_dts)
-                    else:
-                        break
-            except StopIteration:
-                break
+    def load_timeslot(self, quote_datetime: datetime.datetime) -> Timeslot:
+        if self.prefetcher is not None:
+            return self.prefetcher.get(quote_datetime)
+        return self._read_timeslot(quote_datetime)
 
-        datetimes.sort()
-        datetimes = [x for x in datetimes if x >= self.quote_datetime and x <= self.end_datetime]
-        return datetimes
+    def _read_timeslot(self, quote_datetime: datetime.datetime) -> Timeslot:
+        if self.select_filter is not None:
+            # filtered timeslots are not shared through the cache, other chains may use different filters
+            return self._decode(self.timeslot_store.load_filtered(quote_datetime, self.select_filter))
+        if self.timeslot_cache is None:
+            return self._decode(self.timeslot_store.load_timeslot(quote_datetime))
+        store = self.timeslot_store
+        timeslot = self.timeslot_cache.get(store, quote_datetime)
+        if timeslot is None:
+            # the records are built before the timeslot is added, so the cache measures them
+            timeslot = self._decode(store.load_timeslot(quote_datetime))
+            self.timeslot_cache.put(store, timeslot)
+        return self._decode(timeslot)
 
+    def _load_unfiltered_timeslot(self, quote_datetime: datetime.datetime) -> Timeslot:
+        # the store is only used from the prefetch worker while there is one
+        if self.prefetcher is not None:
+            return self.prefetcher.run(self.timeslot_store.load_timeslot, quote_datetime)
+        return self.timeslot_store.load_timeslot(quote_datetime)
 
-    def on_next_options(self, options: list[Option]) -> list[dict] | None:
-        for option in options:
-            try:
-                if option.expiration < self.quote_datetime.date():
-                    option.next({'option_id': option.option_id, 'quote_datetime': self.quote_datetime})
-                else:
-                    option_quote = next(q for q in self.options if q['option_id'] == option.option_id)
-                    option.next(option_quote)
-            except StopIteration:
-                continue
+    def _decode(self, timeslot: Timeslot | None) -> Timeslot | None:
+        # without lazy loading, the records are built when the timeslot is loaded rather than when first read
+        if timeslot is not None and not self.lazy_loading:
+            timeslot.build_records()
+        return timeslot
+
+    def close(self) -> None:
+        """
+        Stops background prefetching. This is called when the portfolio stops sending events to the chain.
+        """
+        if self.prefetcher is not None:
+            self.prefetcher.close()
+
+    def get_datetimes_in_date_range(self):
+        return self.timeslot_store.get_datetimes(self.quote_datetime, self.end_datetime)
 
 
+    def on_next_options(self, options: list[Option]) -> list[dict] | None:
+        quote_date = self.quote_datetime.date()
+        if self.settle_expirations:
+            open_option_ids = [option.option_id for option in options if option.expiration >= quote_date]
+        else:
+            # the quotes of expired options are not in the timeslot, so they do not need to be left out
+            open_option_ids = [option.option_id for option in options]
+        if settings.get('vectorised_updates', True):
+            if self.position_book is None or not self.position_book.holds(options):
+                self.position_book = PositionBook(options)
+            changed = self.position_book.update(self.quote_datetime, self._get_option_columns(open_option_ids),
+                                                self.settle_expirations)
+        elif self.settle_expirations:
+            option_quotes = self._get_option_quotes(open_option_ids) if open_option_ids else {}
+            changed = []
+            for option in options:
+                if option.expiration < quote_date:
+                    option.next({'option_id': option.option_id, 'quote_datetime': self.quote_datetime})
+                    changed.append(option)
+                elif option.option_id in option_quotes:
+                    option.next(option_quotes[option.option_id])
+                    changed.append(option)
+        else:
+            option_quotes = self._get_option_quotes(open_option_ids) if open_option_ids else {}
+            changed = [option for option in options if option.option_id in option_quotes
+                       and OptionStatus.EXPIRED not in option.status]
+            for option in changed:
+                option.update_quote(option_quotes[option.option_id])
+        if changed and self.event_bus is not None:
+            self.event_bus.emit('quotes_changed', changed)
 
+    def _get_option_quotes(self, option_ids: list[str]) -> dict[str, dict]:
+        # only the quotes of the held options are read, not the whole chain
+        if self._timeslot is None and self._pending_datetime is None:
+            return {}
+        if self.contract_store is not None and self._timeslot is None:
+            option_quotes = self.contract_store.get_records(self.quote_datetime, option_ids)
+            if option_quotes is not None:
+                return option_quotes
+        option_quotes = self.timeslot.get_records(option_ids)
+        if self.select_filter is not None and len(option_quotes) < len(option_ids):
+            # held options can move outside the filtered part of the chain
+            missing = [option_id for option_id in option_ids if option_id not in option_quotes]
+            timeslot = self._load_unfiltered_timeslot(self.quote_datetime)
+            option_quotes = option_quotes | timeslot.get_records(missing)
+        return option_quotes
 
+    def _get_option_columns(self, option_ids: list[str]) -> Mapping:
+        # the same quotes as _get_option_quotes, as columns for the position book
+        if not option_ids or (self._timeslot is None and self._pending_datetime is None):
+            return records_to_columns([])
+        if self.contract_store is not None and self._timeslot is None:
+            option_quotes = self.contract_store.get_records(self.quote_datetime, option_ids)
+            if option_quotes is not None:
+                return records_to_columns(list(option_quotes.values()))
+        columns = self.timeslot.get_columns(option_ids)
+        if self.select_filter is not None and len(columns['option_id']) < len(option_ids):
+            found = set(columns['option_id'].tolist())
+            missing = [option_id for option_id in option_ids if option_id not in found]
+            timeslot = self._load_unfiltered_timeslot(self.quote_datetime)
+            extra = timeslot.get_columns(missing)
+            if not len(columns['option_id']):
+                # without any row, the columns of the filtered timeslot may only hold option_id
+                columns = extra
+            elif len(extra['option_id']):
+                columns = {name: np.concatenate([columns[name], extra[name]]) for name in columns}
+        return columns
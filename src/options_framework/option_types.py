@@ -57,4 +57,43 @@ class OptionTradeType(Enum):
     DEBIT = 2
 
 
+@dataclass(slots=True)
+class FilterRange:
+    """
+    A range of values used by SelectFilter. A bound that is None is not applied.
+    """
+    low: float | int | None = None
+    high: float | int | None = None
+
+
+EPOCH = datetime.date(1970, 1, 1)
+
+EXPIRATION_TIME = datetime.time(16, 00)
+"""Options are PM settled. An option expires at this time on its expiration date."""
+
+
+@dataclass(slots=True)
+class SelectFilter:
+    """
+    Selects the part of the option chain a strategy uses, so only those options are loaded.
+    expiration_dte is the range of days to expiration.
+    strike_offset is how far below (low) and above (high) the spot price strikes can be.
+    """
+    symbol: str | None = None
+    expiration_dte: FilterRange = field(default_factory=FilterRange)
+    strike_offset: FilterRange = field(default_factory=FilterRange)
+
+    def expiration_days(self, quote_datetime: datetime.datetime) -> tuple[float, float]:
+        """
+        :return: the first and last expiration dates that pass the filter, as days since 1970-01-01
+        """
+        day = (quote_datetime.date() - EPOCH).days
+        low, high = self.expiration_dte.low, self.expiration_dte.high
+        return (float('-inf') if low is None else day + low), (float('inf') if high is None else day + high)
 
+    def strike_range(self, spot_price: float) -> tuple[float, float]:
+        """
+        :return: the lowest and highest strikes that pass the filter
+        """
+        low, high = self.strike_offset.low, self.strike_offset.high
+        return (float('-inf') if low is None else spot_price - low), (float('inf') if high is None else spot_price + high)
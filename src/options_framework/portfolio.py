@@ -1,13 +1,34 @@
 import datetime
+import functools
+import heapq
+import uuid
 from dataclasses import dataclass, field
+from pathlib import Path
 
 from pydispatch import Dispatcher
 
 from options_framework.option import TradeOpenInfo, TradeCloseInfo
 from options_framework.option_chain import OptionChain
-from options_framework.option_types import OptionStatus, OptionPositionType
-from options_framework.spreads.spread_base import SpreadBase
-from options_framework.utils.helpers import decimalize_2
+from options_framework.option_types import EXPIRATION_TIME, OptionStatus, OptionPositionType, SelectFilter
+from options_framework.position_registry import PositionRegistry
+from options_framework.spreads.spread_base import SpreadBase, SpreadTransaction
+from options_framework.config import settings
+from options_framework.equity_curve import EquityCurve
+from options_framework.event_bus import EventBus
+from options_framework.event_log import EventLog, get_event_log
+from options_framework.utils.helpers import cents, decimalize_2, whole
+
+
+def new_equity_curve() -> EquityCurve:
+    """
+    :return: an empty equity curve set up from the equity_curve_flush_rows and equity_curve_folder settings.
+             Each curve flushes into its own subfolder of equity_curve_folder, named run-<uuid>, so the
+             portfolios of a parameter sweep do not write to the same folder.
+    """
+    folder = settings.get('equity_curve_folder')
+    if folder is not None:
+        folder = Path(folder).joinpath(f'run-{uuid.uuid4().hex}')
+    return EquityCurve(flush_rows=settings.get('equity_curve_flush_rows', 0), folder=folder)
 
 
 @dataclass(repr=False)
@@ -19,48 +40,112 @@ class OptionPortfolio(Dispatcher):
     start_date: datetime.datetime
     end_date: datetime.datetime
     current_datetime: datetime.datetime = field(init=False, default=None)
-    positions: list = field(init=False, default_factory=lambda: [])
-    closed_positions: list = field(init=False, default_factory=lambda: [])
+    positions: PositionRegistry = field(init=False, default_factory=PositionRegistry)
+    closed_positions: PositionRegistry = field(init=False, default_factory=PositionRegistry)
     portfolio_risk: float = field(init=False, default=0.0)
-    close_values: list = field(init=False, default_factory=lambda: [])
+    close_values: EquityCurve = field(init=False, default_factory=new_equity_curve)
     option_chains: dict = field(default_factory=lambda: {})
+    select_filter: SelectFilter = field(default=None)
     uninitialize_closed_positions: bool = field(init=False, default=False)
+    position_values: dict = field(init=False, default_factory=lambda: {})
+    """mark-to-market value of each open position, by position_id, in whole dollars of option value"""
+    _positions_value: int = field(init=False, default=0)
+    _stale_positions: set = field(init=False, default_factory=set)
+    """position_id of the open positions with a leg whose quote changed since the position was last marked"""
+    event_log: EventLog = field(init=False, default_factory=get_event_log)
+    _expiration_heap: list = field(init=False, default_factory=lambda: [])
+    """expiration datetimes of the open options, as a heap, so the next expiration is always first"""
+    _expiration_times: set = field(init=False, default_factory=set)
+    """the expiration datetimes in the heap"""
+    event_bus: EventBus = field(init=False, default_factory=EventBus)
+    """delivers the events of the open options to the portfolio and the bar events to the option chains"""
+    _has_listeners: bool = field(init=False, default=False)
+    _transaction: tuple[list, list] = field(init=False, default=None)
+    """leg records and fees of the spread trade in progress, applied to the cash when the trade is done"""
 
     def __post_init__(self):
-        pass
+        bus = self.event_bus
+        bus.subscribe('open_transaction_completed', self.on_option_open_transaction_completed)
+        bus.subscribe('close_transaction_completed', self.on_option_close_transaction_completed)
+        bus.subscribe('option_expired', self.on_option_expired)
+        bus.subscribe('fees_incurred', self.on_fees_incurred)
+        bus.subscribe('quotes_changed', self.on_quotes_changed)
+        # posted during a bar, so listeners bound with pydispatch are called once the bar has been processed
+        for event in ('position_closed', 'position_expired'):
+            bus.subscribe(event, functools.partial(self._emit_to_listeners, event))
 
     def __repr__(self) -> str:
         return f'<OptionPortfolio cash=${self.cash:,.2f} portfolio_value=${self.current_value:,.2f}>'
 
+    def bind(self, **kwargs):
+        self._has_listeners = True
+        Dispatcher.bind(self, **kwargs)
+
+    def _emit_to_listeners(self, event: str, *args) -> None:
+        if self._has_listeners:
+            self.emit(event, *args)
+
     def open_position(self, option_spread: SpreadBase, quantity: int, *args, **kwargs: dict):
+        outer_transaction = self._begin_transaction()
+        event_buses = [option.event_bus for option in option_spread.options]
         try:
             if option_spread.symbol not in self.option_chains.keys():
                 self.initialize_ticker(option_spread.symbol, self.current_datetime)
-            [option.bind(open_transaction_completed=self.on_option_open_transaction_completed,
-                         close_transaction_completed=self.on_option_close_transaction_completed,
-                         option_expired=self.on_option_expired,
-                         fees_incurred=self.on_fees_incurred) for option in option_spread.options]
+            for option in option_spread.options:
+                option.event_bus = self.event_bus
             option_spread.open_trade(quantity=quantity, *args, **kwargs)
+            transaction = self._end_transaction(option_spread)
             if option_spread.position_type == OptionPositionType.SHORT:
-                # check to see if we have enough margin to open this position
+                # check to see if we have enough margin to open this position, with the cash after the trade
                 new_margin = option_spread.required_margin + self.portfolio_margin_allocation
-                if new_margin > self.cash:
+                if new_margin > self.cash - transaction.premium - transaction.fees:
                     raise ValueError(f'Insufficient margin available to open this position.')
         except ValueError as e:
+            self._cancel_open(option_spread, event_buses)
             raise ValueError(str(e)) from e
-
-        self.positions.append(option_spread)
-
+        except Exception:
+            self._cancel_open(option_spread, event_buses)
+            raise
+        finally:
+            self._transaction = outer_transaction
+
+        self.cash = self.cash - transaction.premium - transaction.fees
+        self.event_log.info('position_opened', quote_datetime=self.current_datetime,
+                            position_id=transaction.position_id, premium=transaction.premium,
+                            fees=transaction.fees, legs=len(transaction.legs), cash=self.cash)
+        self.positions.add(option_spread)
+        for expiration in {option.expiration for option in option_spread.options}:
+            expiration_datetime = datetime.datetime.combine(expiration, EXPIRATION_TIME)
+            if expiration_datetime not in self._expiration_times:
+                self._expiration_times.add(expiration_datetime)
+                heapq.heappush(self._expiration_heap, expiration_datetime)
+        self._mark_position(option_spread)
+
+    def _cancel_open(self, option_spread: SpreadBase, event_buses: list[EventBus | None]) -> None:
+        # a rejected position leaves its legs as they were before open_position
+        for option, event_bus in zip(option_spread.options, event_buses):
+            if OptionStatus.TRADE_IS_OPEN in option.status:
+                option.cancel_trade()
+            option.event_bus = event_bus
 
     def close_position(self, position_id: int, quantity: int = None, **kwargs: dict):
 
-        try:
-            to_close = next(x for x in self.positions if x.position_id == position_id)
-        except StopIteration:
+        to_close = self.positions.get(position_id)
+        if to_close is None:
             raise ValueError(f'Position {position_id} not in open positions list.')
 
         try:
-            to_close.close_trade(quantity=quantity, **kwargs)
+            outer_transaction = self._begin_transaction()
+            try:
+                to_close.close_trade(quantity=quantity, **kwargs)
+                transaction = self._end_transaction(to_close)
+            finally:
+                self._transaction = outer_transaction
+            self.cash = self.cash + transaction.premium - transaction.fees
+            self.event_log.info('position_closed', quote_datetime=self.current_datetime,
+                                position_id=transaction.position_id, premium=transaction.premium,
+                                fees=transaction.fees, legs=len(transaction.legs), cash=self.cash)
+
             closing_value = sum(o.trade_close_records[-1].premium for o in to_close.options)
             raw_pnl = to_close.trade_value - closing_value
             raw_pnl = raw_pnl * -1 if to_close.position_type == OptionPositionType.SHORT else raw_pnl
@@ -69,18 +154,24 @@ class OptionPortfolio(Dispatcher):
             if to_close.max_profit:
                 if raw_pnl > to_close.max_profit:
                     self.cash -= (raw_pnl - to_close.max_profit)
-                    print(f'corrected pnl > max profit: {(raw_pnl - to_close.max_profit)}')
+                    self.event_log.warning('pnl_corrected', quote_datetime=self.current_datetime,
+                                           position_id=to_close.position_id, limit='max_profit',
+                                           amount=raw_pnl - to_close.max_profit)
 
             # Adjust portfolio cash if the closing value is less than the max loss for this position
             if to_close.max_loss:
                 max_loss = to_close.max_loss * -1
                 if raw_pnl < max_loss:
                     self.cash += (raw_pnl - max_loss)
-                    print(f'corrected pnl < max loss: {(max_loss - raw_pnl)}')
+                    self.event_log.warning('pnl_corrected', quote_datetime=self.current_datetime,
+                                           position_id=to_close.position_id, limit='max_loss',
+                                           amount=max_loss - raw_pnl)
 
-            self.closed_positions.append(to_close)
+            if to_close not in self.closed_positions:
+                self.closed_positions.add(to_close)
             self.positions.remove(to_close)
-            self.emit("position_closed", to_close)
+            self._unmark_position(to_close)
+            self.event_bus.post('position_closed', to_close)
 
             # if self._uninitialize_closed_positions:
             #     symbol = to_close.symbol
@@ -95,72 +186,154 @@ class OptionPortfolio(Dispatcher):
         self.current_datetime = quote_datetime
         symbols = [] if symbols is None else symbols
         try:
-            del_symbols = [s for s in list(self.option_chains.keys()) if s not in symbols]
-            self._remove_symbols(del_symbols)
-            for symbol in symbols:
-                self._initialize_ticker(symbol=symbol, quote_datetime=quote_datetime)
-
-            self.emit('next', quote_datetime)
-            options = [o for pos in self.positions for o in pos.options]
-            self.emit('next_options', options)
-            values = [quote_datetime, self.current_value] + list(args)
-            self.close_values.append(values)
+            with self.event_bus.batch():
+                del_symbols = [s for s in list(self.option_chains.keys()) if s not in symbols]
+                self._remove_symbols(del_symbols)
+                for symbol in symbols:
+                    self._initialize_ticker(symbol=symbol, quote_datetime=quote_datetime)
+
+                self.event_bus.emit('next', quote_datetime)
+                self._emit_to_listeners('next', quote_datetime)
+                self._settle_expirations(quote_datetime)
+                options = [o for pos in self.positions for o in pos.options]
+                self.event_bus.emit('next_options', options)
+                self._emit_to_listeners('next_options', options)
+                self._mark_stale_positions()
+                self.close_values.append(quote_datetime, self.current_value, *args)
         except Exception as e:
             raise Exception(str(e)) from e
 
-    def get_open_position_by_id(self, position_id: int) -> SpreadBase:
-        pass
-
-    def get_closed_position_by_id(self, position_id: int) -> SpreadBase:
-        pass
+    def _settle_expirations(self, quote_datetime: datetime.datetime) -> None:
+        # options are only checked for expiration when the clock passes an expiration on the heap
+        while self._expiration_heap and self._expiration_heap[0] <= quote_datetime:
+            expiration_datetime = heapq.heappop(self._expiration_heap)
+            self._expiration_times.discard(expiration_datetime)
+            expiration = expiration_datetime.date()
+            for position in self.positions.get_by_expiration(expiration):
+                for option in position.options:
+                    if option.expiration == expiration and OptionStatus.TRADE_IS_OPEN in option.status:
+                        option.next({'option_id': option.option_id, 'quote_datetime': quote_datetime})
+                        self._stale_positions.add(position.position_id)
+
+    def _begin_transaction(self) -> tuple[list, list] | None:
+        # the leg events of a spread trade are collected instead of each one changing the cash
+        outer_transaction = self._transaction
+        self._transaction = ([], [])
+        return outer_transaction
+
+    def _end_transaction(self, position: SpreadBase) -> SpreadTransaction:
+        legs, fees = self._transaction
+        # summed in cents, so the cash changes by the same amount as with one update per leg
+        return SpreadTransaction(position_id=position.position_id, date=self.current_datetime,
+                                 premium=sum(cents(leg.premium) for leg in legs) / 100,
+                                 fees=sum(cents(fee) for fee in fees) / 100, legs=tuple(legs))
+
+    def get_open_position_by_id(self, position_id: int) -> SpreadBase | None:
+        return self.positions.get(position_id)
+
+    def get_closed_position_by_id(self, position_id: int) -> SpreadBase | None:
+        return self.closed_positions.get(position_id)
 
     @property
     def current_value(self):
+        """
+        The cash plus the value of the open positions. The position values are kept up to date when positions
+        are opened or closed, and on each bar for the positions with a leg whose quote changed, so reading the
+        value does not visit the options. The values are whole cents in both numeric modes, so the sum is exact
+        and the same as the Decimal calculation.
+        With the "check_portfolio_value" setting, the value is checked against a full recalculation.
+        """
+        portfolio_value = (self._positions_value * 100 + cents(self.cash)) / 100
+        if settings.get('check_portfolio_value', False):
+            expected = self._calculate_current_value()
+            assert portfolio_value == expected, \
+                f'Portfolio value {portfolio_value} does not match the recalculated value {expected}.'
+        return portfolio_value
+
+    def _calculate_current_value(self) -> float:
         current_value = sum(option.current_value for option in [option for position in self.positions
                                                                 for option in position.options])
+        if settings.get('numeric_mode', 'cents') == 'cents':
+            portfolio_value = cents(current_value) + cents(self.cash)
+            if portfolio_value:
+                return portfolio_value / 100
         portfolio_value = decimalize_2(current_value) + decimalize_2(self.cash)
         return float(portfolio_value)
 
+    def _mark_position(self, position: SpreadBase) -> None:
+        # the value of an option is its price in cents times its quantity, the same as Option.current_value
+        value = sum(cents(o.price) * whole(o.quantity) for o in position.options if o.price is not None)
+        self._positions_value += value - self.position_values.get(position.position_id, 0)
+        self.position_values[position.position_id] = value
+
+    def _unmark_position(self, position: SpreadBase) -> None:
+        self._positions_value -= self.position_values.pop(position.position_id, 0)
+        self._stale_positions.discard(position.position_id)
+
+    def _mark_stale_positions(self) -> None:
+        for position_id in self._stale_positions:
+            position = self.positions.get(position_id)
+            if position is not None:
+                self._mark_position(position)
+        self._stale_positions.clear()
+
+    def on_quotes_changed(self, options: list) -> None:
+        for option in options:
+            position = self.positions.get_by_instance_id(option.instance_id)
+            if position is not None:
+                self._stale_positions.add(position.position_id)
+
     @property
     def portfolio_margin_allocation(self):
         margin = sum(position.required_margin for position in self.positions)
         return margin
 
     def on_option_open_transaction_completed(self, trade_open_info: TradeOpenInfo):
+        if self._transaction is not None:
+            self._transaction[0].append(trade_open_info)
+            return
         open_premium = trade_open_info.premium
         self.cash = self.cash - open_premium
-        print(f'opened option. ${open_premium:,.2f} subtracted from cash')
-        print(f"portfolio: option position was opened {trade_open_info.option_id}")
+        self.event_log.info('option_opened', quote_datetime=self.current_datetime,
+                            option_id=trade_open_info.option_id, premium=open_premium, cash=self.cash)
 
     def on_option_close_transaction_completed(self, trade_close_info: TradeCloseInfo):
+        if self._transaction is not None:
+            self._transaction[0].append(trade_close_info)
+            return
         close_premium = trade_close_info.premium
         self.cash = self.cash + close_premium
-        print(f'closed option. ${close_premium:,.2f} added to cash')
-        print(f"portfolio: option position was closed {trade_close_info.option_id}")
+        self.event_log.info('option_closed', quote_datetime=self.current_datetime,
+                            option_id=trade_close_info.option_id, premium=close_premium, cash=self.cash)
 
     def on_option_expired(self, instance_id: int):
-        print(f"portfolio: option expired {instance_id}")
-        try:
-            expired_position = next(pos for pos in self.positions for o in pos.options if o.instance_id == instance_id)
-        except StopIteration:
+        self.event_log.info('option_expired', quote_datetime=self.current_datetime, instance_id=instance_id)
+        expired_position = self.positions.get_by_instance_id(instance_id)
+        if expired_position is None:
             raise ValueError(f'Cannot find expired option {instance_id} in open positions list.')
 
         if all([OptionStatus.EXPIRED in option.status for option in expired_position.options]):
-                self.close_position(expired_position, expired_position.quantity)
-                self.emit('position_expired', expired_position)
+                self.close_position(expired_position.position_id, expired_position.quantity)
+                self.event_bus.post('position_expired', expired_position)
 
     def on_fees_incurred(self, fees):
+        if self._transaction is not None:
+            self._transaction[1].append(fees)
+            return
         self.cash = self.cash - fees
-        #print(f'fees charged. ${fees:,.2f} subtracted from cash')
-        #print("portfolio: fees incurred")
+        self.event_log.debug('fees_incurred', quote_datetime=self.current_datetime, fees=fees)
 
     # Bind events to option chain so it stays in sync with portfolio
     def _initialize_ticker(self, symbol: str, quote_datetime: datetime.datetime) :
         if symbol in self.option_chains.keys():
             return
-        option_chain = OptionChain(symbol=symbol, quote_datetime=quote_datetime, end_datetime=self.end_date)
-        self.bind(next=option_chain.on_next)
-        self.bind(next_options=option_chain.on_next_options)
+        select_filter = self.select_filter
+        if select_filter is not None and select_filter.symbol not in (None, symbol):
+            select_filter = None
+        option_chain = OptionChain(symbol=symbol, quote_datetime=quote_datetime, end_datetime=self.end_date,
+                                   select_filter=select_filter, event_bus=self.event_bus, settle_expirations=False)
+        self.event_bus.subscribe('next', option_chain.on_next)
+        self.event_bus.subscribe('next_options', option_chain.on_next_options)
         self.option_chains[symbol] = option_chain
 
     def _remove_symbols(self, symbols: list[str]) -> None:
@@ -171,9 +344,10 @@ class OptionPortfolio(Dispatcher):
     def _uninitialize_ticker(self, symbol: str):
         if symbol in self.option_chains.keys():
             option_chain = self.option_chains[symbol]
-            if any(o.symbol == symbol for pos in self.positions for o in pos.options):
+            if self.positions.has_symbol(symbol):
                 return
 
-            self.unbind(option_chain.on_next)
-            self.unbind(option_chain.on_next_options)
+            self.event_bus.unsubscribe('next', option_chain.on_next)
+            self.event_bus.unsubscribe('next_options', option_chain.on_next_options)
+            option_chain.close()
             del self.option_chains[symbol]
@@ -0,0 +1,126 @@
+import datetime
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from options_framework.option import Option
+from options_framework.option_types import EXPIRATION_TIME, OptionStatus
+from options_framework.utils.helpers import to_cents
+
+QUOTE_FIELDS = ('delta', 'gamma', 'theta', 'vega', 'rho', 'open_interest', 'volume', 'implied_volatility')
+"""Fields copied to the option as they are. They are None when the data does not have them."""
+
+
+@dataclass(repr=False)
+class PositionBook:
+    """
+    The open option legs in numpy arrays, one row for each leg, so the quotes of all the legs are updated
+    from a timeslot at once instead of with one Option.next call for each leg.
+    The options are still the owners of the trade. After each update, the new quotes are written to them
+    with the same values Option.next would set. Legs that expire are passed to Option.next, so the trade is
+    closed and the events are emitted the same way.
+    """
+
+    options: list[Option]
+    option_ids: list = field(init=False)
+    expirations: np.ndarray = field(init=False)
+    """expiration of each leg as datetime64[D]"""
+    price_cents: np.ndarray = field(init=False)
+    """price of each leg at the last update, rounded to whole cents. NaN if the leg has no quote yet."""
+
+    def __post_init__(self):
+        self.options = list(self.options)
+        self.option_ids = [option.option_id for option in self.options]
+        self.expirations = np.array([option.expiration for option in self.options], dtype='M8[D]')
+        prices = [np.nan if option.price is None else option.price for option in self.options]
+        self.price_cents = to_cents(np.array(prices, dtype=np.float64))
+
+    def __repr__(self) -> str:
+        return f'<PositionBook legs={len(self.options)}>'
+
+    def __len__(self) -> int:
+        return len(self.options)
+
+    def holds(self, options: list[Option]) -> bool:
+        """
+        :return: True if the book was built from exactly these option objects, in the same order
+        """
+        return len(options) == len(self.options) and all(a is b for a, b in zip(options, self.options))
+
+    def expired(self, quote_datetime: datetime.datetime) -> np.ndarray:
+        """
+        :param quote_datetime: the current quote datetime
+        :return: boolean array, True for the legs that are expired at the quote datetime
+        """
+        quote_date = np.datetime64(quote_datetime.date(), 'D')
+        if quote_datetime.time() >= EXPIRATION_TIME:
+            return self.expirations <= quote_date
+        return self.expirations < quote_date
+
+    def update(self, quote_datetime: datetime.datetime, columns: Mapping,
+               settle_expirations: bool = True) -> list[Option]:
+        """
+        Updates every leg from the quotes of one timeslot. Legs that expired before the quote date are
+        closed even if they have no quote. Other legs without a quote are left as they are.
+        :param quote_datetime: the quote datetime of the timeslot
+        :param columns: mapping of field name to numpy array, as returned by Timeslot.get_columns.
+                        It only needs to hold the rows of the legs.
+        :param settle_expirations: False when the caller closes expired legs itself. The legs are then not
+                                   checked for expiration, and legs already expired keep their last quote.
+        :return: the legs whose price changed or that were closed, in book order
+        """
+        if not self.options:
+            return []
+        if type(quote_datetime) != datetime.datetime:
+            raise ValueError(f"Wrong format for option date. Must be python datetime.datetime. "
+                             f"Date was provided in {type(quote_datetime)} format.")
+        quote_rows = {option_id: row for row, option_id in enumerate(columns['option_id'].tolist())}
+        rows = np.array([quote_rows.get(option_id, -1) for option_id in self.option_ids], dtype=np.int64)
+        has_quote = rows >= 0
+        found = has_quote.tolist()
+        if settle_expirations:
+            past = (self.expirations < np.datetime64(quote_datetime.date(), 'D')).tolist()
+            expired = self.expired(quote_datetime).tolist()
+
+        quote_positions = (np.cumsum(has_quote) - 1).tolist()
+        repriced = []
+        if has_quote.any():
+            # the quotes of all the legs are gathered and rounded together
+            gather = rows[has_quote]
+            spot_prices = columns['spot_price'][gather].tolist()
+            bids = (to_cents(columns['bid'][gather]) / 100).tolist()
+            asks = (to_cents(columns['ask'][gather]) / 100).tolist()
+            price_cents = to_cents(columns['price'][gather])
+            prices = (price_cents / 100).tolist()
+            quote_fields = {name: columns[name][gather].tolist() for name in QUOTE_FIELDS if name in columns}
+            # NaN, a leg without a price yet, compares unequal, so its first price counts as a change
+            repriced = (price_cents != self.price_cents[has_quote]).tolist()
+            self.price_cents[has_quote] = price_cents
+
+        # legs are visited in order, because closing an expired leg emits events that may read the other legs
+        changed = []
+        for i, option in enumerate(self.options):
+            if settle_expirations and past[i]:
+                option.next({'option_id': option.option_id, 'quote_datetime': quote_datetime})
+                changed.append(option)
+            elif not found[i]:
+                continue
+            elif settle_expirations and (expired[i] or OptionStatus.EXPIRED in option.status):
+                option.next({'option_id': option.option_id, 'quote_datetime': quote_datetime})
+                changed.append(option)
+            elif OptionStatus.EXPIRED in option.status:
+                continue
+            else:
+                q = quote_positions[i]
+                if repriced[q]:
+                    changed.append(option)
+                option.quote_datetime = quote_datetime
+                option.spot_price = spot_prices[q]
+                option.bid = bids[q]
+                option.ask = asks[q]
+                option.price = prices[q]
+                for name in QUOTE_FIELDS:
+                    values = quote_fields.get(name)
+                    setattr(option, name, None if values is None else values[q])
+        return changed
@@ -0,0 +1,84 @@
+import datetime
+from dataclasses import dataclass, field
+from typing import Iterator
+
+from options_framework.spreads.spread_base import SpreadBase
+
+
+@dataclass(repr=False)
+class PositionRegistry:
+    """
+    The positions of a portfolio, indexed by position_id, by the instance_id of each leg, by symbol and by
+    the expiration of each leg. Adding, removing and finding a position do not scan the other positions.
+    Iterating the registry returns the positions in the order they were added.
+    """
+
+    _positions: dict[int, SpreadBase] = field(init=False, default_factory=dict)
+    _by_instance_id: dict[int, SpreadBase] = field(init=False, default_factory=dict)
+    _by_symbol: dict[str, dict[int, SpreadBase]] = field(init=False, default_factory=dict)
+    _by_expiration: dict[datetime.date, dict[int, SpreadBase]] = field(init=False, default_factory=dict)
+
+    def __repr__(self) -> str:
+        return f'<PositionRegistry positions={len(self._positions)}>'
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __iter__(self) -> Iterator[SpreadBase]:
+        return iter(list(self._positions.values()))
+
+    def __contains__(self, position: SpreadBase) -> bool:
+        return self._positions.get(position.position_id) is position
+
+    def add(self, position: SpreadBase) -> None:
+        if position.position_id in self._positions:
+            raise ValueError(f'Position {position.position_id} is already in the registry.')
+        self._positions[position.position_id] = position
+        for option in position.options:
+            self._by_instance_id[option.instance_id] = position
+            self._by_expiration.setdefault(option.expiration, {})[position.position_id] = position
+        self._by_symbol.setdefault(position.symbol, {})[position.position_id] = position
+
+    def remove(self, position: SpreadBase) -> None:
+        if position not in self:
+            raise ValueError(f'Position {position.position_id} is not in the registry.')
+        del self._positions[position.position_id]
+        for option in position.options:
+            self._by_instance_id.pop(option.instance_id, None)
+            self._discard(self._by_expiration, option.expiration, position.position_id)
+        self._discard(self._by_symbol, position.symbol, position.position_id)
+
+    @staticmethod
+    def _discard(index: dict, key, position_id: int) -> None:
+        positions = index.get(key)
+        if positions is not None:
+            positions.pop(position_id, None)
+            if not positions:
+                del index[key]
+
+    def get(self, position_id: int) -> SpreadBase | None:
+        return self._positions.get(position_id)
+
+    def get_by_instance_id(self, instance_id: int) -> SpreadBase | None:
+        """
+        :param instance_id: the instance_id of one of the options of the position
+        :return: the position that holds the option, or None
+        """
+        return self._by_instance_id.get(instance_id)
+
+    def get_by_symbol(self, symbol: str) -> list[SpreadBase]:
+        return list(self._by_symbol.get(symbol, {}).values())
+
+    def get_by_expiration(self, expiration: datetime.date) -> list[SpreadBase]:
+        """
+        :return: the positions that have at least one option expiring on the date
+        """
+        return list(self._by_expiration.get(expiration, {}).values())
+
+    def has_symbol(self, symbol: str) -> bool:
+        return symbol in self._by_symbol
+
+    @property
+    def expirations(self) -> list[datetime.date]:
+        """sorted list of the expirations of the options in the registry"""
+        return sorted(self._by_expiration)
@@ -1,7 +1,9 @@
 from dataclasses import dataclass, field
+import bisect
 import datetime
 from options_framework.utils.helpers import decimalize_0, decimalize_2
 from options_framework.option import Option
+from options_framework.option_chain import OptionChain
 from options_framework.option_types import OptionSpreadType, OptionStatus, OptionPositionType
 from options_framework.spreads.spread_base import SpreadBase
 
@@ -10,26 +12,12 @@ from options_framework.spreads.spread_base import SpreadBase
 class Butterfly(SpreadBase):
 
     @classmethod
-    def get_balanced_butterfly(cls, *, option_chain: list[Option], expiration: datetime.date, option_type: str,
+    def get_balanced_butterfly(cls, *, option_chain: OptionChain, expiration: datetime.date, option_type: str,
                                center_strike: int | float, wing_width: int | float, quantity: int = 1):
 
         expiration = datetime.date(expiration.year, expiration.month, expiration.day)
-        candidates = [o for o in option_chain if o.expiration == expiration and o.option_type == option_type]
-        center_option_candidates = [o for o in candidates if o.strike >= center_strike]
-        if not center_option_candidates:
-            raise ValueError("Butterfly position cannot be created with these values - no center wing options found")
-        center_option = center_option_candidates[0]
-        lower_wing_candidates = [o for o in candidates if o.strike <= (center_option.strike - wing_width)]
-        if not lower_wing_candidates:
-            lower_wing = candidates[0]
-        else:
-            lower_wing = lower_wing_candidates[-1]
-        upper_wing_candidates = [o for o in candidates if o.strike >= (center_option.strike + wing_width)]
-        if not upper_wing_candidates:
-            upper_wing = candidates[-1]
-        else:
-            upper_wing = upper_wing_candidates[0]
-        position_options = [lower_wing, center_option, upper_wing]
+        position_options = cls._get_options(option_chain, expiration, option_type, center_strike,
+                                            wing_width, wing_width)
 
         butterfly = Butterfly(position_options, spread_type=OptionSpreadType.BUTTERFLY,
                               quantity=quantity)
@@ -46,25 +34,10 @@ class Butterfly(SpreadBase):
             raise ValueError("Option quantity multiples are unbalanced. This configuration will open naked options.")
 
         expiration = datetime.date(expiration.year, expiration.month, expiration.day)
-        candidates = [o for o in option_chain if o.expiration == expiration and o.option_type == option_type]
-        center_option_candidates = [o for o in candidates if o.strike >= center_strike]
-        if not center_option_candidates:
-            ex = ValueError()
-            ex.strerror = "Butterfly position cannot be created with these values - no center wing options found"
-            raise ex
-        center_option = center_option_candidates[0]
+        lower_wing, center_option, upper_wing = cls._get_options(option_chain, expiration, option_type, center_strike,
+                                                                 lower_wing_width, upper_wing_width)
         center_option.quantity = center_quantity_multiple * quantity
-        lower_wing_candidates = [o for o in candidates if o.strike <= (center_option.strike - lower_wing_width)]
-        if not lower_wing_candidates:
-            lower_wing = candidates[0]
-        else:
-            lower_wing = lower_wing_candidates[-1]
         lower_wing.quantity = lower_quantity_multiple * quantity
-        upper_wing_candidates = [o for o in candidates if o.strike >= (center_option.strike + upper_wing_width)]
-        if not upper_wing_candidates:
-            upper_wing = candidates[-1]
-        else:
-            upper_wing = upper_wing_candidates[0]
         upper_wing.quantity = upper_quantity_multiple * quantity
         position_options = [lower_wing, center_option, upper_wing]
         user_defined = {'center_quantity_multiple': center_quantity_multiple,
@@ -74,6 +47,41 @@ class Butterfly(SpreadBase):
                               quantity=quantity, user_defined=user_defined)
         return butterfly
 
+    @staticmethod
+    def _get_options(option_chain: OptionChain, expiration: datetime.date, option_type: str,
+                     center_strike: int | float, lower_wing_width: int | float,
+                     upper_wing_width: int | float) -> list[Option]:
+        # the wings are the nearest strikes at least the wing width away from the center, or the outermost strikes,
+        # that have an option of the type
+        center = option_chain.strike_at_or_above(expiration, center_strike)
+        center_row = None if center is None else option_chain.row(expiration, center, option_type)
+        if center_row is None:
+            raise ValueError("Butterfly position cannot be created with these values - no center wing options found")
+        strikes = option_chain.expiration_strikes[expiration]
+        lower_end = bisect.bisect_right(strikes, center - lower_wing_width)
+        inside_lower = bisect.bisect_left(strikes, center)
+        lower_row = Butterfly._first_row(option_chain, expiration, option_type,
+                                         strikes[lower_end - 1::-1] if lower_end else [],
+                                         strikes[lower_end:inside_lower])
+        upper_start = bisect.bisect_left(strikes, center + upper_wing_width)
+        inside_upper = bisect.bisect_right(strikes, center)
+        upper_row = Butterfly._first_row(option_chain, expiration, option_type, strikes[upper_start:],
+                                         strikes[inside_upper:upper_start][::-1])
+        if lower_row is None or upper_row is None:
+            raise ValueError("Butterfly position cannot be created with these values - no wing options found")
+        return [Option.from_row(row) for row in (lower_row, center_row, upper_row)]
+
+    @staticmethod
+    def _first_row(option_chain: OptionChain, expiration: datetime.date, option_type: str,
+                   *strike_lists: list[float]) -> dict | None:
+        # the row of the first strike, in the order given, that has an option of the type
+        for strikes in strike_lists:
+            for strike in strikes:
+                row = option_chain.row(expiration, strike, option_type)
+                if row is not None:
+                    return row
+        return None
+
     lower_quantity_multiple: int = field(init=False, default=1)
     center_quantity_multiple: int = field(init=False, default=-2)
     upper_quantity_multiple: int = field(init=False, default=1)
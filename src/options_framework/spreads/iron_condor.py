@@ -60,32 +60,19 @@ class IronCondor(SpreadBase):
             raise ValueError(message)
 
         # Find nearest matching expiration
-        try:
-            expiration = next(e for e in option_chain.expirations if e >= expiration)
-        except StopIteration:
+        expiration = option_chain.nearest_expiration(expiration)
+        if expiration is None:
             message = "No matching expiration was found in the option chain. Consider changing the selection filter."
             raise ValueError(message)
 
-        exp_strikes = option_chain.expiration_strikes[expiration].copy()
-        options = [o for o in option_chain.options if o.expiration == expiration].copy()
         # Find strikes
-        try:
-            long_call_strike = next(s for s in exp_strikes if s >= long_call_strike)
-            short_call_strike = next(s for s in exp_strikes if s >= short_call_strike)
-
-            exp_strikes.sort(reverse=True)
-            long_put_strike = next(s for s in exp_strikes if s <= long_put_strike)
-            short_put_strike = next(s for s in exp_strikes if s <= short_put_strike)
-        except StopIteration:
+        call_strikes = [option_chain.strike_at_or_above(expiration, s) for s in (long_call_strike, short_call_strike)]
+        put_strikes = [option_chain.strike_at_or_below(expiration, s) for s in (long_put_strike, short_put_strike)]
+        if None in call_strikes or None in put_strikes:
             raise ValueError("No matching strike was found in the option chain. Consider changing the selection filter.")
 
-        try:
-            long_call_option = next(o for o in options if o.option_type == 'call' and o.strike == long_call_strike)
-            short_call_option = next(o for o in options if o.option_type == 'call' and o.strike == short_call_strike)
-            long_put_option = next(o for o in options if o.option_type == 'put' and o.strike == long_put_strike)
-            short_put_option = next(o for o in option_chain.options if o.option_type == 'put' and o.strike == short_put_strike)
-        except StopIteration:
-            raise ValueError("No options matching the requirements were found in the option chain. Consider changing the selection filter.")
+        long_call_option, short_call_option, long_put_option, short_put_option = \
+            cls._get_options(option_chain, expiration, *call_strikes, *put_strikes)
 
         long_call_option.quantity, long_call_option.position_type = quantity, OptionPositionType.LONG
         short_call_option.quantity, short_call_option.position_type = quantity * -1, OptionPositionType.SHORT
@@ -122,15 +109,11 @@ class IronCondor(SpreadBase):
         """
 
         # Find nearest matching expiration
-        try:
-            expiration = next(e for e in option_chain.expirations if e >= expiration)
-        except StopIteration:
+        expiration = option_chain.nearest_expiration(expiration)
+        if expiration is None:
             message = "No matching expiration was found in the option chain. Consider changing the selection filter."
             raise ValueError(message)
 
-        exp_strikes = option_chain.expiration_strikes[expiration].copy()
-        options = [o for o in option_chain.options if o.expiration == expiration].copy()
-
         # Define strike targest
         long_call_strike, short_call_strike = (inner_call_strike, inner_call_strike + spread_width) \
             if option_position_type == OptionPositionType.LONG \
@@ -139,31 +122,15 @@ class IronCondor(SpreadBase):
             if option_position_type == OptionPositionType.LONG \
             else (inner_put_strike - spread_width, inner_put_strike)
 
-        try:
-            # Find call strikes
-            long_call_strike = next(s for s in exp_strikes if s >= long_call_strike)
-            short_call_strike = next(s for s in exp_strikes if s >= short_call_strike)
-
-            # Find put strikes
-            exp_strikes.sort(reverse=True)
-            long_put_strike = next(s for s in exp_strikes if s <= long_put_strike)
-            short_put_strike = next(s for s in exp_strikes if s <= short_put_strike)
-        except StopIteration:
+        # Find call and put strikes
+        call_strikes = [option_chain.strike_at_or_above(expiration, s) for s in (long_call_strike, short_call_strike)]
+        put_strikes = [option_chain.strike_at_or_below(expiration, s) for s in (long_put_strike, short_put_strike)]
+        if None in call_strikes or None in put_strikes:
             message = "No strikes matching the requirements were found in the option chain. Consider changing the selection filter."
             raise ValueError(message)
 
-        try:
-            long_call_option = next(
-                o for o in options if o.option_type == 'call' and o.strike == long_call_strike)
-            short_call_option = next(
-                o for o in options if o.option_type == 'call' and o.strike == short_call_strike)
-            long_put_option = next(
-                o for o in options if o.option_type == 'put' and o.strike == long_put_strike)
-            short_put_option = next(o for o in options if
-                                    o.option_type == 'put' and o.strike == short_put_strike)
-        except StopIteration:
-            raise ValueError(
-                "No options matching the requirements were found in the option chain. Consider changing the selection filter.")
+        long_call_option, short_call_option, long_put_option, short_put_option = \
+            cls._get_options(option_chain, expiration, *call_strikes, *put_strikes)
 
         long_call_option.quantity, long_call_option.position_type = quantity, OptionPositionType.LONG
         short_call_option.quantity, short_call_option.position_type = quantity * -1, OptionPositionType.SHORT
@@ -177,6 +144,17 @@ class IronCondor(SpreadBase):
                                  position_type=option_position_type, quantity=quantity)
         return iron_condor
 
+    @staticmethod
+    def _get_options(option_chain: OptionChain, expiration: datetime.date, long_call_strike: float,
+                     short_call_strike: float, long_put_strike: float, short_put_strike: float) -> list[Option]:
+        rows = [option_chain.row(expiration, long_call_strike, 'call'),
+                option_chain.row(expiration, short_call_strike, 'call'),
+                option_chain.row(expiration, long_put_strike, 'put'),
+                option_chain.row(expiration, short_put_strike, 'put')]
+        if None in rows:
+            raise ValueError("No options matching the requirements were found in the option chain. Consider changing the selection filter.")
+        return [Option.from_row(row) for row in rows]
+
     @classmethod
     def get_iron_condor_by_delta(cls, option_chain: OptionChain, expiration: datetime.date,
                                  long_delta: float,
@@ -201,50 +179,34 @@ class IronCondor(SpreadBase):
                 """
 
         # Find nearest matching expiration
-        try:
-            expiration = next(e for e in option_chain.expirations if e >= expiration)
-        except StopIteration:
+        expiration = option_chain.nearest_expiration(expiration)
+        if expiration is None:
             message = "No matching expiration was found in the option chain. Consider changing the selection filter."
             raise ValueError(message)
 
-        options = [o for o in option_chain.options if o.expiration == expiration]
-        options.sort(key=lambda x: x.delta, reverse=True)
-
-        # Find nearest long call matching delta
-        select_options = [o for o in options if o.option_type == 'call'
-                          and o.delta <= long_delta]
-        if not select_options:
+        # The deltas of each expiration and option type are indexed once per timeslot, so each leg is a search
+        long_call_row = option_chain.row_at_or_below_delta(expiration, 'call', long_delta)
+        if long_call_row is None:
             raise ValueError(
                 "No matching options were found for the long call delta value. Consider changing the selection filter.")
-        long_call_option = select_options[0]
-        long_call_option.quantity, long_call_option.position_type = quantity, OptionPositionType.LONG
-
-        # Find nearest short call matching delta
-        select_options = [o for o in options if o.option_type == 'call'
-                          and o.delta <= short_delta]
-        if not select_options:
+        short_call_row = option_chain.row_at_or_below_delta(expiration, 'call', short_delta)
+        if short_call_row is None:
             raise ValueError(
                 "No matching options were found for the short call delta value. Consider changing the selection filter.")
-        short_call_option = select_options[0]
-        short_call_option.quantity, short_call_option.position_type = quantity * -1, OptionPositionType.SHORT
-
-        options.sort(key=lambda x: x.delta)
-        # Find nearest long put matching delta
-        select_options = [o for o in options if o.option_type == 'put'
-                          and o.delta >= -long_delta]
-        if not select_options:
+        long_put_row = option_chain.row_at_or_above_delta(expiration, 'put', -long_delta)
+        if long_put_row is None:
             raise ValueError(
                 "No matching options were found for the long put delta value.")
-        long_put_option = select_options[0]
-        long_put_option.quantity, long_put_option.position_type = quantity, OptionPositionType.LONG
-
-        # Find nearest short put matching delta
-        select_options = [o for o in options if o.option_type == 'put'
-                          and o.delta >= -short_delta]
-        if not select_options:
+        short_put_row = option_chain.row_at_or_above_delta(expiration, 'put', -short_delta)
+        if short_put_row is None:
             raise ValueError(
                 "No matching options were found for the short put delta value.")
-        short_put_option = select_options[0]
+
+        long_call_option, short_call_option, long_put_option, short_put_option = \
+            [Option.from_row(row) for row in (long_call_row, short_call_row, long_put_row, short_put_row)]
+        long_call_option.quantity, long_call_option.position_type = quantity, OptionPositionType.LONG
+        short_call_option.quantity, short_call_option.position_type = quantity * -1, OptionPositionType.SHORT
+        long_put_option.quantity, long_put_option.position_type = quantity, OptionPositionType.LONG
         short_put_option.quantity, short_put_option.position_type = quantity * -1, OptionPositionType.SHORT
 
         spread_options = [long_call_option, short_call_option, long_put_option, short_put_option]
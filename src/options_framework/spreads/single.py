@@ -24,30 +24,24 @@ class Single(SpreadBase):
                *args, **kwargs) -> Self:
 
         # Find nearest matching expiration
-        try:
-            expiration = next(e for e in option_chain.expirations if e >= expiration)
-        except StopIteration:
+        expiration = option_chain.nearest_expiration(expiration)
+        if expiration is None:
             message = "No matching expiration was found in the option chain."
             raise ValueError(message)
 
         # Find nearest matching strike for this expiration
-        strikes = [s for s in option_chain.expiration_strikes[expiration]].copy()
-        try:
-            if option_type == 'call':
-                strike = next(s for s in strikes if s >= strike)
-            else:
-                strikes.sort(reverse=True)
-                strike = next(s for s in strikes if s <= strike)
-
-            option = next(o for o in option_chain.options if o['option_type'] == option_type
-                          and o['expiration'] == expiration and o['strike'] == strike)
-        except StopIteration:
+        if option_type == 'call':
+            strike = option_chain.strike_at_or_above(expiration, strike)
+        else:
+            strike = option_chain.strike_at_or_below(expiration, strike)
+        option = None if strike is None else option_chain.row(expiration, strike, option_type)
+        if option is None:
             raise ValueError("No matching strike was found in the option chain.")
 
         if option['price'] == 0:
             raise Exception(f"Option price is zero ({option['symbol']}). Cannot open this option.")
 
-        single = Option(**option)
+        single = Option.from_row(option)
 
         single = Single(options=[single], spread_type=OptionSpreadType.SINGLE)
 
@@ -3,6 +3,7 @@ from __future__ import annotations
 import datetime
 import itertools
 from abc import ABC, abstractmethod
+from collections import namedtuple
 from dataclasses import dataclass, field, InitVar
 from typing import Optional, Self
 
@@ -10,6 +11,12 @@ from ..option import Option
 from ..option_chain import OptionChain
 from ..option_types import OptionSpreadType, OptionStatus, OptionPositionType
 
+SpreadTransaction = namedtuple("SpreadTransaction", "position_id date premium fees legs")
+"""
+One trade of a spread: the summed premium and fees of the legs, and the TradeOpenInfo or TradeCloseInfo
+record of each leg. The premium has the sign the legs report it with.
+"""
+
 
 @dataclass(repr=False, slots=True)
 class SpreadBase(ABC):
@@ -24,29 +24,24 @@ class Straddle(SpreadBase):
                strike: float | int = None,
                *args, **kwargs) -> Self:
         # Find nearest matching expiration
-        try:
-            expiration = next(e for e in option_chain.expirations if e >= expiration)
-        except StopIteration:
+        expiration = option_chain.nearest_expiration(expiration)
+        if expiration is None:
             message = "No matching expiration was found in the option chain."
             raise ValueError(message)
 
         # Find nearest matching strike for this expiration
-        strikes = [s for s in option_chain.expiration_strikes[expiration]].copy()
-        try:
-            strike = next(s for s in strikes if s >= strike)
-            options = [o for o in option_chain.options if o['expiration'] == expiration and o['strike'] == strike]
-        except StopIteration:
+        strike = option_chain.strike_at_or_above(expiration, strike)
+        if strike is None:
             raise ValueError(
                 "No matching strike was found in the option chain.")
 
-        try:
-            put_data = next(o for o in options if o['option_type'] == 'put')
-            call_data = next(o for o in options if o['option_type'] == 'call')
-        except StopIteration:
+        put_data = option_chain.row(expiration, strike, 'put')
+        call_data = option_chain.row(expiration, strike, 'call')
+        if put_data is None or call_data is None:
             raise ValueError("Cannot create straddle with this strike and expiration.")
 
-        put_option = Option(**put_data)
-        call_option = Option(**call_data)
+        put_option = Option.from_row(put_data)
+        call_option = Option.from_row(call_data)
 
         straddle = Straddle([put_option, call_option], OptionSpreadType.STRADDLE)
 
@@ -32,33 +32,28 @@ class Vertical(SpreadBase):
         else:
             raise ValueError("Long and short strikes cannot be the same")
 
-            # Find nearest matching expiration
-            try:
-                expiration = next(e for e in option_chain.expirations if e >= expiration)
-            except StopIteration:
-                message = "No matching expiration was found in the option chain."
-                raise ValueError(message)
-
-        expiration_strikes = option_chain.expiration_strikes[expiration].copy()
-        options = [o for o in option_chain.options if o['option_type'] == option_type and o['expiration'] == expiration].copy()
-        try:
-            # Find nearest strikes
-            if option_type == 'call':
-                long_strike = next(s for s in expiration_strikes if s >= long_strike)
-                short_strike = next(s for s in expiration_strikes if s >= short_strike)
-            else:
-                expiration_strikes.sort(reverse=True)
-                long_strike = next(s for s in expiration_strikes if s <= long_strike)
-                short_strike = next(s for s in expiration_strikes if s <= short_strike)
-        except StopIteration as ex:
+        # Find nearest matching expiration
+        expiration = option_chain.nearest_expiration(expiration)
+        if expiration is None:
+            message = "No matching expiration was found in the option chain."
+            raise ValueError(message)
+
+        # Find nearest strikes
+        if option_type == 'call':
+            long_strike = option_chain.strike_at_or_above(expiration, long_strike)
+            short_strike = option_chain.strike_at_or_above(expiration, short_strike)
+        else:
+            long_strike = option_chain.strike_at_or_below(expiration, long_strike)
+            short_strike = option_chain.strike_at_or_below(expiration, short_strike)
+        long_dict = None if long_strike is None else option_chain.row(expiration, long_strike, option_type)
+        short_dict = None if short_strike is None else option_chain.row(expiration, short_strike, option_type)
+        if long_dict is None or short_dict is None:
             message = "No matching strike was found in the option chain."
             raise ValueError(message)
 
-        long_dict = next(o for o in options if o['strike'] == long_strike)
-        long_option = Option(**long_dict)
+        long_option = Option.from_row(long_dict)
         long_option.quantity = 1
-        short_dict = next(o for o in options if o['strike'] == short_strike)
-        short_option = Option(**short_dict)
+        short_option = Option.from_row(short_dict)
         short_option.quantity = -1
 
         vertical = Vertical(options=[long_option, short_option],
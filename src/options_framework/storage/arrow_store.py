@@ -0,0 +1,254 @@
+import datetime
+import os
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass, field
+from typing import ClassVar
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError as e:
+    raise ImportError('The arrow data store requires pyarrow. Install it with: pip install pyarrow') from e
+
+from options_framework.option_types import SelectFilter
+from options_framework.storage.chain_index import ChainIndex
+from options_framework.config import settings
+from options_framework.storage.timeslot import Timeslot, SCALAR_FIELDS
+from options_framework.storage.timeslot_store import TimeslotStore, month_key
+
+DICTIONARY_FIELDS = ('option_id', 'expiration', 'option_type')
+"""Contract fields that are dictionary encoded once per month by the compact encoding"""
+
+SCALED_FIELDS = ('strike', 'spot_price', 'bid', 'ask', 'price', 'delta', 'gamma', 'theta', 'vega', 'rho',
+                 'implied_volatility')
+"""Fields stored as int32 in units of 1/SCALE by the compact encoding"""
+
+SCALE = 10_000
+INT32_MAX = np.iinfo(np.int32).max
+
+
+class ArrowColumns(Mapping):
+    """
+    Read-only mapping of field name to numpy array over an Arrow record batch.
+    Numeric columns are zero-copy views of the memory-mapped file. A column is only
+    converted when it is first accessed.
+    """
+
+    def __init__(self, batch: pa.RecordBatch, dictionaries: dict[str, np.ndarray] = None):
+        self._batch = batch
+        self._names = [n for n in batch.schema.names if n not in SCALAR_FIELDS]
+        self._arrays = {}
+        self._dictionaries = {} if dictionaries is None else dictionaries
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        try:
+            return self._arrays[name]
+        except KeyError:
+            if name not in self._names:
+                raise
+        column = self._batch.column(name)
+        metadata = self._batch.schema.field(name).metadata or {}
+        if pa.types.is_dictionary(column.type):
+            # the month dictionary is decoded once and shared by the batches of the month
+            dictionary = self._dictionaries.get(name)
+            if dictionary is None or len(dictionary) < len(column.dictionary):
+                dictionary = column.dictionary.to_numpy(zero_copy_only=False)
+                self._dictionaries[name] = dictionary
+            array = dictionary[column.indices.to_numpy()]
+        elif b'scale' in metadata:
+            array = column.to_numpy(zero_copy_only=False) / int(metadata[b'scale'])
+        elif pa.types.is_floating(column.type) or pa.types.is_integer(column.type):
+            array = column.to_numpy(zero_copy_only=column.null_count == 0)
+        else:
+            array = column.to_numpy(zero_copy_only=False)
+        self._arrays[name] = array
+        return array
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The size of the record batch, plus the columns that had to be copied to convert them. Measuring
+        it does not convert any column.
+        """
+        return self._batch.nbytes + sum(a.nbytes for a in self._arrays.values() if a.flags.owndata)
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+
+@dataclass(repr=False)
+class ArrowTimeslotStore(TimeslotStore):
+    """
+    Columnar storage in the Arrow IPC file format. There is one file per month: arrow/YYYY_MM.arrow.
+    Each timeslot is one record batch, so loading a timeslot is a seek to that batch in a
+    memory-mapped file. Columns are read without copying.
+    Timeslots with no options are not written.
+    The rows of each batch are sorted by expiration and strike, so load_filtered finds the rows that pass
+    a SelectFilter with binary searches and only copies those rows.
+
+    Files can be written with a compression codec ("zstd" or "lz4"), set with the "arrow_compression" setting.
+    The "compact" encoding ("arrow_encoding" setting) dictionary encodes the contract fields once per month,
+    so each row holds small integer codes instead of strings. Prices, strikes and greeks are stored as int32
+    in units of 1/10,000. This keeps the four decimal places in the source data, but drops float noise such
+    as the last digit of a mid price of 21.200000000000003. A value with more decimal places is a ValueError.
+    Compressed and compact files are decoded when read, so their columns are not zero-copy.
+    """
+
+    folder_name: ClassVar[str] = 'arrow'
+
+    compression: str | None = field(default=None)
+    encoding: str = field(default=None)
+    _months: dict[str, pa.ipc.RecordBatchFileReader] = field(init=False, default_factory=dict)
+    _dictionaries: dict[str, dict[str, np.ndarray]] = field(init=False, default_factory=dict)
+
+    def __post_init__(self):
+        super().__post_init__()
+        self.compression = settings.get('arrow_compression') if self.compression is None else self.compression
+        self.encoding = settings.get('arrow_encoding', 'plain') if self.encoding is None else self.encoding
+        if self.compression not in (None, 'zstd', 'lz4'):
+            raise ValueError(f'Unknown arrow compression: {self.compression}')
+        if self.encoding not in ('plain', 'compact'):
+            raise ValueError(f'Unknown arrow encoding: {self.encoding}')
+
+    def month_file(self, month: str):
+        return self.folder.joinpath(f'{month}.arrow')
+
+    def _open_month(self, month: str) -> pa.ipc.RecordBatchFileReader | None:
+        if month in self._months:
+            return self._months[month]
+        path = self.month_file(month)
+        if not path.exists():
+            return None
+        reader = pa.ipc.open_file(pa.memory_map(str(path), 'r'))
+        self._months[month] = reader
+        self._dictionaries[month] = {}
+        return reader
+
+    def list_months(self) -> dict[str, int]:
+        return {f.stem: f.stat().st_mtime_ns for f in self.folder.glob('*.arrow')}
+
+    def scan_month(self, month: str) -> tuple[np.ndarray, np.ndarray]:
+        self._months.pop(month, None)
+        reader = self._open_month(month)
+        minutes = [reader.get_batch(i).column('quote_datetime')[0].value // 60_000_000
+                   for i in range(reader.num_record_batches)]
+        return np.array(minutes, dtype=np.int64), np.arange(reader.num_record_batches)
+
+    def load_timeslot(self, quote_datetime: datetime.datetime) -> Timeslot:
+        position = self.index.find(quote_datetime)
+        reader = None if position is None else self._open_month(month_key(quote_datetime))
+        if reader is None:
+            raise self._not_found(quote_datetime)
+        batch = reader.get_batch(position)
+        return Timeslot(self.symbol, quote_datetime,
+                        _columns=ArrowColumns(batch, self._dictionaries[month_key(quote_datetime)]))
+
+    def load_filtered(self, quote_datetime: datetime.datetime, select_filter: SelectFilter) -> Timeslot:
+        position = self.index.find(quote_datetime)
+        reader = None if position is None else self._open_month(month_key(quote_datetime))
+        if reader is None or (reader.schema.metadata or {}).get(b'sorted') != b'expiration,strike':
+            return super().load_filtered(quote_datetime, select_filter)
+        batch = reader.get_batch(position)
+        dictionaries = self._dictionaries[month_key(quote_datetime)]
+        columns = ArrowColumns(batch, dictionaries)
+        expirations = np.asarray(columns['expiration'], dtype='M8[D]')
+        unique_expirations, starts = np.unique(expirations, return_index=True)
+        chain_index = ChainIndex(expirations=unique_expirations, bounds=np.append(starts, len(expirations)),
+                                 order=np.arange(len(expirations)), strikes=columns['strike'])
+        first_expiration, last_expiration = select_filter.expiration_days(quote_datetime)
+        low_strike, high_strike = select_filter.strike_range(float(columns['spot_price'][0]))
+        selected = chain_index.select(first_expiration, last_expiration, low_strike, high_strike)
+        return Timeslot(self.symbol, quote_datetime,
+                        _columns=ArrowColumns(batch.take(pa.array(selected)), dictionaries))
+
+    def write_timeslots(self, timeslots: Iterable[Timeslot]) -> None:
+        self.folder.mkdir(parents=True, exist_ok=True)
+        options = pa.ipc.IpcWriteOptions(compression=self.compression, emit_dictionary_deltas=True)
+        writer, month, schema, dictionaries = None, None, None, None
+        try:
+            for timeslot in timeslots:
+                if len(timeslot) == 0:
+                    continue
+                if month_key(timeslot.quote_datetime) != month:
+                    self._close_writer(writer, month)
+                    month = month_key(timeslot.quote_datetime)
+                    dictionaries = {}
+                    batch = self._to_record_batch(timeslot, dictionaries=dictionaries)
+                    schema = batch.schema.with_metadata({'symbol': self.symbol, 'sorted': 'expiration,strike',
+                                                         'encoding': self.encoding})
+                    self._months.pop(month, None)
+                    writer = pa.ipc.new_file(str(self.month_file(month)) + '.tmp', schema, options=options)
+                else:
+                    batch = self._to_record_batch(timeslot, schema, dictionaries)
+                writer.write_batch(batch)
+        finally:
+            self._close_writer(writer, month)
+            self.index.invalidate()
+
+    def _close_writer(self, writer: pa.ipc.RecordBatchFileWriter | None, month: str | None) -> None:
+        if writer is None:
+            return
+        writer.close()
+        os.replace(str(self.month_file(month)) + '.tmp', self.month_file(month))
+
+    def _to_record_batch(self, timeslot: Timeslot, schema: pa.Schema = None,
+                         dictionaries: dict[str, tuple[pd.Index, pa.Array]] = None) -> pa.RecordBatch:
+        columns = timeslot.columns
+        order = timeslot.chain_index.order
+        quote_datetimes = np.full(len(timeslot), np.datetime64(timeslot.quote_datetime, 'us'))
+        names = ['quote_datetime'] + list(columns) if schema is None else schema.names
+        arrays = [pa.array(quote_datetimes) if name == 'quote_datetime'
+                  else self._to_array(name, np.asarray(columns[name])[order], dictionaries) for name in names]
+        if schema is None:
+            fields = [pa.field(name, array.type, metadata={'scale': str(SCALE)} if self._is_scaled(name) else None)
+                      for name, array in zip(names, arrays)]
+            return pa.RecordBatch.from_arrays(arrays, schema=pa.schema(fields))
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    def _is_scaled(self, name: str) -> bool:
+        return self.encoding == 'compact' and name in SCALED_FIELDS
+
+    def _to_array(self, name: str, values: np.ndarray, dictionaries: dict[str, tuple[pd.Index, pa.Array]]) \
+            -> pa.Array:
+        if self.encoding != 'compact':
+            return pa.array(values)
+        if name in DICTIONARY_FIELDS:
+            return self._to_dictionary_array(name, values, dictionaries)
+        if name in SCALED_FIELDS:
+            values = values.astype(np.float64)
+            missing = np.isnan(values)
+            values = np.where(missing, 0.0, values)
+            scaled = np.round(values * SCALE)
+            # float noise from arithmetic in the source data, such as a mid price of 21.200000000000003, is dropped
+            if np.abs(scaled).max(initial=0) > INT32_MAX or np.abs(scaled / SCALE - values).max(initial=0) > 1e-9:
+                raise ValueError(f'{name} values cannot be stored as int32 with 4 decimal places. '
+                                 f'Use the plain arrow encoding.')
+            return pa.array(scaled.astype(np.int32), mask=missing)
+        if values.dtype.kind == 'i':
+            if np.abs(values).max(initial=0) > INT32_MAX:
+                raise ValueError(f'{name} values are too large for int32. Use the plain arrow encoding.')
+            return pa.array(values.astype(np.int32))
+        return pa.array(values)
+
+    @staticmethod
+    def _to_dictionary_array(name: str, values: np.ndarray, dictionaries: dict[str, tuple[pd.Index, pa.Array]]) \
+            -> pa.DictionaryArray:
+        # dates are looked up as day numbers and stored as a date32 dictionary
+        is_date = values.dtype.kind == 'M'
+        keys = values.astype('M8[D]').astype(np.int64) if is_date else values
+        index, dictionary = dictionaries.get(name, (pd.Index([]), None))
+        codes = index.get_indexer(keys)
+        if dictionary is None or (codes < 0).any():
+            # the dictionary of the month only grows, so the writer emits the new values as a delta
+            index = index.append(pd.Index(pd.unique(keys[codes < 0])))
+            dictionary_values = index.to_numpy()
+            dictionary = pa.array(dictionary_values.astype(np.int64).astype('M8[D]') if is_date
+                                  else dictionary_values.astype(str))
+            dictionaries[name] = (index, dictionary)
+            codes = index.get_indexer(keys)
+        return pa.DictionaryArray.from_arrays(pa.array(codes, type=pa.int32()), dictionary)
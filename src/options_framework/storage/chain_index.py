@@ -0,0 +1,206 @@
+import bisect
+import datetime
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+
+import numpy as np
+
+
+@dataclass(repr=False, slots=True)
+class ChainIndex:
+    """
+    An index of the expirations and strikes in a timeslot.
+    The rows are sorted once by (expiration, strike). Each expiration is a contiguous range of the
+    sorted rows, so the strikes of an expiration and the rows that hold them are slices of the sorted arrays.
+    """
+    expirations: np.ndarray
+    """unique expirations as datetime64[D], ascending"""
+    bounds: np.ndarray
+    """the sorted rows of expirations[i] are order[bounds[i]:bounds[i + 1]]"""
+    order: np.ndarray
+    """row numbers of the timeslot sorted by (expiration, strike)"""
+    strikes: np.ndarray
+    """strike of each sorted row"""
+    _expiration_list: list[datetime.date] | None = field(default=None)
+    _expiration_strikes: dict[datetime.date, list[float]] | None = field(default=None)
+
+    def __repr__(self) -> str:
+        return f'<ChainIndex expirations={len(self.expirations)} rows={len(self.order)}>'
+
+    @property
+    def nbytes(self) -> int:
+        """The size of the index arrays in bytes"""
+        return self.expirations.nbytes + self.bounds.nbytes + self.order.nbytes + self.strikes.nbytes
+
+    @classmethod
+    def from_columns(cls, columns: Mapping) -> 'ChainIndex':
+        """
+        :param columns: mapping of field name to numpy array. Only expiration and strike are used.
+        :return: the chain index for the columns
+        """
+        if 'expiration' not in columns:
+            empty = np.empty(0, dtype=np.int64)
+            return cls(expirations=np.empty(0, dtype='M8[D]'), bounds=np.zeros(1, dtype=np.int64), order=empty,
+                       strikes=np.empty(0, dtype=np.float64))
+        expirations = np.asarray(columns['expiration'], dtype='M8[D]')
+        strikes = np.asarray(columns['strike'])
+        order = np.lexsort((strikes, expirations))
+        sorted_expirations = expirations[order]
+        unique_expirations, starts = np.unique(sorted_expirations, return_index=True)
+        bounds = np.append(starts, len(order)).astype(np.int64)
+        return cls(expirations=unique_expirations, bounds=bounds, order=order, strikes=strikes[order])
+
+    @property
+    def expiration_list(self) -> list[datetime.date]:
+        """sorted list of the expiration dates"""
+        if self._expiration_list is None:
+            self._expiration_list = self.expirations.tolist()
+        return self._expiration_list
+
+    @property
+    def expiration_strikes(self) -> dict[datetime.date, list[float]]:
+        """dictionary of expiration date to the sorted list of distinct strikes for that expiration"""
+        if self._expiration_strikes is None:
+            strikes = self.strikes
+            # a sorted row starts a new (expiration, strike) pair if the strike changes or a new expiration starts
+            distinct = np.ones(len(strikes), dtype=bool)
+            distinct[1:] = strikes[1:] != strikes[:-1]
+            distinct[self.bounds[:-1]] = True
+            distinct_bounds = np.cumsum(np.concatenate([[0], distinct]))[self.bounds]
+            distinct_strikes = strikes[distinct].tolist()
+            self._expiration_strikes = {
+                expiration: distinct_strikes[distinct_bounds[i]:distinct_bounds[i + 1]]
+                for i, expiration in enumerate(self.expiration_list)}
+        return self._expiration_strikes
+
+    def rows(self, expiration: datetime.date) -> np.ndarray:
+        """
+        :param expiration: the expiration date
+        :return: row numbers of the options that expire on the date, sorted by strike. Empty if there are none.
+        """
+        i = np.searchsorted(self.expirations, np.datetime64(expiration, 'D'))
+        if i == len(self.expirations) or self.expirations[i] != np.datetime64(expiration, 'D'):
+            return self.order[:0]
+        return self.order[self.bounds[i]:self.bounds[i + 1]]
+
+    def nearest_expiration(self, expiration: datetime.date) -> datetime.date | None:
+        """
+        :return: the first expiration on or after the date, or None if all the expirations are before it
+        """
+        expirations = self.expiration_list
+        i = bisect.bisect_left(expirations, expiration)
+        return expirations[i] if i < len(expirations) else None
+
+    def strike_at_or_above(self, expiration: datetime.date, strike: float) -> float | None:
+        """
+        :return: the lowest strike of the expiration that is at or above the strike, or None
+        """
+        strikes = self.expiration_strikes.get(expiration, [])
+        i = bisect.bisect_left(strikes, strike)
+        return strikes[i] if i < len(strikes) else None
+
+    def strike_at_or_below(self, expiration: datetime.date, strike: float) -> float | None:
+        """
+        :return: the highest strike of the expiration that is at or below the strike, or None
+        """
+        strikes = self.expiration_strikes.get(expiration, [])
+        i = bisect.bisect_right(strikes, strike)
+        return strikes[i - 1] if i else None
+
+    def strike_rows(self, expiration: datetime.date, strike: float) -> np.ndarray:
+        """
+        :return: row numbers of the options with the expiration and the strike, usually a call and a put
+        """
+        i = np.searchsorted(self.expirations, np.datetime64(expiration, 'D'))
+        if i == len(self.expirations) or self.expirations[i] != np.datetime64(expiration, 'D'):
+            return self.order[:0]
+        start, end = self.bounds[i], self.bounds[i + 1]
+        strikes = self.strikes[start:end]
+        return self.order[start + np.searchsorted(strikes, strike, side='left'):
+                          start + np.searchsorted(strikes, strike, side='right')]
+
+    def select(self, first_expiration: float, last_expiration: float, low_strike: float, high_strike: float) \
+            -> np.ndarray:
+        """
+        Finds the rows in an expiration range and a strike range with binary searches.
+        :param first_expiration: the first expiration, in days since 1970-01-01
+        :param last_expiration: the last expiration, in days since 1970-01-01
+        :param low_strike: the lowest strike
+        :param high_strike: the highest strike
+        :return: row numbers of the options in both ranges, sorted by (expiration, strike)
+        """
+        days = self.expirations.astype(np.int64)
+        first = np.searchsorted(days, first_expiration, side='left')
+        last = np.searchsorted(days, last_expiration, side='right')
+        parts = []
+        for i in range(first, last):
+            start, end = self.bounds[i], self.bounds[i + 1]
+            strikes = self.strikes[start:end]
+            parts.append(self.order[start + np.searchsorted(strikes, low_strike, side='left'):
+                                    start + np.searchsorted(strikes, high_strike, side='right')])
+        return np.concatenate(parts) if parts else self.order[:0]
+
+
+@dataclass(repr=False, slots=True)
+class DeltaIndex:
+    """
+    The options of one expiration and option type of a timeslot, sorted by delta. Options without a delta are
+    left out. Options with the same delta keep their timeslot order, so a search returns the first of them,
+    the same option a stable sort of the chain by delta would put first.
+    """
+    deltas: np.ndarray
+    """deltas, ascending"""
+    rows: np.ndarray
+    """row number in the timeslot of each delta"""
+
+    def __repr__(self) -> str:
+        return f'<DeltaIndex rows={len(self.rows)}>'
+
+    @property
+    def nbytes(self) -> int:
+        """The size of the index arrays in bytes"""
+        return self.deltas.nbytes + self.rows.nbytes
+
+    @classmethod
+    def from_columns(cls, columns: Mapping, rows: np.ndarray, option_type: str) -> 'DeltaIndex':
+        """
+        :param columns: mapping of field name to numpy array with the values of the rows. Only option_type and
+                        delta are used.
+        :param rows: the rows to index in timeslot order, usually the rows of one expiration
+        :param option_type: call or put
+        :return: the delta index of the rows that have the option type
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        if 'delta' not in columns or not len(rows):
+            return cls(deltas=np.empty(0, dtype=np.float64), rows=np.empty(0, dtype=np.int64))
+        deltas = np.asarray(columns['delta'], dtype=np.float64)
+        keep = (np.asarray(columns['option_type']) == option_type) & ~np.isnan(deltas)
+        rows, deltas = rows[keep], deltas[keep]
+        order = np.argsort(deltas, kind='stable')
+        return cls(deltas=deltas[order], rows=rows[order])
+
+    def rows_at_or_below(self, deltas) -> np.ndarray:
+        """
+        :param deltas: one target delta or an array of them
+        :return: for each target, the row of the option with the highest delta at or below it, or -1
+        """
+        targets = np.asarray(deltas, dtype=np.float64)
+        if not len(self.deltas):
+            return np.full(targets.shape, -1, dtype=np.int64)
+        i = np.searchsorted(self.deltas, targets, side='right') - 1
+        found = i >= 0
+        # the first of the options with that delta
+        i = np.searchsorted(self.deltas, self.deltas[np.maximum(i, 0)], side='left')
+        return np.where(found, self.rows[i], -1)
+
+    def rows_at_or_above(self, deltas) -> np.ndarray:
+        """
+        :param deltas: one target delta or an array of them
+        :return: for each target, the row of the option with the lowest delta at or above it, or -1
+        """
+        targets = np.asarray(deltas, dtype=np.float64)
+        if not len(self.deltas):
+            return np.full(targets.shape, -1, dtype=np.int64)
+        i = np.searchsorted(self.deltas, targets, side='left')
+        found = i < len(self.deltas)
+        return np.where(found, self.rows[np.minimum(i, len(self.deltas) - 1)], -1)
@@ -0,0 +1,124 @@
+import datetime
+import os
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from typing import ClassVar
+
+import numpy as np
+
+from options_framework.storage.numpy_store import NumpyTimeslotStore, StructuredColumns
+from options_framework.storage.timeslot import Timeslot, columns_to_records
+from options_framework.storage.timeslot_index import to_epoch_minutes
+from options_framework.storage.timeslot_store import StoreLocation, month_key
+
+
+@dataclass(slots=True)
+class ContractMonth:
+    """A memory-mapped month of contract series and its option_id index"""
+    rows: np.ndarray
+    option_ids: np.ndarray
+    offsets: np.ndarray
+
+
+@dataclass(repr=False)
+class ContractSeriesStore(StoreLocation):
+    """
+    A secondary layout of the option chain data, keyed by contract instead of by timeslot.
+    There is one file per month: contracts/YYYY_MM.series. It holds the quotes of every option sorted by
+    option_id and then by quote minute, so the quotes of one contract are a contiguous run of rows.
+    contracts/YYYY_MM.index.npz holds the sorted option ids, the row offset where each contract starts,
+    and the record layout.
+    Reading the quote of a held option is a binary search for the option id and one for the minute in a
+    memory-mapped file, so updating open positions only reads the rows of those contracts.
+    """
+
+    folder_name: ClassVar[str] = 'contracts'
+
+    _months: dict[str, ContractMonth | None] = field(init=False, default_factory=dict)
+
+    def __repr__(self) -> str:
+        return f'<ContractSeriesStore {self.symbol} {self.data_frequency}>'
+
+    def series_file(self, month: str):
+        return self.folder.joinpath(f'{month}.series')
+
+    def index_file(self, month: str):
+        return self.folder.joinpath(f'{month}.index.npz')
+
+    def _open_month(self, month: str) -> ContractMonth | None:
+        if month in self._months:
+            return self._months[month]
+        if not self.index_file(month).exists():
+            # months that have not been converted are remembered so the file system is only checked once
+            self._months[month] = None
+            return None
+        with np.load(self.index_file(month)) as index:
+            dtype = np.dtype([(str(name), str(type_)) for name, type_ in index['dtype']])
+            option_ids, offsets = index['option_ids'], index['offsets']
+        rows = np.memmap(self.series_file(month), dtype=dtype, mode='r') if offsets[-1] > 0 \
+            else np.empty(0, dtype=dtype)
+        contract_month = ContractMonth(rows=rows, option_ids=option_ids, offsets=offsets)
+        self._months[month] = contract_month
+        return contract_month
+
+    def get_records(self, quote_datetime: datetime.datetime, option_ids: list[str]) -> dict[str, dict] | None:
+        """
+        Reads the quotes of a few options for one quote datetime.
+        :param quote_datetime: the quote datetime
+        :param option_ids: the options to find
+        :return: dictionary of option_id to option dictionary, in the same form as the timeslot records.
+                 Options with no quote at that time are left out. Returns None if the month is not in the store.
+        """
+        contract_month = self._open_month(month_key(quote_datetime))
+        if contract_month is None:
+            return None
+        minute = to_epoch_minutes(quote_datetime)
+        keys = np.char.encode(np.array(option_ids, dtype=str), 'ascii')
+        contracts = np.searchsorted(contract_month.option_ids, keys)
+        rows = []
+        for contract, key in zip(contracts.tolist(), keys):
+            if contract == len(contract_month.option_ids) or contract_month.option_ids[contract] != key:
+                continue
+            start, end = contract_month.offsets[contract], contract_month.offsets[contract + 1]
+            row = start + np.searchsorted(contract_month.rows['minute'][start:end], minute)
+            if row < end and contract_month.rows['minute'][row] == minute:
+                rows.append(row)
+        columns = StructuredColumns(contract_month.rows[rows])
+        return {r['option_id']: r for r in columns_to_records(self.symbol, quote_datetime, columns)}
+
+    def write_timeslots(self, timeslots: Iterable[Timeslot]) -> None:
+        """
+        Writes the contract series for each month of the timeslots. Each month is sorted in memory, so the
+        timeslots of one month must fit in memory as structured arrays.
+        Timeslots must be supplied in quote datetime order.
+        """
+        self.folder.mkdir(parents=True, exist_ok=True)
+        month, option_dtype, dtype, parts = None, None, None, []
+        for timeslot in timeslots:
+            if month_key(timeslot.quote_datetime) != month:
+                self._write_month(month, parts)
+                month, parts = month_key(timeslot.quote_datetime), []
+                option_dtype = NumpyTimeslotStore.record_dtype(timeslot.columns)
+                dtype = np.dtype([('minute', 'i8')] + option_dtype.descr)
+            rows = np.empty(len(timeslot), dtype=dtype)
+            option_rows = NumpyTimeslotStore.to_structured_array(timeslot.columns, option_dtype)
+            for name in option_dtype.names:
+                rows[name] = option_rows[name]
+            rows['minute'] = to_epoch_minutes(timeslot.quote_datetime)
+            parts.append(rows)
+        self._write_month(month, parts)
+
+    def _write_month(self, month: str | None, parts: list[np.ndarray]) -> None:
+        if month is None:
+            return
+        rows = np.concatenate(parts)
+        rows = rows[np.lexsort((rows['minute'], rows['option_id']))]
+        option_ids, starts = np.unique(rows['option_id'], return_index=True)
+        self._months.pop(month, None)
+        tmp_file = str(self.series_file(month)) + '.tmp'
+        rows.tofile(tmp_file)
+        os.replace(tmp_file, self.series_file(month))
+        np.savez(self.index_file(month),
+                 option_ids=option_ids,
+                 offsets=np.append(starts, len(rows)).astype(np.int64),
+                 dtype=np.array([(name, rows.dtype[name].str) for name in rows.dtype.names]))
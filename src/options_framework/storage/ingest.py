@@ -0,0 +1,201 @@
+import argparse
+import datetime
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from options_framework.config import settings
+from options_framework.storage.pickle_store import PickleTimeslotStore
+from options_framework.storage.timeslot import Timeslot
+from options_framework.storage.timeslot_store import get_timeslot_store, copy_timeslots
+
+COLUMN_MAPPING = {
+    'quote_datetime': 'quote_datetime',
+    'option_id': 'option_id',
+    'root': 'symbol',
+    'strike': 'strike',
+    'expiration': 'expiration',
+    'option_type': 'option_type',
+    'active_underlying_price': 'spot_price',
+    'bid': 'bid',
+    'ask': 'ask',
+    'mid': 'price',
+    'delta': 'delta',
+    'gamma': 'gamma',
+    'theta': 'theta',
+    'vega': 'vega',
+    'rho': 'rho',
+    'open_interest': 'open_interest',
+    'trade_volume': 'volume',
+    'implied_volatility': 'implied_volatility',
+}
+"""Vendor CSV column name to option chain field name. Vendor columns that are not listed are ignored."""
+
+OPTION_TYPES = {'C': 'call', 'P': 'put', 'c': 'call', 'p': 'put', 'call': 'call', 'put': 'put'}
+
+TEXT_COLUMNS = ('option_id', 'root', 'option_type')
+INTEGER_FIELDS = ('open_interest', 'volume')
+
+
+def read_vendor_chunks(path: str | Path, chunksize: int = 500_000) -> Iterator[pd.DataFrame]:
+    """
+    Reads a vendor CSV export in chunks. Zip and gzip files are read without extracting them.
+    :param path: the CSV file
+    :param chunksize: the number of rows read at a time
+    :return: iterator of data frames with the columns renamed to the option chain field names
+    """
+    header = pd.read_csv(path, nrows=0).columns
+    usecols = [c for c in header if c in COLUMN_MAPPING]
+    dtype = {c: str for c in TEXT_COLUMNS if c in usecols}
+    with pd.read_csv(path, usecols=usecols, dtype=dtype, chunksize=chunksize) as reader:
+        for chunk in reader:
+            yield chunk.rename(columns=COLUMN_MAPPING)
+
+
+def chunk_to_timeslots(chunk: pd.DataFrame) -> Iterator[Timeslot]:
+    """
+    Splits a chunk of vendor rows into timeslots, one for each symbol and quote minute.
+    :param chunk: data frame with option chain field names, as returned by read_vendor_chunks
+    :return: iterator of timeslots, in quote datetime order for each symbol
+    """
+    if chunk.empty:
+        return
+    quote_datetimes = pd.to_datetime(chunk['quote_datetime']).dt.floor('min')
+    chunk = chunk.assign(quote_datetime=quote_datetimes).sort_values(['symbol', 'quote_datetime'], kind='stable')
+    columns = {}
+    for name in chunk.columns:
+        if name in ('quote_datetime', 'symbol'):
+            continue
+        values = chunk[name]
+        if name == 'expiration':
+            columns[name] = pd.to_datetime(values).to_numpy(dtype='datetime64[D]')
+        elif name == 'option_type':
+            mapped = values.map(OPTION_TYPES)
+            if mapped.isna().any():
+                raise ValueError(f'Unknown option types: {set(values[mapped.isna()])}')
+            columns[name] = mapped.to_numpy(dtype=str)
+        elif name == 'option_id':
+            columns[name] = values.to_numpy(dtype=str)
+        elif name in INTEGER_FIELDS:
+            columns[name] = values.fillna(0).to_numpy(dtype=np.int64)
+        else:
+            columns[name] = values.to_numpy(dtype=np.float64)
+
+    symbols = chunk['symbol'].to_numpy(dtype=str)
+    minutes = chunk['quote_datetime'].to_numpy(dtype='datetime64[m]')
+    starts = np.flatnonzero((symbols[1:] != symbols[:-1]) | (minutes[1:] != minutes[:-1])) + 1
+    bounds = np.concatenate([[0], starts, [len(chunk)]])
+    for start, end in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+        yield Timeslot(str(symbols[start]), minutes[start].astype(datetime.datetime),
+                       _columns={name: column[start:end] for name, column in columns.items()})
+
+
+def ingest_file(path: str | Path, data_frequency: str = None, options_directory: str | Path = None,
+                symbols: Iterable[str] = None, chunksize: int = 500_000) -> dict[str, int]:
+    """
+    Reads one vendor CSV export and writes its timeslots to pickle timeslot stores.
+    The file must be sorted by quote datetime. Only one chunk, and the rows of the last quote minute of the
+    previous chunk, are held in memory, so the size of the file does not matter.
+    :param path: the CSV file
+    :param data_frequency: the data frequency folder. Uses the "data_frequency" setting when not provided.
+    :param options_directory: the root data folder. Uses the "options_directory" setting when not provided.
+    :param symbols: only these symbols are written. All symbols are written when not provided.
+    :param chunksize: the number of rows read at a time
+    :return: the number of timeslots written for each symbol
+    """
+    symbols = None if symbols is None else set(symbols)
+    stores, last_written, counts = {}, {}, {}
+    carry = None
+    for chunk in read_vendor_chunks(path, chunksize):
+        if symbols is not None:
+            chunk = chunk[chunk['symbol'].isin(symbols)]
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        if chunk.empty:
+            carry = None
+            continue
+        # the last minute may continue in the next chunk, so it is written with the next chunk
+        quote_datetimes = pd.to_datetime(chunk['quote_datetime']).dt.floor('min')
+        last_minute = quote_datetimes == quote_datetimes.max()
+        carry, chunk = chunk[last_minute], chunk[~last_minute]
+        _write_timeslots(chunk_to_timeslots(chunk), stores, last_written, counts, data_frequency, options_directory)
+    if carry is not None and not carry.empty:
+        _write_timeslots(chunk_to_timeslots(carry), stores, last_written, counts, data_frequency, options_directory)
+    return counts
+
+
+def _write_timeslots(timeslots: Iterable[Timeslot], stores: dict[str, PickleTimeslotStore],
+                     last_written: dict[str, datetime.datetime], counts: dict[str, int],
+                     data_frequency: str, options_directory: str | Path) -> None:
+    # the timeslots of a sorted file come in quote datetime order, so only the last one of each symbol is kept
+    for timeslot in timeslots:
+        last = last_written.get(timeslot.symbol)
+        if last is not None and timeslot.quote_datetime <= last:
+            raise ValueError(f'{timeslot.symbol} {timeslot.quote_datetime} was found after {last}. '
+                             f'The file must be sorted by quote_datetime.')
+        last_written[timeslot.symbol] = timeslot.quote_datetime
+        if timeslot.symbol not in stores:
+            stores[timeslot.symbol] = PickleTimeslotStore(timeslot.symbol, data_frequency=data_frequency,
+                                                          options_directory=options_directory)
+        stores[timeslot.symbol].write_timeslots([timeslot])
+        counts[timeslot.symbol] = counts.get(timeslot.symbol, 0) + 1
+
+
+def ingest_files(paths: Iterable[str | Path], data_frequency: str = None, options_directory: str | Path = None,
+                 symbols: Iterable[str] = None, data_store: str = 'pickle', max_workers: int = None,
+                 chunksize: int = 500_000) -> dict[str, int]:
+    """
+    Ingests vendor CSV exports in parallel, one process per file, and optionally converts the result
+    to a columnar store. Files must not contain the same symbol and quote minute.
+    :param paths: the CSV files
+    :param data_frequency: the data frequency folder. Uses the "data_frequency" setting when not provided.
+    :param options_directory: the root data folder. Uses the "options_directory" setting when not provided.
+    :param symbols: only these symbols are written. All symbols are written when not provided.
+    :param data_store: "pickle", or "arrow" or "numpy" to convert the ingested timeslots to that store
+    :param max_workers: the number of processes. Defaults to the number of processors.
+    :param chunksize: the number of rows read at a time by each process
+    :return: the number of timeslots written for each symbol
+    """
+    data_frequency = settings['data_frequency'] if data_frequency is None else data_frequency
+    options_directory = settings['options_directory'] if options_directory is None else options_directory
+    symbols = None if symbols is None else list(symbols)
+    paths = list(paths)
+    counts = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(ingest_file, path, data_frequency, options_directory, symbols, chunksize)
+                   for path in paths]
+        for future in futures:
+            for symbol, count in future.result().items():
+                counts[symbol] = counts.get(symbol, 0) + count
+
+    if data_store != 'pickle':
+        for symbol in counts:
+            source = PickleTimeslotStore(symbol, data_frequency=data_frequency, options_directory=options_directory)
+            target = get_timeslot_store(symbol, data_store=data_store, data_frequency=data_frequency,
+                                        options_directory=options_directory)
+            copy_timeslots(source, target)
+    return counts
+
+
+def main(args: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(description='Build timeslot stores from vendor option chain CSV exports.')
+    parser.add_argument('files', nargs='+', help='CSV, zip or gzip files')
+    parser.add_argument('--data-frequency', default=None)
+    parser.add_argument('--options-directory', default=None)
+    parser.add_argument('--symbols', nargs='*', default=None)
+    parser.add_argument('--data-store', default='pickle', choices=['pickle', 'arrow', 'numpy'])
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunksize', type=int, default=500_000)
+    options = parser.parse_args(args)
+    counts = ingest_files(options.files, data_frequency=options.data_frequency,
+                          options_directory=options.options_directory, symbols=options.symbols,
+                          data_store=options.data_store, max_workers=options.workers, chunksize=options.chunksize)
+    for symbol, count in counts.items():
+        print(f'{symbol}: {count} timeslots')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+import datetime
+import os
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass, field
+from typing import ClassVar
+
+import numpy as np
+
+from options_framework.option_types import SelectFilter
+from options_framework.storage.chain_index import ChainIndex
+from options_framework.storage.timeslot import Timeslot, OPTION_FIELDS, SCALAR_FIELDS
+from options_framework.storage.timeslot_index import to_epoch_minutes
+from options_framework.storage.timeslot_store import TimeslotStore, month_key
+
+FIELD_TYPES = {
+    'option_id': 'S32',
+    'strike': 'f8',
+    'expiration': 'M8[D]',
+    'option_type': 'S4',
+    'spot_price': 'f8',
+    'bid': 'f8',
+    'ask': 'f8',
+    'price': 'f8',
+    'delta': 'f8',
+    'gamma': 'f8',
+    'theta': 'f8',
+    'vega': 'f8',
+    'rho': 'f8',
+    'open_interest': 'i8',
+    'volume': 'i8',
+    'implied_volatility': 'f8',
+}
+"""The record layout of the chain file. Fields that are not in the source data are left out."""
+
+
+class StructuredColumns(Mapping):
+    """
+    Read-only mapping of field name to numpy array over a slice of a structured array.
+    Numeric columns are strided views of the memory-mapped file. Text columns are
+    decoded to str the first time they are accessed.
+    """
+
+    def __init__(self, rows: np.ndarray):
+        self._rows = rows
+        self._decoded = {}
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        if name not in self._rows.dtype.names:
+            raise KeyError(name)
+        column = self._rows[name]
+        if column.dtype.kind != 'S':
+            return column
+        if name not in self._decoded:
+            self._decoded[name] = column.astype(str)
+        return self._decoded[name]
+
+    @property
+    def nbytes(self) -> int:
+        """The size of the rows, plus the text columns that have been decoded. Measuring it does not decode."""
+        return self._rows.nbytes + sum(a.nbytes for a in self._decoded.values())
+
+    def __iter__(self):
+        return iter(self._rows.dtype.names)
+
+    def __len__(self) -> int:
+        return len(self._rows.dtype.names)
+
+
+@dataclass(slots=True)
+class NumpyMonth:
+    """
+    A memory-mapped month file and its offsets index.
+    The statistics are None for month files written before the rows of each timeslot were sorted.
+    """
+    rows: np.ndarray
+    minutes: np.ndarray
+    offsets: np.ndarray
+    spots: np.ndarray | None = None
+    """spot price of each timeslot"""
+    expirations: np.ndarray | None = None
+    """unique expirations of every timeslot, one after the other, as days since the epoch"""
+    expiration_bounds: np.ndarray | None = None
+    """row bounds (relative to the start of the timeslot) of each expiration, len(expirations) + 1 per timeslot"""
+    segments: np.ndarray | None = None
+    """the expirations of timeslot i are expirations[segments[i]:segments[i + 1]]"""
+
+
+@dataclass(repr=False)
+class NumpyTimeslotStore(TimeslotStore):
+    """
+    Storage as one contiguous structured array per month: numpy/YYYY_MM.chain
+    The rows of each timeslot are stored together. A small index, numpy/YYYY_MM.index.npz, holds
+    the quote minutes (int64 minutes since the epoch), the row offset where each timeslot starts,
+    and the record layout.
+    The chain file is memory-mapped, so a timeslot is a slice of the map. Nothing is copied, and
+    concurrent backtests reading the same file share the operating system's page cache.
+    The rows of each timeslot are sorted by expiration and strike, and the index also holds the spot
+    price and the row range of each expiration of every timeslot. load_filtered uses these to read only
+    the rows that pass a SelectFilter.
+    """
+
+    folder_name: ClassVar[str] = 'numpy'
+
+    _months: dict[str, NumpyMonth] = field(init=False, default_factory=dict)
+
+    def chain_file(self, month: str):
+        return self.folder.joinpath(f'{month}.chain')
+
+    def index_file(self, month: str):
+        return self.folder.joinpath(f'{month}.index.npz')
+
+    def _open_month(self, month: str) -> NumpyMonth | None:
+        if month in self._months:
+            return self._months[month]
+        if not self.index_file(month).exists():
+            return None
+        with np.load(self.index_file(month)) as index:
+            dtype = np.dtype([(str(name), str(type_)) for name, type_ in index['dtype']])
+            minutes, offsets = index['minutes'], index['offsets']
+            statistics = {name: index[name] for name in ('spots', 'expirations', 'expiration_bounds', 'segments')
+                          if name in index.files}
+        rows = np.memmap(self.chain_file(month), dtype=dtype, mode='r') if offsets[-1] > 0 \
+            else np.empty(0, dtype=dtype)
+        numpy_month = NumpyMonth(rows=rows, minutes=minutes, offsets=offsets, **statistics)
+        self._months[month] = numpy_month
+        return numpy_month
+
+    def list_months(self) -> dict[str, int]:
+        return {f.name.split('.')[0]: f.stat().st_mtime_ns for f in self.folder.glob('*.index.npz')}
+
+    def scan_month(self, month: str) -> tuple[np.ndarray, np.ndarray]:
+        self._months.pop(month, None)
+        numpy_month = self._open_month(month)
+        return numpy_month.minutes, numpy_month.offsets[:-1]
+
+    def load_timeslot(self, quote_datetime: datetime.datetime) -> Timeslot:
+        numpy_month = self._open_month(month_key(quote_datetime))
+        if numpy_month is None:
+            raise self._not_found(quote_datetime)
+        i = self._find(numpy_month, quote_datetime)
+        rows = numpy_month.rows[numpy_month.offsets[i]:numpy_month.offsets[i + 1]]
+        return Timeslot(self.symbol, quote_datetime, _columns=StructuredColumns(rows))
+
+    def load_filtered(self, quote_datetime: datetime.datetime, select_filter: SelectFilter) -> Timeslot:
+        numpy_month = self._open_month(month_key(quote_datetime))
+        if numpy_month is None or numpy_month.segments is None:
+            return super().load_filtered(quote_datetime, select_filter)
+        i = self._find(numpy_month, quote_datetime)
+        rows = numpy_month.rows[numpy_month.offsets[i]:numpy_month.offsets[i + 1]]
+        first, last = numpy_month.segments[i], numpy_month.segments[i + 1]
+        # the rows are already sorted, so the chain index comes from the month statistics
+        # and the strike column of the memory map. Only the pages the binary searches touch are read.
+        chain_index = ChainIndex(expirations=numpy_month.expirations[first:last].astype('M8[D]'),
+                                 bounds=numpy_month.expiration_bounds[first + i:last + i + 1],
+                                 order=np.arange(len(rows)), strikes=rows['strike'])
+        first_expiration, last_expiration = select_filter.expiration_days(quote_datetime)
+        low_strike, high_strike = select_filter.strike_range(float(numpy_month.spots[i]))
+        selected = chain_index.select(first_expiration, last_expiration, low_strike, high_strike)
+        return Timeslot(self.symbol, quote_datetime, _columns=StructuredColumns(rows[selected]))
+
+    def _find(self, numpy_month: NumpyMonth, quote_datetime: datetime.datetime) -> int:
+        minute = to_epoch_minutes(quote_datetime)
+        i = np.searchsorted(numpy_month.minutes, minute)
+        if i == len(numpy_month.minutes) or numpy_month.minutes[i] != minute:
+            raise self._not_found(quote_datetime)
+        return i
+
+    def write_timeslots(self, timeslots: Iterable[Timeslot]) -> None:
+        self.folder.mkdir(parents=True, exist_ok=True)
+        month, dtype, f, index = None, None, None, None
+        try:
+            for timeslot in timeslots:
+                if month_key(timeslot.quote_datetime) != month:
+                    self._close_month(f, month, dtype, index)
+                    month = month_key(timeslot.quote_datetime)
+                    dtype = self.record_dtype(timeslot.columns)
+                    index = {'minutes': [], 'offsets': [0], 'spots': [], 'expirations': [],
+                             'expiration_bounds': [], 'segments': [0]}
+                    self._months.pop(month, None)
+                    f = open(str(self.chain_file(month)) + '.tmp', 'wb')
+                chain_index = timeslot.chain_index
+                rows = self.to_structured_array(timeslot.columns, dtype)[chain_index.order]
+                f.write(rows.tobytes())
+                index['minutes'].append(to_epoch_minutes(timeslot.quote_datetime))
+                index['offsets'].append(index['offsets'][-1] + len(rows))
+                index['spots'].append(np.nan if timeslot.spot_price is None else timeslot.spot_price)
+                index['expirations'].extend(chain_index.expirations.astype(np.int64).tolist())
+                index['expiration_bounds'].extend(chain_index.bounds.tolist())
+                index['segments'].append(len(index['expirations']))
+        finally:
+            self._close_month(f, month, dtype, index)
+            self.index.invalidate()
+
+    def _close_month(self, f, month: str | None, dtype: np.dtype, index: dict[str, list] | None) -> None:
+        if f is None:
+            return
+        f.close()
+        os.replace(str(self.chain_file(month)) + '.tmp', self.chain_file(month))
+        np.savez(self.index_file(month),
+                 minutes=np.array(index['minutes'], dtype=np.int64),
+                 offsets=np.array(index['offsets'], dtype=np.int64),
+                 spots=np.array(index['spots'], dtype=np.float64),
+                 expirations=np.array(index['expirations'], dtype=np.int64),
+                 expiration_bounds=np.array(index['expiration_bounds'], dtype=np.int64),
+                 segments=np.array(index['segments'], dtype=np.int64),
+                 dtype=np.array([(name, dtype[name].str) for name in dtype.names]))
+
+    @staticmethod
+    def record_dtype(columns: Mapping) -> np.dtype:
+        return np.dtype([(name, FIELD_TYPES[name]) for name in OPTION_FIELDS
+                         if name in columns and name not in SCALAR_FIELDS])
+
+    @staticmethod
+    def to_structured_array(columns: Mapping, dtype: np.dtype) -> np.ndarray:
+        rows = np.empty(len(columns['option_id']), dtype=dtype)
+        for name in dtype.names:
+            column = np.asarray(columns[name])
+            if dtype[name].kind == 'S':
+                column = np.char.encode(column.astype(str), 'ascii')
+                if column.dtype.itemsize > dtype[name].itemsize:
+                    raise ValueError(f'{name} values are longer than {dtype[name].itemsize} characters.')
+            rows[name] = column
+        return rows
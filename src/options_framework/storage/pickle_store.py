@@ -0,0 +1,48 @@
+import datetime
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+import dill as pickle
+import numpy as np
+
+from options_framework.storage.timeslot import Timeslot
+from options_framework.storage.timeslot_store import TimeslotStore, month_key
+
+
+@dataclass(repr=False)
+class PickleTimeslotStore(TimeslotStore):
+    """
+    The original storage format. Each timeslot is a pickled list of option dictionaries stored in
+    its own file: timeslots/YYYY_MM/YYYY_MM_DD_HH_MM.pkl
+    """
+
+    def list_months(self) -> dict[str, int]:
+        if not self.folder.exists():
+            return {}
+        return {f.name: f.stat().st_mtime_ns for f in self.folder.iterdir() if f.is_dir()}
+
+    def scan_month(self, month: str) -> tuple[np.ndarray, np.ndarray]:
+        # file names are YYYY_MM_DD_HH_MM. Convert them to YYYY-MM-DDTHH:MM so numpy can parse them all at once.
+        stems = [f.stem for f in self.folder.joinpath(month).glob('*.pkl')]
+        iso_datetimes = [f'{s[0:4]}-{s[5:7]}-{s[8:10]}T{s[11:13]}:{s[14:16]}' for s in stems]
+        minutes = np.array(iso_datetimes, dtype='M8[m]').astype(np.int64)
+        return minutes, np.arange(len(minutes))
+
+    def load_timeslot(self, quote_datetime: datetime.datetime) -> Timeslot:
+        ts_file = self.folder.joinpath(month_key(quote_datetime),
+                                       f'{datetime.datetime.strftime(quote_datetime, "%Y_%m_%d_%H_%M")}.pkl')
+        try:
+            with open(ts_file, 'rb') as f:
+                options_data = pickle.load(f)
+        except FileNotFoundError:
+            raise self._not_found(quote_datetime)
+        return Timeslot(self.symbol, quote_datetime, _records=options_data)
+
+    def write_timeslots(self, timeslots: Iterable[Timeslot]) -> None:
+        for timeslot in timeslots:
+            folder = self.folder.joinpath(month_key(timeslot.quote_datetime))
+            folder.mkdir(parents=True, exist_ok=True)
+            ts_file = folder.joinpath(f'{datetime.datetime.strftime(timeslot.quote_datetime, "%Y_%m_%d_%H_%M")}.pkl')
+            with open(ts_file, 'wb') as f:
+                pickle.dump(timeslot.records, f)
+        self.index.invalidate()
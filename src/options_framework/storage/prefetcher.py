@@ -0,0 +1,80 @@
+import datetime
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from options_framework.storage.timeslot import Timeslot
+
+
+@dataclass(repr=False)
+class TimeslotPrefetcher:
+    """
+    Loads upcoming timeslots on a background thread while the strategy works on the current one.
+    All loads, including a timeslot that was not prefetched and other store calls made with run, run on the same
+    single worker thread, so the store is never used by two threads at once. At most "depth" timeslots are waiting at any time.
+    """
+
+    load: Callable[[datetime.datetime], Timeslot]
+    depth: int = field(default=2)
+    decode: bool = field(default=True)
+    """build the option records on the worker thread as well"""
+    _executor: ThreadPoolExecutor = field(init=False, default=None)
+    _pending: dict[datetime.datetime, Future] = field(init=False, default_factory=dict)
+
+    def __post_init__(self):
+        if self.depth < 1:
+            raise ValueError('Prefetch depth must be at least 1.')
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='timeslot-prefetch')
+
+    def __repr__(self) -> str:
+        return f'<TimeslotPrefetcher depth={self.depth} pending={len(self._pending)}>'
+
+    def _load(self, quote_datetime: datetime.datetime) -> Timeslot:
+        timeslot = self.load(quote_datetime)
+        if self.decode and timeslot is not None:
+            timeslot.build_records()
+        return timeslot
+
+    def get(self, quote_datetime: datetime.datetime) -> Timeslot:
+        """
+        :return: the timeslot for the quote datetime. Waits for it if it is still being loaded.
+        """
+        if self._executor is None:
+            return self.load(quote_datetime)
+        future = self._pending.pop(quote_datetime, None)
+        if future is None:
+            future = self._executor.submit(self._load, quote_datetime)
+        return future.result()
+
+    def run(self, function: Callable, *args):
+        """
+        Calls the function on the worker thread, after the loads already queued, and waits for its result.
+        Use it for any other call to the store the prefetcher loads from.
+        """
+        if self._executor is None:
+            return function(*args)
+        return self._executor.submit(function, *args).result()
+
+    def prefetch(self, quote_datetimes: list[datetime.datetime]) -> None:
+        """
+        Starts loading the next timeslots. Timeslots that were being prefetched and are not in the list are dropped.
+        :param quote_datetimes: the upcoming quote datetimes, in order. Only the first "depth" are loaded.
+        """
+        if self._executor is None:
+            return
+        quote_datetimes = quote_datetimes[:self.depth]
+        for quote_datetime in [d for d in self._pending if d not in quote_datetimes]:
+            self._pending.pop(quote_datetime).cancel()
+        for quote_datetime in quote_datetimes:
+            if quote_datetime not in self._pending:
+                self._pending[quote_datetime] = self._executor.submit(self._load, quote_datetime)
+
+    def close(self) -> None:
+        """
+        Stops the worker thread. Timeslots that have not started loading are cancelled.
+        """
+        if self._executor is None:
+            return
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._executor = None
+        self._pending.clear()
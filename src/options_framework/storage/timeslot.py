@@ -0,0 +1,268 @@
+import datetime
+import itertools
+import sys
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from options_framework.option_types import SelectFilter, EPOCH
+from options_framework.storage.chain_index import ChainIndex, DeltaIndex
+
+OPTION_FIELDS = ('quote_datetime', 'option_id', 'symbol', 'strike', 'expiration', 'option_type', 'spot_price',
+                 'bid', 'ask', 'price', 'delta', 'gamma', 'theta', 'vega', 'rho', 'open_interest', 'volume',
+                 'implied_volatility')
+"""The fields of an option chain row, in the order they are stored in the legacy pickle files"""
+
+EPOCH_ORDINAL = EPOCH.toordinal()
+
+SCALAR_FIELDS = ('quote_datetime', 'symbol')
+"""Fields that have the same value for every row of a timeslot. They are not stored as columns."""
+
+
+@dataclass(repr=False, slots=True)
+class Timeslot:
+    """
+    A Timeslot holds all the option quotes of one symbol for a single quote datetime.
+    The quotes can be read as columns (a mapping of field name to numpy array) or as records
+    (a list of dictionaries, one per option, as used by Option(**record)).
+    Whichever form the timeslot was created with, the other form is only built when it is first used.
+    Rows can be looked up by option_id, by expiration and strike through the chain index, or by delta
+    through the delta index of an expiration and option type. The indexes are also built when they are first used.
+    """
+    symbol: str
+    quote_datetime: datetime.datetime
+    _columns: Mapping | None = field(default=None)
+    _records: list[dict] | None = field(default=None)
+    _row_index: dict[str, int] | None = field(init=False, default=None)
+    _chain_index: ChainIndex | None = field(init=False, default=None)
+    _delta_indexes: dict[tuple[datetime.date, str], DeltaIndex] | None = field(init=False, default=None)
+
+    def __post_init__(self):
+        if self._columns is None and self._records is None:
+            raise ValueError("A timeslot must be created with either columns or records")
+
+    def __repr__(self) -> str:
+        return f'<Timeslot {self.symbol} {self.quote_datetime} rows={len(self)}>'
+
+    def __len__(self) -> int:
+        if self._records is not None:
+            return len(self._records)
+        return len(self._columns['option_id'])
+
+    @property
+    def columns(self) -> Mapping:
+        if self._columns is None:
+            self._columns = records_to_columns(self._records)
+        return self._columns
+
+    @property
+    def records(self) -> list[dict]:
+        return self.build_records()
+
+    def build_records(self) -> list[dict]:
+        """
+        Builds the records from the columns, if they have not been built yet. Call it to pay for the
+        records when the timeslot is loaded rather than when the options are first read.
+        :return: the records
+        """
+        if self._records is None:
+            self._records = columns_to_records(self.symbol, self.quote_datetime, self._columns)
+        return self._records
+
+    @property
+    def row_index(self) -> dict[str, int]:
+        """Dictionary of option_id to the row number of that option in the timeslot"""
+        if self._row_index is None:
+            if self._records is not None:
+                option_ids = [r['option_id'] for r in self._records]
+            else:
+                option_ids = self._columns['option_id'].tolist()
+            self._row_index = {option_id: i for i, option_id in enumerate(option_ids)}
+        return self._row_index
+
+    @property
+    def chain_index(self) -> ChainIndex:
+        """The expirations, strikes and row ranges of the timeslot"""
+        if self._chain_index is None:
+            self._chain_index = ChainIndex.from_columns(self.field_columns(('expiration', 'strike')))
+        return self._chain_index
+
+    def field_columns(self, fields: tuple[str, ...]) -> Mapping:
+        """
+        :param fields: the fields to read
+        :return: mapping of field name to numpy array for the fields the timeslot has. If the columns have not
+                 been built, only these fields are converted from the records.
+        """
+        if self._columns is None:
+            return records_to_columns(self._records, fields)
+        return {name: self._columns[name] for name in fields if name in self._columns}
+
+    def get_record(self, option_id: str) -> dict | None:
+        """
+        :param option_id: the option to find
+        :return: the option dictionary for the option_id, or None if the option is not in the timeslot
+        """
+        i = self.row_index.get(option_id)
+        if i is None:
+            return None
+        return self.records[i]
+
+    def delta_index(self, expiration: datetime.date, option_type: str) -> DeltaIndex:
+        """
+        :return: the options of the expiration and option type sorted by delta. Each index is built the first
+                 time it is used and kept with the timeslot, so screening the same expiration again is a search.
+        """
+        if self._delta_indexes is None:
+            self._delta_indexes = {}
+        key = (expiration, option_type)
+        delta_index = self._delta_indexes.get(key)
+        if delta_index is None:
+            # only the option_type and delta of the rows of the expiration are read
+            rows, fields = np.sort(self.chain_index.rows(expiration)), ('option_type', 'delta')
+            if self._columns is None:
+                columns = records_to_columns([self._records[i] for i in rows], fields)
+            else:
+                columns = {name: self._columns[name][rows] for name in fields if name in self._columns}
+            delta_index = DeltaIndex.from_columns(columns, rows, option_type)
+            self._delta_indexes[key] = delta_index
+        return delta_index
+
+    def get_row(self, index: int) -> dict:
+        """
+        :param index: the row number in the timeslot
+        :return: the option dictionary of the row. If the records have not been built, only this row is built.
+        """
+        if self._records is not None:
+            return self._records[index]
+        if index < 0:
+            index += len(self)
+        columns = {name: self._columns[name][index:index + 1] for name in self._columns}
+        return columns_to_records(self.symbol, self.quote_datetime, columns)[0]
+
+    def get_records(self, option_ids: list[str]) -> dict[str, dict]:
+        """
+        Finds the quotes of a few options without building the records of the whole timeslot.
+        If the records have not been built, only the option_id column is searched and records are
+        built for the matching rows.
+        :param option_ids: the options to find
+        :return: dictionary of option_id to option dictionary. Options not in the timeslot are left out.
+        """
+        if self._records is not None or self._row_index is not None:
+            records = ((option_id, self.get_record(option_id)) for option_id in option_ids)
+            return {option_id: record for option_id, record in records if record is not None}
+        rows = np.flatnonzero(np.isin(self._columns['option_id'], list(option_ids)))
+        columns = {name: self._columns[name][rows] for name in self._columns}
+        return {r['option_id']: r for r in columns_to_records(self.symbol, self.quote_datetime, columns)}
+
+    def get_columns(self, option_ids: list[str]) -> dict[str, np.ndarray]:
+        """
+        Finds the quotes of a few options as columns, for updating many positions at once.
+        :param option_ids: the options to find
+        :return: dictionary of field name to numpy array, one row for each option that is in the timeslot.
+                 The rows are in timeslot order, not in the order of option_ids.
+        """
+        if self._columns is None:
+            return records_to_columns(list(self.get_records(option_ids).values()))
+        rows = np.flatnonzero(np.isin(self._columns['option_id'], list(option_ids)))
+        return {name: np.asarray(self._columns[name][rows]) for name in self._columns}
+
+    @property
+    def spot_price(self) -> float | None:
+        if len(self) == 0:
+            return None
+        if self._records is not None:
+            return self._records[0].get('spot_price')
+        return float(self._columns['spot_price'][0]) if 'spot_price' in self._columns else None
+
+    def select(self, select_filter: SelectFilter) -> 'Timeslot':
+        """
+        :param select_filter: the expiration and strike ranges to keep
+        :return: a timeslot with only the options that pass the filter
+        """
+        spot_price = self.spot_price
+        if spot_price is None:
+            return self
+        first_expiration, last_expiration = select_filter.expiration_days(self.quote_datetime)
+        low_strike, high_strike = select_filter.strike_range(spot_price)
+        if self._columns is None:
+            # records have already been built, so filtering them is cheaper than building columns
+            records = [r for r in self._records
+                       if first_expiration <= (r['expiration'] - EPOCH).days <= last_expiration
+                       and low_strike <= r['strike'] <= high_strike]
+            return Timeslot(self.symbol, self.quote_datetime, _records=records)
+        rows = self.chain_index.select(first_expiration, last_expiration, low_strike, high_strike)
+        return Timeslot(self.symbol, self.quote_datetime,
+                        _columns={name: self._columns[name][rows] for name in self._columns})
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The approximate size of the timeslot in bytes: its columns, its records and the indexes built so far.
+        The records are estimated from the first record, so neither form is built to measure it.
+        The lazy columns of the arrow and numpy stores measure their buffers, so no column is converted.
+        """
+        nbytes = 0
+        if self._columns is not None:
+            columns_nbytes = getattr(self._columns, 'nbytes', None)
+            if columns_nbytes is None:
+                columns_nbytes = sum(self._columns[name].nbytes for name in self._columns)
+            nbytes += columns_nbytes
+        if self._records:
+            record = self._records[0]
+            record_size = sys.getsizeof(record) + sum(sys.getsizeof(value) for value in record.values())
+            nbytes += sys.getsizeof(self._records) + len(self._records) * record_size
+        if self._row_index:
+            option_id = next(iter(self._row_index))
+            nbytes += sys.getsizeof(self._row_index) + len(self._row_index) * sys.getsizeof(option_id)
+        if self._chain_index is not None:
+            nbytes += self._chain_index.nbytes
+        if self._delta_indexes:
+            nbytes += sum(delta_index.nbytes for delta_index in self._delta_indexes.values())
+        return nbytes
+
+
+def records_to_columns(records: list[dict], fields: tuple[str, ...] = OPTION_FIELDS) -> dict[str, np.ndarray]:
+    """
+    Converts a list of option dictionaries into a dictionary of numpy arrays.
+    Expirations are stored as datetime64[D] so that they convert back to datetime.date.
+    :param records: list of option dictionaries for a single timeslot
+    :param fields: the fields to convert. All the fields by default.
+    :return: dictionary of field name to numpy array
+    """
+    if not records:
+        return {'option_id': np.array([], dtype=str)}
+    keys = [k for k in OPTION_FIELDS if k in fields and k in records[0] and k not in SCALAR_FIELDS]
+    columns = {}
+    for key in keys:
+        values = [r.get(key) for r in records]
+        if key == 'expiration':
+            # numpy converts date objects one at a time, their ordinals are converted as one array
+            ordinals = np.fromiter((value.toordinal() for value in values), dtype=np.int64, count=len(values))
+            columns[key] = (ordinals - EPOCH_ORDINAL).astype('datetime64[D]')
+        elif key in ('option_id', 'option_type'):
+            columns[key] = np.array(values, dtype=str)
+        else:
+            columns[key] = np.array(values)
+    return columns
+
+
+def columns_to_records(symbol: str, quote_datetime: datetime.datetime, columns: Mapping) -> list[dict]:
+    """
+    Converts a dictionary of columns back into a list of option dictionaries. The values are
+    converted to python types, so the records are the same as the ones stored in the pickle files.
+    :param symbol: the ticker symbol for every row
+    :param quote_datetime: the quote datetime for every row
+    :param columns: mapping of field name to numpy array
+    :return: list of option dictionaries
+    """
+    keys = [k for k in OPTION_FIELDS if k in SCALAR_FIELDS or k in columns]
+    values = []
+    for key in keys:
+        if key == 'quote_datetime':
+            values.append(itertools.repeat(quote_datetime))
+        elif key == 'symbol':
+            values.append(itertools.repeat(symbol))
+        else:
+            values.append(columns[key].tolist())
+    return [dict(zip(keys, row)) for row in zip(*values)]
@@ -0,0 +1,117 @@
+import datetime
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from options_framework.config import settings
+from options_framework.storage.timeslot import Timeslot
+from options_framework.storage.timeslot_store import TimeslotStore
+
+
+@dataclass(repr=False)
+class TimeslotCache:
+    """
+    A least recently used cache of loaded timeslots, keyed by the store they were read from (its type, options
+    directory, data frequency and symbol) and the quote datetime.
+    The size of the cache is limited in bytes, measured with Timeslot.nbytes. The records and indexes of a
+    cached timeslot can be built after it was added, so every entry is measured again when a timeslot is added.
+    When the cache is over its budget, the least recently used timeslots are evicted.
+    The cache can be used from more than one thread.
+    """
+
+    max_bytes: int
+    hits: int = field(init=False, default=0)
+    misses: int = field(init=False, default=0)
+    evictions: int = field(init=False, default=0)
+    current_bytes: int = field(init=False, default=0)
+    _entries: OrderedDict = field(init=False, default_factory=OrderedDict)
+    _lock: threading.Lock = field(init=False, default_factory=threading.Lock)
+
+    def __repr__(self) -> str:
+        return f'<TimeslotCache entries={len(self._entries)} bytes={self.current_bytes:,}/{self.max_bytes:,} ' \
+               f'hits={self.hits} misses={self.misses} evictions={self.evictions}>'
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _key(store: TimeslotStore, quote_datetime: datetime.datetime) -> tuple:
+        return type(store), str(store.options_directory), store.data_frequency, store.symbol, quote_datetime
+
+    def get(self, store: TimeslotStore, quote_datetime: datetime.datetime) -> Timeslot | None:
+        """
+        :return: the timeslot cached from the store, or None if it is not in the cache
+        """
+        key = self._key(store, quote_datetime)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, store: TimeslotStore, timeslot: Timeslot) -> None:
+        """
+        Adds a timeslot read from the store to the cache. A timeslot larger than the whole budget is not cached.
+        """
+        key = self._key(store, timeslot.quote_datetime)
+        size = timeslot.nbytes
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+            self._measure()
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (timeslot, size)
+            self.current_bytes += size
+            self._evict()
+
+    def resize(self, max_bytes: int) -> None:
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self) -> None:
+        """
+        Removes all the timeslots and resets the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+            self.hits, self.misses, self.evictions = 0, 0, 0
+
+    def stats(self) -> dict[str, int]:
+        return {'entries': len(self._entries), 'bytes': self.current_bytes, 'max_bytes': self.max_bytes,
+                'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+    def _measure(self) -> None:
+        for key, (timeslot, _) in self._entries.items():
+            self._entries[key] = (timeslot, timeslot.nbytes)
+        self.current_bytes = sum(size for _, size in self._entries.values())
+
+    def _evict(self) -> None:
+        while self.current_bytes > self.max_bytes and self._entries:
+            _, (_, size) = self._entries.popitem(last=False)
+            self.current_bytes -= size
+            self.evictions += 1
+
+
+_timeslot_cache: TimeslotCache | None = None
+
+
+def get_timeslot_cache() -> TimeslotCache | None:
+    """
+    The cache is shared by every option chain in the process. Its budget is the "timeslot_cache_bytes"
+    setting. Returns None when the setting is 0 or not set, which turns the cache off.
+    """
+    global _timeslot_cache
+    max_bytes = settings.get('timeslot_cache_bytes', 0)
+    if max_bytes <= 0:
+        return None
+    if _timeslot_cache is None:
+        _timeslot_cache = TimeslotCache(max_bytes)
+    elif _timeslot_cache.max_bytes != max_bytes:
+        _timeslot_cache.resize(max_bytes)
+    return _timeslot_cache
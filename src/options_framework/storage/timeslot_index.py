@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import datetime
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from options_framework.storage.timeslot_store import TimeslotStore
+
+
+def to_epoch_minutes(quote_datetime: datetime.datetime) -> int:
+    return int(np.datetime64(quote_datetime, 'm').astype(np.int64))
+
+
+def from_epoch_minutes(minutes: int) -> datetime.datetime:
+    return np.datetime64(int(minutes), 'm').astype(datetime.datetime)
+
+
+@dataclass(slots=True)
+class MonthEntry:
+    """The timeslots found in one month partition when it was last scanned"""
+    modified: int
+    minutes: np.ndarray
+    positions: np.ndarray
+
+
+@dataclass(repr=False)
+class TimeslotIndex:
+    """
+    A persisted, sorted index of every timeslot in a store.
+    Each timeslot is an int64 number of minutes since the epoch plus its position in the month file.
+    The index is saved to timeslot_index.npz in the store folder, so the directory tree is only walked once.
+    When the index is used, month partitions that are new or have been modified since they were
+    last scanned are scanned again. Date ranges are found with a binary search.
+    """
+
+    store: TimeslotStore
+    path: Path = field(init=False, default=None)
+    minutes: np.ndarray = field(init=False, default=None)
+    positions: np.ndarray = field(init=False, default=None)
+    _months: dict[str, MonthEntry] = field(init=False, default=None)
+
+    def __post_init__(self):
+        self.path = self.store.folder.joinpath('timeslot_index.npz')
+
+    def __repr__(self) -> str:
+        count = 0 if self.minutes is None else len(self.minutes)
+        return f'<TimeslotIndex {self.store.symbol} timeslots={count}>'
+
+    def refresh(self) -> None:
+        """
+        Brings the index up to date with the month partitions in the store.
+        """
+        if self._months is None:
+            self._months = self._load()
+        months = self.store.list_months()
+        changed = False
+        for month in [m for m in self._months if m not in months]:
+            del self._months[month]
+            changed = True
+        for month, modified in months.items():
+            entry = self._months.get(month)
+            if entry is not None and entry.modified == modified:
+                continue
+            minutes, positions = self.store.scan_month(month)
+            order = np.argsort(minutes, kind='stable')
+            self._months[month] = MonthEntry(modified=modified, minutes=np.asarray(minutes, dtype=np.int64)[order],
+                                             positions=np.asarray(positions, dtype=np.int64)[order])
+            changed = True
+
+        if changed or self.minutes is None:
+            self._months = dict(sorted(self._months.items()))
+            entries = list(self._months.values())
+            self.minutes = np.concatenate([e.minutes for e in entries]) if entries else np.empty(0, dtype=np.int64)
+            self.positions = np.concatenate([e.positions for e in entries]) if entries \
+                else np.empty(0, dtype=np.int64)
+        if changed:
+            self._save()
+
+    def invalidate(self) -> None:
+        """
+        Marks the index as out of date. It is refreshed the next time it is used.
+        """
+        self.minutes = None
+
+    def get_datetimes(self, start_datetime: datetime.datetime, end_datetime: datetime.datetime) \
+            -> list[datetime.datetime]:
+        """
+        :return: sorted list of the quote datetimes between the start and end datetimes (inclusive)
+        """
+        if self.minutes is None:
+            self.refresh()
+        start = np.searchsorted(self.minutes, to_epoch_minutes(start_datetime), side='left')
+        end = np.searchsorted(self.minutes, to_epoch_minutes(end_datetime), side='right')
+        return self.minutes[start:end].astype('M8[m]').tolist()
+
+    def find(self, quote_datetime: datetime.datetime) -> int | None:
+        """
+        :return: the position of the timeslot in its month file, or None if it is not in the index
+        """
+        if self.minutes is None:
+            self.refresh()
+        minute = to_epoch_minutes(quote_datetime)
+        i = np.searchsorted(self.minutes, minute)
+        if i == len(self.minutes) or self.minutes[i] != minute:
+            return None
+        return int(self.positions[i])
+
+    def _load(self) -> dict[str, MonthEntry]:
+        if not self.path.exists():
+            return {}
+        try:
+            with np.load(self.path) as index:
+                names, modified, counts = index['months'], index['modified'], index['counts']
+                minutes, positions = index['minutes'], index['positions']
+        except (OSError, ValueError, KeyError):
+            # a damaged index is rebuilt from the store
+            return {}
+        months = {}
+        bounds = np.concatenate([[0], np.cumsum(counts)])
+        for i, name in enumerate(names.tolist()):
+            months[name] = MonthEntry(modified=int(modified[i]),
+                                      minutes=minutes[bounds[i]:bounds[i + 1]],
+                                      positions=positions[bounds[i]:bounds[i + 1]])
+        return months
+
+    def _save(self) -> None:
+        tmp_path = self.path.with_name(f'{self.path.stem}.{os.getpid()}.tmp.npz')
+        try:
+            np.savez(tmp_path,
+                     months=np.array(list(self._months.keys()), dtype=str),
+                     modified=np.array([e.modified for e in self._months.values()], dtype=np.int64),
+                     counts=np.array([len(e.minutes) for e in self._months.values()], dtype=np.int64),
+                     minutes=self.minutes,
+                     positions=self.positions)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            # the data folder may be read only. The index still works, it just is not saved.
+            pass
@@ -0,0 +1,146 @@
+import datetime
+from abc import ABC, abstractmethod
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import ClassVar
+
+import numpy as np
+
+from options_framework.config import settings
+from options_framework.option_types import SelectFilter
+from options_framework.storage.timeslot import Timeslot
+from options_framework.storage.timeslot_index import TimeslotIndex
+
+
+def month_key(quote_datetime: datetime.datetime | datetime.date) -> str:
+    """
+    :return: the name used for the month partition of a quote date, for example 2016_04
+    """
+    return f'{quote_datetime.year:04d}_{quote_datetime.month:02d}'
+
+
+@dataclass(repr=False)
+class StoreLocation:
+    """
+    The folder of the files a store keeps for one symbol: options_directory/data_frequency/symbol/folder_name.
+    The data frequency and options directory default to the "data_frequency" and "options_directory" settings.
+    """
+
+    folder_name: ClassVar[str]
+
+    symbol: str
+    data_frequency: str = field(default=None)
+    options_directory: str | Path = field(default=None)
+    folder: Path = field(init=False, default=None)
+
+    def __post_init__(self):
+        self.data_frequency = settings['data_frequency'] if self.data_frequency is None else self.data_frequency
+        self.options_directory = settings['options_directory'] if self.options_directory is None \
+            else self.options_directory
+        self.folder = Path(self.options_directory, self.data_frequency, self.symbol, self.folder_name)
+
+
+@dataclass(repr=False)
+class TimeslotStore(StoreLocation, ABC):
+    """
+    A TimeslotStore reads and writes the option chain data for one symbol. The data is organized
+    in timeslots: all the option quotes for a single quote datetime.
+    Each storage format is implemented as a subclass. The store is selected with the "data_store" setting.
+    The files for a store are kept in: options_directory/data_frequency/symbol/folder_name
+    """
+
+    folder_name: ClassVar[str] = 'timeslots'
+
+    index: TimeslotIndex = field(init=False, default=None)
+
+    def __post_init__(self):
+        super().__post_init__()
+        self.index = TimeslotIndex(self)
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} {self.symbol} {self.data_frequency}>'
+
+    def get_datetimes(self, start_datetime: datetime.datetime, end_datetime: datetime.datetime) \
+            -> list[datetime.datetime]:
+        """
+        :return: sorted list of all the quote datetimes in the store between the start and end datetimes (inclusive)
+        """
+        return self.index.get_datetimes(start_datetime, end_datetime)
+
+    @abstractmethod
+    def list_months(self) -> dict[str, int]:
+        """
+        :return: the month partitions in the store, with the time (in nanoseconds) each was last modified
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def scan_month(self, month: str) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Reads the timeslots in a month partition. This is used to build the timeslot index.
+        :return: the quote minutes (minutes since the epoch) and the position of each timeslot in the month file
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def load_timeslot(self, quote_datetime: datetime.datetime) -> Timeslot:
+        """
+        Loads all the option quotes for a quote datetime.
+        Raises a ValueError if the timeslot is not in the store.
+        """
+        raise NotImplementedError
+
+    def load_filtered(self, quote_datetime: datetime.datetime, select_filter: SelectFilter) -> Timeslot:
+        """
+        Loads the option quotes for a quote datetime that pass the filter.
+        Stores that keep the rows of a timeslot sorted by expiration and strike override this to read only
+        the rows in range. This version loads the whole timeslot and then filters it.
+        """
+        return self.load_timeslot(quote_datetime).select(select_filter)
+
+    @abstractmethod
+    def write_timeslots(self, timeslots: Iterable[Timeslot]) -> None:
+        """
+        Writes timeslots to the store. Timeslots must be supplied in quote datetime order.
+        """
+        raise NotImplementedError
+
+    def iter_timeslots(self, start_datetime: datetime.datetime = datetime.datetime.min,
+                       end_datetime: datetime.datetime = datetime.datetime.max) -> Iterator[Timeslot]:
+        for quote_datetime in self.get_datetimes(start_datetime, end_datetime):
+            yield self.load_timeslot(quote_datetime)
+
+    def _not_found(self, quote_datetime: datetime.datetime) -> ValueError:
+        return ValueError(f'Cannot find option chain for {self.symbol} on {quote_datetime}.')
+
+
+def get_timeslot_store(symbol: str, data_store: str = None, **kwargs) -> TimeslotStore:
+    """
+    Creates the timeslot store for a symbol.
+    :param symbol: the ticker symbol
+    :param data_store: the storage format: "pickle", "arrow" or "numpy". Uses the "data_store" setting when not provided.
+    :param kwargs: additional arguments for the store, such as data_frequency and options_directory
+    :return: a TimeslotStore
+    """
+    data_store = settings.get('data_store', 'pickle') if data_store is None else data_store
+    if data_store == 'pickle':
+        from options_framework.storage.pickle_store import PickleTimeslotStore
+        return PickleTimeslotStore(symbol, **kwargs)
+    elif data_store == 'arrow':
+        from options_framework.storage.arrow_store import ArrowTimeslotStore
+        return ArrowTimeslotStore(symbol, **kwargs)
+    elif data_store == 'numpy':
+        from options_framework.storage.numpy_store import NumpyTimeslotStore
+        return NumpyTimeslotStore(symbol, **kwargs)
+    raise ValueError(f'Unknown data store: {data_store}')
+
+
+def copy_timeslots(source: TimeslotStore, target: TimeslotStore,
+                   start_datetime: datetime.datetime = datetime.datetime.min,
+                   end_datetime: datetime.datetime = datetime.datetime.max) -> None:
+    """
+    Copies timeslots from one store to another. This is used to convert existing pickle files
+    to another storage format.
+    """
+    target.write_timeslots(source.iter_timeslots(start_datetime, end_datetime))
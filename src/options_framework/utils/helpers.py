@@ -2,6 +2,8 @@ from decimal import Context, Decimal, getcontext
 from pathlib import Path
 import os
 
+import numpy as np
+
 
 def decimalize_0(value: int | float | Decimal) -> Decimal:
     """
@@ -36,6 +38,52 @@ def decimalize_4(value: float | Decimal) -> Decimal:
     quantize_val = dec_val.quantize(Decimal('1.0000'))
     return quantize_val
 
+def cents(value: int | float | Decimal) -> int:
+    """
+    Integer form of decimalize_2. The value is converted to whole cents and rounded the same way as decimalize_2,
+    so integer arithmetic on the result gives the same numbers as Decimal arithmetic on decimalize_2(value).
+    Values that are within floating point error of half a cent are rounded with Decimal.
+    :param value: the number to convert
+    :return: the value in cents
+    """
+    if type(value) is int:
+        return value * 100
+    if isinstance(value, float):
+        scaled = value * 100
+        rounded = round(scaled)
+        # near half a cent the product may have been rounded to the other side, and large values lose precision
+        if abs(scaled - rounded) < 0.499999 and -2 ** 31 < scaled < 2 ** 31:
+            return rounded
+    return int(decimalize_2(value).scaleb(2))
+
+def whole(value: int | float | Decimal) -> int:
+    """
+    Integer form of decimalize_0.
+    :param value: the number to convert
+    :return: the value rounded to a whole number the same way as decimalize_0
+    """
+    if type(value) is int:
+        return value
+    if isinstance(value, float):
+        return round(value)
+    return int(decimalize_0(value))
+
+def to_cents(values: np.ndarray) -> np.ndarray:
+    """
+    Vectorised form of decimalize_2 for arrays of prices. Each value is rounded the same way as
+    decimalize_2: the exact binary value is rounded half to even. Values that are within floating point
+    error of half a cent are rounded with Decimal, so the result always matches decimalize_2.
+    :param values: array of floating point numbers
+    :return: float array of the values in whole cents
+    """
+    values = np.asarray(values, dtype=np.float64)
+    scaled = values * 100
+    cents = np.rint(scaled)
+    near_half = np.flatnonzero(np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < 1e-6)
+    for i in near_half.tolist():
+        cents[i] = float(decimalize_2(float(values[i])).scaleb(2))
+    return cents
+
 def distinct(iterable: list) -> list:
     """
     Returns a list of distinct items from a given iterable
@@ -0,0 +1,58 @@
+"""
+Compares the cost of one event emit through pydispatch, which options and the portfolio used before, with the
+cost through EventBus. Run it from the repository root:
+
+    python tests/benchmarks/bench_event_bus.py
+
+The file name does not match test_*.py, so pytest does not collect it.
+"""
+import timeit
+
+from pydispatch import Dispatcher
+
+from options_framework.event_bus import EventBus
+
+EMITS = 500_000
+REPEATS = 5
+
+
+class Emitter(Dispatcher):
+    _events_ = ['option_transaction']
+
+
+class Listener:
+
+    def on_option_transaction(self, option, quantity):
+        pass
+
+
+def best_of(stmt) -> float:
+    """
+    :param stmt: the callable that emits one event
+    :return: the best time of one emit, in microseconds
+    """
+    return min(timeit.repeat(stmt, number=EMITS, repeat=REPEATS)) / EMITS * 1_000_000
+
+
+def main():
+    listener = Listener()
+
+    emitter = Emitter()
+    silent_emitter = Emitter()
+    emitter.bind(option_transaction=listener.on_option_transaction)
+
+    event_bus = EventBus()
+    event_bus.subscribe('option_transaction', listener.on_option_transaction)
+
+    results = {
+        'pydispatch emit, 1 listener': best_of(lambda: emitter.emit('option_transaction', None, 1)),
+        'pydispatch emit, no listener': best_of(lambda: silent_emitter.emit('option_transaction', None, 1)),
+        'EventBus.emit, 1 handler': best_of(lambda: event_bus.emit('option_transaction', None, 1)),
+    }
+    print(f'{EMITS:,} emits, best of {REPEATS}')
+    for name, micros in results.items():
+        print(f'  {name:<30} {micros:6.2f} us')
+
+
+if __name__ == '__main__':
+    main()
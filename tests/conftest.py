@@ -3,6 +3,7 @@ import pytest
 import pandas as pd
 from pandas import DataFrame
 import os
+from pathlib import Path
 
 os.environ["OPTIONS_FRAMEWORK_CONFIG_FOLDER"] = r'C:\_code\options_backtesting_framework\tests\config'
 from mocks import *
@@ -13,6 +14,18 @@ from pprint import pprint as pp
 from options_framework.config import settings, load_settings
 
 
+@pytest.fixture(scope='session', autouse=True)
+def keep_test_data_clean():
+    # reading the test data saves a timeslot index next to it. Remove the ones this session created.
+    def index_files():
+        return set(Path(settings['options_directory']).glob('*/*/timeslots/timeslot_index.npz'))
+
+    existing = index_files()
+    yield
+    for path in index_files() - existing:
+        path.unlink(missing_ok=True)
+
+
 @pytest.fixture
 def incur_fees_true():
     original_setting = settings['incur_fees']
@@ -1,3 +1,4 @@
+import bisect
 import datetime
 from dataclasses import dataclass, field
 from pathlib import Path
@@ -32,6 +33,34 @@ class MockOptionChain:
     options: list = field(init=False, default_factory=lambda: [], repr=False)
     expiration_strikes: dict = field(init=False, default_factory=lambda: {}, repr=False)
 
+    def nearest_expiration(self, expiration: datetime.date) -> datetime.date | None:
+        i = bisect.bisect_left(self.expirations, expiration)
+        return self.expirations[i] if i < len(self.expirations) else None
+
+    def strike_at_or_above(self, expiration: datetime.date, strike: float) -> float | None:
+        strikes = self.expiration_strikes.get(expiration, [])
+        i = bisect.bisect_left(strikes, strike)
+        return strikes[i] if i < len(strikes) else None
+
+    def strike_at_or_below(self, expiration: datetime.date, strike: float) -> float | None:
+        strikes = self.expiration_strikes.get(expiration, [])
+        i = bisect.bisect_right(strikes, strike)
+        return strikes[i - 1] if i else None
+
+    def row(self, expiration: datetime.date, strike: float, option_type: str) -> dict | None:
+        return next((o for o in self.options if o['expiration'] == expiration and o['strike'] == strike
+                     and o['option_type'] == option_type), None)
+
+    def row_at_or_below_delta(self, expiration: datetime.date, option_type: str, delta: float) -> dict | None:
+        options = [o for o in self.options if o['expiration'] == expiration and o['option_type'] == option_type
+                   and o['delta'] is not None and o['delta'] <= delta]
+        return max(options, key=lambda o: o['delta'], default=None)
+
+    def row_at_or_above_delta(self, expiration: datetime.date, option_type: str, delta: float) -> dict | None:
+        options = [o for o in self.options if o['expiration'] == expiration and o['option_type'] == option_type
+                   and o['delta'] is not None and o['delta'] >= delta]
+        return min(options, key=lambda o: o['delta'], default=None)
+
 
 class MockPortfolio(Dispatcher):
     _events_ = ['new_position_opened', 'next']
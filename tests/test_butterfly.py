@@ -96,3 +96,47 @@ from options_framework.spreads.butterfly import Butterfly
 #     max_profit = position.max_profit
 #
 #
+
+
+def test_butterfly_options_are_selected_with_chain_queries(daily_file_settings):
+    from options_framework.option_chain import OptionChain
+    quote_datetime = datetime.datetime(2014, 12, 30)
+    option_chain = OptionChain('AAPL', quote_datetime, datetime.datetime(2014, 12, 31))
+    option_chain.on_next(quote_datetime)
+    expiration = datetime.date(2015, 1, 17)
+    strikes = option_chain.expiration_strikes[expiration]
+
+    lower, center, upper = Butterfly._get_options(option_chain, expiration, 'call', 110.5, 5, 5)
+    assert center.strike == min(s for s in strikes if s >= 110.5)
+    assert lower.strike == max(s for s in strikes if s <= center.strike - 5)
+    assert upper.strike == min(s for s in strikes if s >= center.strike + 5)
+    assert {o.option_type for o in (lower, center, upper)} == {'call'}
+
+    # wings past the last strikes are the outermost options
+    lower, _, upper = Butterfly._get_options(option_chain, expiration, 'put', 110.5, 500, 500)
+    assert (lower.strike, upper.strike) == (strikes[0], strikes[-1])
+
+
+def test_butterfly_wings_skip_strikes_without_the_option_type(daily_file_settings, monkeypatch):
+    from options_framework.option_chain import OptionChain
+    quote_datetime = datetime.datetime(2014, 12, 30)
+    option_chain = OptionChain('AAPL', quote_datetime, datetime.datetime(2014, 12, 31))
+    option_chain.on_next(quote_datetime)
+    expiration = datetime.date(2015, 1, 17)
+    strikes = option_chain.expiration_strikes[expiration]
+    row = OptionChain.row
+
+    def row_without_outer_puts(self, expiration, strike, option_type):
+        # the outermost strikes only have a call
+        if option_type == 'put' and strike in (strikes[0], strikes[-1]):
+            return None
+        return row(self, expiration, strike, option_type)
+
+    monkeypatch.setattr(OptionChain, 'row', row_without_outer_puts)
+    lower, _, upper = Butterfly._get_options(option_chain, expiration, 'put', 110.5, 500, 500)
+    assert (lower.strike, upper.strike) == (strikes[1], strikes[-2])
+    assert {lower.option_type, upper.option_type} == {'put'}
+
+    lower, center, upper = Butterfly._get_options(option_chain, expiration, 'put', strikes[2], strikes[2] - strikes[0],
+                                                  strikes[-1] - strikes[2])
+    assert (lower.strike, upper.strike) == (strikes[1], strikes[-2])
@@ -0,0 +1,110 @@
+import datetime
+
+import numpy as np
+
+from options_framework.storage.chain_index import ChainIndex, DeltaIndex
+from options_framework.storage.pickle_store import PickleTimeslotStore
+from options_framework.storage.timeslot import records_to_columns
+
+
+def expected_expiration_strikes(options):
+    expirations = sorted(set(x['expiration'] for x in options))
+    expiration_strikes = sorted(set((x['expiration'], x['strike']) for x in options))
+    return expirations, {exp: [s for (e, s) in expiration_strikes if e == exp] for exp in expirations}
+
+
+def test_chain_index_matches_option_records(intraday_file_settings):
+    quote_datetime = datetime.datetime(2016, 4, 1, 9, 31)
+    store = PickleTimeslotStore('SPXW')
+    timeslot = store.load_timeslot(store.get_datetimes(quote_datetime, datetime.datetime.max)[0])
+    expirations, expiration_strikes = expected_expiration_strikes(timeslot.records)
+
+    chain_index = timeslot.chain_index
+
+    assert chain_index.expiration_list == expirations
+    assert chain_index.expiration_strikes == expiration_strikes
+    assert timeslot.chain_index is chain_index
+
+
+def test_chain_index_rows_are_sorted_by_strike(daily_file_settings):
+    timeslot = PickleTimeslotStore('AAPL').load_timeslot(datetime.datetime(2014, 12, 30))
+    expiration = timeslot.chain_index.expiration_list[1]
+
+    rows = timeslot.chain_index.rows(expiration)
+    strikes = [timeslot.records[i]['strike'] for i in rows]
+
+    assert len(rows) == len([x for x in timeslot.records if x['expiration'] == expiration])
+    assert all(timeslot.records[i]['expiration'] == expiration for i in rows)
+    assert strikes == sorted(strikes)
+    assert len(timeslot.chain_index.rows(datetime.date(2014, 12, 29))) == 0
+
+
+def test_chain_index_of_empty_timeslot():
+    chain_index = ChainIndex.from_columns(records_to_columns([]))
+
+    assert chain_index.expiration_list == []
+    assert chain_index.expiration_strikes == {}
+    assert len(chain_index.rows(datetime.date(2014, 12, 29))) == 0
+    assert chain_index.nearest_expiration(datetime.date(2014, 12, 29)) is None
+    assert chain_index.strike_at_or_above(datetime.date(2014, 12, 29), 100.0) is None
+    assert chain_index.strike_at_or_below(datetime.date(2014, 12, 29), 100.0) is None
+
+
+def test_chain_index_queries_match_linear_search(intraday_file_settings):
+    store = PickleTimeslotStore('SPXW')
+    timeslot = store.load_timeslot(store.get_datetimes(datetime.datetime(2016, 4, 28), datetime.datetime.max)[0])
+    chain_index = timeslot.chain_index
+    expirations, expiration_strikes = expected_expiration_strikes(timeslot.records)
+
+    first, last = expirations[0], expirations[-1]
+    for date in [first - datetime.timedelta(days=3), first, first + datetime.timedelta(days=1), last,
+                 last + datetime.timedelta(days=1)]:
+        assert chain_index.nearest_expiration(date) == next((e for e in expirations if e >= date), None)
+
+    strikes = expiration_strikes[first]
+    for strike in [strikes[0] - 10, strikes[0], strikes[len(strikes) // 2] + 0.5, strikes[-1], strikes[-1] + 10]:
+        assert chain_index.strike_at_or_above(first, strike) == next((s for s in strikes if s >= strike), None)
+        assert chain_index.strike_at_or_below(first, strike) == next((s for s in reversed(strikes) if s <= strike),
+                                                                    None)
+
+    strike = strikes[len(strikes) // 2]
+    rows = chain_index.strike_rows(first, strike).tolist()
+    assert sorted(rows) == [i for i, x in enumerate(timeslot.records)
+                            if x['expiration'] == first and x['strike'] == strike]
+    assert len(chain_index.strike_rows(first, strike + 0.5)) == 0
+
+
+def test_delta_index_matches_sorted_search(intraday_file_settings):
+    store = PickleTimeslotStore('SPXW')
+    timeslot = store.load_timeslot(store.get_datetimes(datetime.datetime(2016, 4, 1, 9, 31), datetime.datetime.max)[0])
+    expiration = timeslot.chain_index.expiration_list[0]
+    rows = [i for i, x in enumerate(timeslot.records) if x['expiration'] == expiration and x['delta'] is not None]
+    calls = sorted((i for i in rows if timeslot.records[i]['option_type'] == 'call'),
+                   key=lambda i: timeslot.records[i]['delta'], reverse=True)
+    puts = sorted((i for i in rows if timeslot.records[i]['option_type'] == 'put'),
+                  key=lambda i: timeslot.records[i]['delta'])
+
+    call_index, put_index = timeslot.delta_index(expiration, 'call'), timeslot.delta_index(expiration, 'put')
+    deltas = [-0.1, 0.0, 0.05, 0.16, 0.3, 0.46, 0.5, 0.9, 1.0, 1.1]
+    assert call_index.rows_at_or_below(deltas).tolist() == [
+        next((i for i in calls if timeslot.records[i]['delta'] <= d), -1) for d in deltas]
+    assert put_index.rows_at_or_above([-d for d in deltas]).tolist() == [
+        next((i for i in puts if timeslot.records[i]['delta'] >= -d), -1) for d in deltas]
+    assert timeslot.delta_index(expiration, 'call') is call_index
+
+
+def test_delta_index_of_empty_timeslot():
+    delta_index = DeltaIndex.from_columns(records_to_columns([]), np.empty(0, dtype=np.int64), 'call')
+
+    assert delta_index.rows_at_or_below([0.5, 0.16]).tolist() == [-1, -1]
+    assert delta_index.rows_at_or_above(-0.5) == -1
+
+
+def test_indexes_of_pickle_timeslot_do_not_build_columns(daily_file_settings):
+    timeslot = PickleTimeslotStore('AAPL').load_timeslot(datetime.datetime(2014, 12, 30))
+    expiration = timeslot.chain_index.expiration_list[1]
+
+    timeslot.delta_index(expiration, 'call')
+
+    assert timeslot._columns is None
+    assert timeslot.chain_index.expirations.tolist() == sorted(set(x['expiration'] for x in timeslot.records))
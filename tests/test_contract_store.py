@@ -0,0 +1,60 @@
+import datetime
+
+import pytest
+
+from options_framework.option import Option
+from options_framework.option_chain import OptionChain
+from options_framework.storage.contract_store import ContractSeriesStore
+from options_framework.storage.pickle_store import PickleTimeslotStore
+from mocks import MockEventDispatcher
+
+
+@pytest.fixture
+def contract_store(tmp_path, daily_file_settings):
+    source = PickleTimeslotStore('AAPL')
+    target = ContractSeriesStore('AAPL', options_directory=tmp_path)
+    target.write_timeslots(source.iter_timeslots())
+    return source, target
+
+
+def test_contract_store_loads_same_records_as_timeslot(contract_store):
+    source, target = contract_store
+    quote_datetime = datetime.datetime(2015, 1, 5, 0, 0)
+    expected = source.load_timeslot(quote_datetime).records[40:45]
+
+    option_quotes = target.get_records(quote_datetime, [r['option_id'] for r in expected] + ['not an option'])
+
+    assert option_quotes == {r['option_id']: r for r in expected}
+    assert type(option_quotes[expected[0]['option_id']]['expiration']) == datetime.date
+
+
+def test_contract_store_option_with_no_quote_is_left_out(contract_store):
+    source, target = contract_store
+    option_id = source.load_timeslot(datetime.datetime(2014, 12, 30)).records[0]['option_id']
+
+    assert target.get_records(datetime.datetime(2014, 12, 29), [option_id]) == {}
+
+
+def test_contract_store_month_not_in_store(contract_store):
+    _, target = contract_store
+    assert target.get_records(datetime.datetime(2015, 2, 2), ['AAPL150220C00110000']) is None
+
+
+def test_option_chain_updates_held_options_from_contract_store(contract_store):
+    _, target = contract_store
+    quote_date = datetime.datetime(2014, 12, 30)
+    option_chain = OptionChain('AAPL', quote_datetime=quote_date, end_datetime=datetime.datetime(2015, 1, 7),
+                               lazy_loading=True)
+    option_chain.contract_store = target
+    option_chain.on_next(quote_date)
+    option = Option(**option_chain.options[2])
+
+    nexter = MockEventDispatcher()
+    nexter.bind(next_options=option_chain.on_next_options)
+    next_day = datetime.datetime(2015, 1, 2)
+    option_chain.on_next(next_day)
+    nexter.do_next_options([option])
+
+    assert option.price == 34.3
+    assert option.quote_datetime == next_day
+    assert option_chain._timeslot is None
@@ -0,0 +1,123 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from options_framework.equity_curve import EquityCurve
+
+
+def bars(count: int) -> list[datetime.datetime]:
+    start = datetime.datetime(2016, 4, 28, 9, 31)
+    return [start + datetime.timedelta(minutes=i) for i in range(count)]
+
+
+def test_equity_curve_grows_and_keeps_rows():
+    curve = EquityCurve(column_names=['delta'], capacity=4)
+    for i, quote_datetime in enumerate(bars(10)):
+        curve.append(quote_datetime, 10_000 + i, 0.5 * i, 'open' if i % 2 else 'flat')
+
+    assert len(curve) == 10
+    assert len(curve.values) == 16
+    assert curve.names == ['quote_datetime', 'value', 'delta', 'arg_1']
+    assert curve[3] == [bars(10)[3], 10_003.0, 1.5, 'open']
+    assert curve[-1][1] == 10_009.0
+    with pytest.raises(IndexError):
+        curve[10]
+
+
+def test_equity_curve_column_types_come_from_the_first_row():
+    curve = EquityCurve()
+    curve.append(bars(1)[0], 100.0, 3, 1.5, True, bars(1)[0], 'text')
+
+    assert [c.dtype for c in curve.columns] == [np.dtype(np.int64), np.dtype(np.float64), np.dtype(bool),
+                                                np.dtype('M8[us]'), np.dtype(object)]
+    with pytest.raises(ValueError, match='Expected 5 extra values'):
+        curve.append(bars(2)[1], 100.0, 3)
+
+
+def test_equity_curve_promotes_columns_instead_of_truncating():
+    curve = EquityCurve(column_names=['count', 'flag', 'opened'])
+    curve.append(bars(1)[0], 100.0, 0, True, bars(1)[0])
+    curve.append(bars(2)[1], 101.0, 1.5, None, None)
+    assert [c.dtype for c in curve.columns] == [np.dtype(np.float64), np.dtype(object), np.dtype(object)]
+    curve.append(bars(3)[2], 102.0, 2, False, bars(3)[2])
+
+    assert [row[2:] for row in curve] == [[0.0, True, bars(1)[0]], [1.5, None, None], [2.0, False, bars(3)[2]]]
+
+
+def test_equity_curve_to_frame_does_not_copy():
+    curve = EquityCurve()
+    for i, quote_datetime in enumerate(bars(5)):
+        curve.append(quote_datetime, 100.0 + i)
+    frame = curve.to_frame()
+
+    assert list(frame.columns) == ['quote_datetime', 'value']
+    assert frame['value'].tolist() == [100.0, 101.0, 102.0, 103.0, 104.0]
+    assert frame['quote_datetime'].iloc[0] == bars(1)[0]
+    assert np.shares_memory(frame['value'].to_numpy(), curve.values)
+
+
+def test_equity_curve_flushes_to_disk(tmp_path):
+    pytest.importorskip('pyarrow')
+    curve = EquityCurve(column_names=['count'], flush_rows=4, folder=tmp_path.joinpath('curve'))
+    for i, quote_datetime in enumerate(bars(10)):
+        curve.append(quote_datetime, 100.0 + i, i)
+
+    assert len(curve) == 10
+    assert len(list(tmp_path.joinpath('curve').glob('part-*.parquet'))) == 2
+    frame = curve.to_frame()
+    assert frame['value'].tolist() == [100.0 + i for i in range(10)]
+    assert frame['count'].tolist() == list(range(10))
+    assert curve[1][2] == 1
+    assert curve[9][2] == 9
+
+    curve.to_parquet(tmp_path.joinpath('curve.parquet'))
+    assert pd.read_parquet(tmp_path.joinpath('curve.parquet'))['value'].tolist() == frame['value'].tolist()
+
+    with pytest.raises(ValueError, match='already holds an equity curve'):
+        EquityCurve(flush_rows=4, folder=tmp_path.joinpath('curve'))
+
+
+def test_equity_curve_parts_with_promoted_columns_are_joined(tmp_path):
+    pytest.importorskip('pyarrow')
+    curve = EquityCurve(column_names=['count'], flush_rows=2, folder=tmp_path.joinpath('curve'))
+    for i, quote_datetime in enumerate(bars(5)):
+        curve.append(quote_datetime, 100.0 + i, i if i < 2 else i + 0.5)
+
+    curve.to_parquet(tmp_path.joinpath('curve.parquet'))
+    assert pd.read_parquet(tmp_path.joinpath('curve.parquet'))['count'].tolist() == [0, 1, 2.5, 3.5, 4.5]
+
+
+def test_equity_curve_flush_requires_folder():
+    with pytest.raises(ValueError, match='folder is required'):
+        EquityCurve(flush_rows=100)
+
+
+def test_equity_curve_can_be_used_as_a_list_of_rows():
+    curve = EquityCurve(capacity=2)
+    rows = [[quote_datetime, 100.0 + i, i] for i, quote_datetime in enumerate(bars(7))]
+    for row in rows:
+        curve.append(*row)
+
+    assert list(curve) == rows
+    assert curve[2:5] == rows[2:5]
+    assert curve[::-3] == rows[::-3]
+    frame = pd.DataFrame(curve, columns=['Date', 'Value', 'Count'])
+    assert frame['Value'].tolist() == [row[1] for row in rows]
+    assert frame['Date'].iloc[-1] == rows[-1][0]
+
+
+def test_equity_curve_reads_each_flushed_part_once(tmp_path, monkeypatch):
+    pytest.importorskip('pyarrow')
+    curve = EquityCurve(flush_rows=4, folder=tmp_path.joinpath('curve'))
+    rows = [[quote_datetime, 100.0 + i] for i, quote_datetime in enumerate(bars(10))]
+    for row in rows:
+        curve.append(*row)
+    reads = []
+    read_parquet = pd.read_parquet
+    monkeypatch.setattr(pd, 'read_parquet', lambda path: reads.append(path) or read_parquet(path))
+
+    assert [curve[i] for i in range(10)] == rows
+    assert list(curve) == rows
+    assert len(reads) == 4
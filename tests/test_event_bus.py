@@ -0,0 +1,112 @@
+import datetime
+
+import pytest
+
+from options_framework.event_bus import EventBus
+from options_framework.option import Option
+from options_framework.option_types import OptionSpreadType
+from options_framework.portfolio import OptionPortfolio
+from options_framework.spreads.single import Single
+
+
+def test_event_bus_calls_handlers_in_order():
+    bus = EventBus()
+    calls = []
+    first, second = (lambda x: calls.append(('first', x))), (lambda x: calls.append(('second', x)))
+    bus.subscribe('next', first)
+    bus.subscribe('next', second)
+    bus.subscribe('next', first)
+    bus.emit('next', 1)
+    assert calls == [('first', 1), ('second', 1)]
+
+    bus.unsubscribe('next', first)
+    bus.emit('next', 2)
+    assert calls[-1] == ('second', 2)
+    assert bus.handlers('next') == (second,)
+
+    bus.unsubscribe('next', second)
+    bus.emit('next', 3)
+    assert len(calls) == 3
+    assert bus.handlers('next') == ()
+
+
+def test_event_bus_queues_posted_events_in_a_batch():
+    bus = EventBus()
+    calls = []
+    bus.subscribe('position_closed', lambda p: calls.append(('closed', p)))
+    bus.subscribe('fees_incurred', lambda f: calls.append(('fees', f)))
+
+    with bus.batch():
+        bus.post('position_closed', 1)
+        with bus.batch():
+            bus.post('position_closed', 2)
+        bus.emit('fees_incurred', 0.65)
+        assert calls == [('fees', 0.65)]
+    assert calls == [('fees', 0.65), ('closed', 1), ('closed', 2)]
+
+    bus.post('position_closed', 3)
+    assert calls[-1] == ('closed', 3)
+
+
+def test_event_bus_delivers_queued_events_when_the_batch_fails():
+    bus = EventBus()
+    calls = []
+    bus.subscribe('position_closed', calls.append)
+    with pytest.raises(ValueError):
+        with bus.batch():
+            bus.post('position_closed', 1)
+            raise ValueError('bar failed')
+    assert calls == [1]
+
+
+def test_option_events_bypass_pydispatch(daily_file_settings):
+    quote_datetime = datetime.datetime(2014, 12, 30)
+    portfolio = OptionPortfolio(100_000, quote_datetime, datetime.datetime(2015, 1, 7))
+    portfolio.next(quote_datetime, ['AAPL'])
+    option = Option(**portfolio.option_chains['AAPL'].options[10])
+    portfolio.open_position(Single(options=[option], spread_type=OptionSpreadType.SINGLE), 1)
+
+    assert option.event_bus is portfolio.event_bus
+    assert option._dispatcher is None
+    assert portfolio.cash == 100_000 - option.trade_open_info.premium - option.trade_open_info.fees
+
+    class Listener:
+        fees = []
+
+        def on_fees_incurred(self, fees):
+            self.fees.append(fees)
+
+    listener = Listener()
+    option.bind(fees_incurred=listener.on_fees_incurred)
+    option.close_trade(quantity=1)
+    assert option._dispatcher is not None
+    assert listener.fees == [option.fee_per_contract]
+    assert portfolio.cash == 100_000 - option.trade_open_info.premium + option.trade_close_info.premium \
+        - 2 * option.fee_per_contract
+
+
+def test_portfolio_listeners_see_closed_positions_after_the_bar(daily_file_settings):
+    symbol = 'AAPL'
+    quote_datetime = datetime.datetime(2014, 12, 31)
+    portfolio = OptionPortfolio(100_000, quote_datetime, datetime.datetime(2015, 1, 7))
+    portfolio.next(quote_datetime, [symbol])
+    records = [x for x in portfolio.option_chains[symbol].options if x['expiration'] == datetime.date(2015, 1, 2)]
+    expiring = Single(options=[Option(**records[10])], spread_type=OptionSpreadType.SINGLE)
+    portfolio.open_position(expiring, 1)
+
+    class Listener:
+        events = []
+
+        def on_position_closed(self, position):
+            self.events.append(('closed', position, len(portfolio.close_values)))
+
+        def on_position_expired(self, position):
+            self.events.append(('expired', position, len(portfolio.close_values)))
+
+    listener = Listener()
+    portfolio.bind(position_closed=listener.on_position_closed, position_expired=listener.on_position_expired)
+    portfolio.next(datetime.datetime(2015, 1, 2), [symbol])
+    portfolio.next(datetime.datetime(2015, 1, 5), [symbol])
+
+    # the 1/5/2015 bar is recorded before the listeners hear about the expired position
+    assert listener.events == [('closed', expiring, 3), ('expired', expiring, 3)]
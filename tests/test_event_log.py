@@ -0,0 +1,68 @@
+import datetime
+import json
+
+from options_framework.event_log import DEBUG, INFO, OFF, WARNING, EventLog, JsonlSink, MemorySink
+from options_framework.option import Option
+from options_framework.option_types import OptionSpreadType
+from options_framework.portfolio import OptionPortfolio
+from options_framework.spreads.single import Single
+
+
+def test_event_log_drops_events_below_the_level():
+    sink = MemorySink()
+    event_log = EventLog(level=INFO, sinks=[sink])
+    event_log.debug('fees_incurred', fees=0.5)
+    event_log.info('option_opened', option_id='A', premium=125.0)
+    event_log.warning('pnl_corrected', amount=1.0)
+
+    assert [r['event'] for r in sink.records] == ['option_opened', 'pnl_corrected']
+    assert sink.records[0] == {'level': 'info', 'event': 'option_opened', 'option_id': 'A', 'premium': 125.0}
+    assert event_log.is_enabled(WARNING) and not event_log.is_enabled(DEBUG)
+
+    event_log.level = OFF
+    event_log.warning('pnl_corrected', amount=1.0)
+    assert len(sink.records) == 2
+
+
+def test_memory_sink_keeps_the_last_records():
+    sink = MemorySink(capacity=3)
+    event_log = EventLog(level=DEBUG, sinks=[sink])
+    for i in range(5):
+        event_log.info('event', number=i)
+    assert [r['number'] for r in sink.records] == [2, 3, 4]
+
+
+def test_jsonl_sink_buffers_records(tmp_path):
+    path = tmp_path.joinpath('events.jsonl')
+    event_log = EventLog(level=INFO, sinks=[JsonlSink(path, buffer_size=3)])
+    quote_datetime = datetime.datetime(2016, 4, 28, 9, 31)
+    event_log.info('option_expired', quote_datetime=quote_datetime, instance_id=1)
+    event_log.info('option_expired', quote_datetime=quote_datetime, instance_id=2)
+    assert not path.exists()
+
+    event_log.info('option_expired', quote_datetime=quote_datetime, instance_id=3)
+    event_log.info('option_expired', quote_datetime=quote_datetime, instance_id=4)
+    assert len(path.read_text().splitlines()) == 3
+    event_log.flush()
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [r['instance_id'] for r in records] == [1, 2, 3, 4]
+    assert records[0]['quote_datetime'] == '2016-04-28T09:31:00'
+
+
+def test_portfolio_writes_transactions_to_the_event_log(daily_file_settings, capsys):
+    symbol = 'AAPL'
+    quote_datetime = datetime.datetime(2014, 12, 30, 0, 0)
+    portfolio = OptionPortfolio(100_000, quote_datetime, datetime.datetime(2015, 1, 7, 0, 0))
+    sink = MemorySink()
+    portfolio.event_log = EventLog(level=INFO, sinks=[sink])
+    portfolio.next(quote_datetime, [symbol])
+    option = Option(**portfolio.option_chains[symbol].options[61])
+    single = Single(options=[option], spread_type=OptionSpreadType.SINGLE)
+    portfolio.open_position(single, 1)
+    portfolio.close_position(single.position_id)
+
+    assert [r['event'] for r in sink.records] == ['position_opened', 'position_closed']
+    assert sink.records[0]['position_id'] == single.position_id
+    assert sink.records[0]['legs'] == 1
+    assert sink.records[0]['quote_datetime'] == quote_datetime
+    assert capsys.readouterr().out == ''
@@ -1,5 +1,6 @@
 import pandas as pd
 import datetime
+from decimal import Decimal
 from tempfile import NamedTemporaryFile
 from options_framework.option import Option
 from options_framework.utils.helpers import *
@@ -123,3 +124,18 @@ def expiration_to_date(x):
 #     df['expiration'] = pd.to_datetime(df['expiration']).dt.date
 #     return df
 
+
+
+def test_to_cents_matches_decimalize_2():
+    import numpy as np
+    values = [0.005, 0.015, 0.125, 0.135, 1.005, 2.675, 21.200000000000003, -0.125, -3.335, 112.52, 0.0]
+    values += [k / 1000 for k in range(0, 20000, 5)]
+    rounded = (to_cents(np.array(values)) / 100).tolist()
+    assert rounded == [float(decimalize_2(v)) for v in values]
+
+
+def test_cents_and_whole_match_decimalize():
+    values = [0.005, 0.015, 0.125, 1.005, 2.675, 21.200000000000003, -0.125, -3.335, 112.52, 0.0, 7, -3,
+              Decimal('1.005'), 1e12 + 0.005]
+    assert [cents(v) for v in values] == [int(decimalize_2(v) * 100) for v in values]
+    assert [whole(v) for v in [0.5, 1.5, 2.5, -2.5, 3, 2.4999]] == [0, 2, 2, -2, 3, 2]
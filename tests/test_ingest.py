@@ -0,0 +1,88 @@
+import datetime
+import zipfile
+
+import pytest
+
+from options_framework.storage.ingest import ingest_file, ingest_files
+from options_framework.storage.numpy_store import NumpyTimeslotStore
+from options_framework.storage.pickle_store import PickleTimeslotStore
+
+HEADER = 'quote_datetime,option_id,root,strike,expiration,option_type,active_underlying_price,bid,ask,mid,' \
+         'delta,gamma,theta,vega,rho,open_interest,trade_volume,implied_volatility,underlying_bid\n'
+
+ROWS = [
+    '2016-03-08 09:31:00,SPXW20160309C00001960,SPXW,1960,2016-03-09,C,1991.18,27.2,29.7,28.45,0.8817,0.0085,-1.3502,0.234,6.0964,72,0,0.196,1990.0\n',
+    '2016-03-08 09:31:00,SPXW20160309P00001960,SPXW,1960,2016-03-09,P,1991.18,1.25,1.4,1.32,-0.117,0.0085,-1.3249,0.2322,-0.8268,820,42,0.1949,1990.0\n',
+    '2016-03-08 09:31:00,SPXW20160311C00001990,SPXW,1990,2016-03-11,C,1991.18,12,12.5,12.25,0.4611,0.0113,-2.1285,0.7488,8.1471,10469,3,0.1865,1990.0\n',
+    '2016-03-08 09:45:00,SPXW20160309C00001960,SPXW,1960,2016-03-09,C,1984.7,24.1,27,25.55,0.8412,0.0102,-2.0002,0.2845,5.7673,72,0,0.2029,1984.0\n',
+    '2016-03-08 09:45:00,SPXW20160309P00001960,SPXW,1960,2016-03-09,P,1984.7,1.5,1.75,1.62,-0.1421,0.0101,-1.6248,0.2643,-0.9955,820,17,0.1893,1984.0\n',
+    '2016-04-01 09:31:00,SPXW20160401C00002000,SPXW,2000,2016-04-01,C,2050.1,50.1,50.9,50.5,0.99,0.001,-0.5,0.01,0.1,10,1,0.15,2050.0\n',
+]
+
+
+@pytest.fixture
+def vendor_csv(tmp_path):
+    path = tmp_path.joinpath('vendor.csv')
+    path.write_text(HEADER + ''.join(ROWS))
+    return path
+
+
+def test_ingest_file_writes_timeslots(vendor_csv, tmp_path):
+    counts = ingest_file(vendor_csv, data_frequency='intraday', options_directory=tmp_path, chunksize=2)
+
+    store = PickleTimeslotStore('SPXW', data_frequency='intraday', options_directory=tmp_path)
+    assert counts == {'SPXW': 3}
+    assert store.get_datetimes(datetime.datetime.min, datetime.datetime.max) == \
+           [datetime.datetime(2016, 3, 8, 9, 31), datetime.datetime(2016, 3, 8, 9, 45),
+            datetime.datetime(2016, 4, 1, 9, 31)]
+
+    records = store.load_timeslot(datetime.datetime(2016, 3, 8, 9, 31)).records
+    assert len(records) == 3
+    assert records[1] == {'quote_datetime': datetime.datetime(2016, 3, 8, 9, 31),
+                          'option_id': 'SPXW20160309P00001960', 'symbol': 'SPXW', 'strike': 1960.0,
+                          'expiration': datetime.date(2016, 3, 9), 'option_type': 'put', 'spot_price': 1991.18,
+                          'bid': 1.25, 'ask': 1.4, 'price': 1.32, 'delta': -0.117, 'gamma': 0.0085,
+                          'theta': -1.3249, 'vega': 0.2322, 'rho': -0.8268, 'open_interest': 820, 'volume': 42,
+                          'implied_volatility': 0.1949}
+    assert type(records[1]['symbol']) == str
+
+
+def test_ingest_file_reads_zip_and_filters_symbols(tmp_path):
+    path = tmp_path.joinpath('vendor.zip')
+    with zipfile.ZipFile(path, 'w') as f:
+        f.writestr('vendor.csv', HEADER + ''.join(ROWS))
+
+    assert ingest_file(path, data_frequency='intraday', options_directory=tmp_path, symbols=['SPX']) == {}
+    assert ingest_file(path, data_frequency='intraday', options_directory=tmp_path) == {'SPXW': 3}
+
+
+def test_ingest_file_must_be_sorted_by_quote_datetime(tmp_path):
+    path = tmp_path.joinpath('vendor.csv')
+    path.write_text(HEADER + ROWS[0] + ROWS[3] + ROWS[1])
+
+    with pytest.raises(ValueError):
+        ingest_file(path, data_frequency='intraday', options_directory=tmp_path, chunksize=1)
+
+
+def test_ingest_file_rejects_an_earlier_minute_after_a_later_one(tmp_path):
+    path = tmp_path.joinpath('vendor.csv')
+    path.write_text(HEADER + ROWS[5] + ROWS[3] + ROWS[0])
+
+    with pytest.raises(ValueError, match='must be sorted by quote_datetime'):
+        ingest_file(path, data_frequency='intraday', options_directory=tmp_path, chunksize=1)
+
+
+def test_ingest_files_converts_to_columnar_store(tmp_path):
+    paths = []
+    for i, rows in enumerate([ROWS[:5], ROWS[5:]]):
+        path = tmp_path.joinpath(f'vendor_{i}.csv')
+        path.write_text(HEADER + ''.join(rows))
+        paths.append(path)
+
+    counts = ingest_files(paths, data_frequency='intraday', options_directory=tmp_path, data_store='numpy',
+                          max_workers=2)
+
+    store = NumpyTimeslotStore('SPXW', data_frequency='intraday', options_directory=tmp_path)
+    assert counts == {'SPXW': 3}
+    assert len(store.get_datetimes(datetime.datetime.min, datetime.datetime.max)) == 3
+    assert len(store.load_timeslot(datetime.datetime(2016, 3, 8, 9, 45))) == 2
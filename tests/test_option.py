@@ -337,6 +337,33 @@ def test_open_trade_when_trade_is_already_open_raises_exception(get_data):
         option.open_trade(quantity=quantity)
 
 
+def test_cancel_trade_returns_option_to_unopened_state(get_data):
+    option_id = 'AAPL20150117C00010000'
+    call_data = get_data(option_id)
+    option_data = copy.deepcopy(call_data[0])
+    option = Option(**option_data)
+
+    option.open_trade(quantity=10)
+    option.cancel_trade()
+
+    assert option.status == OptionStatus.INITIALIZED
+    assert option.trade_open_info is None
+    assert option.position_type is None
+    assert option.quantity == 0
+    assert option.total_fees == 0
+
+    option.quantity, option.position_type = -5, OptionPositionType.SHORT
+    option.open_trade(quantity=-5, reason='test')
+    option.cancel_trade()
+    assert (option.quantity, option.position_type, option.user_defined) == (-5, OptionPositionType.SHORT, {})
+
+    option.open_trade(quantity=-5)
+    assert option.total_fees == 2.5
+    option.close_trade(quantity=-2)
+    with pytest.raises(ValueError, match="Cannot cancel a trade"):
+        option.cancel_trade()
+
+
 @pytest.mark.parametrize("quantity, close_quantity, remaining_quantity, status", [
     (10, 8, 2, OptionStatus.TRADE_PARTIALLY_CLOSED), (-10, -8, -2, OptionStatus.TRADE_PARTIALLY_CLOSED),
     (10, None, 0, OptionStatus.TRADE_IS_CLOSED), (-10, None, 0, OptionStatus.TRADE_IS_CLOSED)])
@@ -1540,3 +1567,77 @@ def test_option_status_changes(get_data):
 
 
 
+
+
+@pytest.mark.parametrize("quantity", [1, -1, 3, -10])
+def test_cents_numeric_mode_gives_the_same_values_as_decimal(incur_fees_true, quantity):
+    import struct
+    original_mode = settings.get('numeric_mode', 'cents')
+    records = [x for x in daily_option_data if x['quote_datetime'] == datetime.datetime(2014, 12, 30)]
+    results = {}
+    try:
+        for mode in ['decimal', 'cents']:
+            settings['numeric_mode'] = mode
+            values = []
+            for record in records:
+                option = Option(**record)
+                option.open_trade(quantity=quantity)
+                values += [option.current_value, option.trade_value, option.get_unrealized_profit_loss()]
+                option.next(next(x for x in daily_option_data if x['option_id'] == record['option_id']
+                                 and x['quote_datetime'] == datetime.datetime(2014, 12, 31)))
+                values += [option.current_value, option.get_unrealized_profit_loss(), option.total_fees]
+            results[mode] = values
+    finally:
+        settings['numeric_mode'] = original_mode
+    # compare the bits, so negative zeros must match too
+    assert [struct.pack('d', v) for v in results['cents']] == [struct.pack('d', v) for v in results['decimal']]
+
+
+def test_unknown_numeric_mode_raises_exception(get_data):
+    original_mode = settings.get('numeric_mode', 'cents')
+    settings['numeric_mode'] = 'binary'
+    try:
+        with pytest.raises(ValueError, match='Unknown numeric_mode'):
+            Option(**get_data('AAPL20150117C00010000')[0])
+    finally:
+        settings['numeric_mode'] = original_mode
+
+
+def test_option_from_row_matches_option_init():
+    records = [x for x in daily_option_data if x['quote_datetime'] == datetime.datetime(2014, 12, 30)]
+    for record in records:
+        expected, actual = Option(**record), Option.from_row(record)
+        assert [getattr(actual, f) for f in record] == [getattr(expected, f) for f in record]
+        assert (actual.fee_per_contract, actual.incur_fees) == (expected.fee_per_contract, expected.incur_fees)
+
+
+def test_option_from_row_interns_contracts():
+    option_id = 'AAPL20150117C00010000'
+    first, second = [copy.deepcopy(x) for x in daily_option_data if x['option_id'] == option_id][:2]
+    # a new string for each row, like the rows built from the columns of a timeslot
+    first['option_id'], second['option_id'] = option_id[:4] + option_id[4:], option_id[:4] + option_id[4:]
+    assert first['option_id'] is not second['option_id']
+
+    options = [Option.from_row(first), Option.from_row(second)]
+    assert options[0].option_id is options[1].option_id
+    assert options[0].expiration is options[1].expiration
+    assert options[0].quote_datetime != options[1].quote_datetime
+
+
+def test_option_dispatcher_events_are_created_when_bound(get_data):
+    option = Option.from_row(get_data('AAPL20150117C00010000')[0])
+    assert option._dispatcher is None
+
+    class Listener:
+        premiums = []
+
+        def on_option_opened(self, trade_open_info):
+            self.premiums.append(trade_open_info.premium)
+
+    listener = Listener()
+    option.bind(open_transaction_completed=listener.on_option_opened)
+    option.open_trade(quantity=1)
+    assert option._dispatcher is not None
+    assert listener.premiums == [option.trade_open_info.premium]
+    with pytest.raises(AttributeError):
+        option.not_an_attribute
@@ -113,3 +113,99 @@ def test_on_next_options(daily_file_settings):
     assert option.quote_datetime == next_day
 
 
+
+def test_on_next_skips_ahead_and_does_not_go_back(daily_file_settings):
+    quote_date = datetime.datetime(2014, 12, 30)
+    end_date = datetime.datetime(2015, 1, 7)
+    option_chain = OptionChain('AAPL', quote_datetime=quote_date, end_datetime=end_date)
+
+    option_chain.on_next(datetime.datetime(2015, 1, 2))
+    assert all(x['quote_datetime'] == datetime.datetime(2015, 1, 2) for x in option_chain.options)
+
+    # earlier timeslots are no longer available
+    option_chain.on_next(datetime.datetime(2014, 12, 31))
+    assert option_chain.options == []
+    assert option_chain.expirations == []
+
+    # a quote datetime with no timeslot clears the chain
+    option_chain.on_next(datetime.datetime(2015, 1, 3))
+    assert option_chain.options == []
+
+    option_chain.on_next(datetime.datetime(2015, 1, 5))
+    assert len(option_chain.options) > 0
+
+
+def test_on_next_last_timeslot_can_be_loaded_again(daily_file_settings):
+    quote_date = datetime.datetime(2015, 1, 6)
+    end_date = datetime.datetime(2015, 1, 7)
+    option_chain = OptionChain('AAPL', quote_datetime=quote_date, end_datetime=end_date)
+
+    option_chain.on_next(datetime.datetime(2015, 1, 6))
+    option_chain.on_next(datetime.datetime(2015, 1, 7))
+    option_chain.on_next(datetime.datetime(2015, 1, 7))
+
+    assert len(option_chain.options) > 0
+    assert all(x['quote_datetime'] == datetime.datetime(2015, 1, 7) for x in option_chain.options)
+
+
+def test_lazy_option_chain_loads_timeslot_when_chain_is_used(daily_file_settings):
+    quote_date = datetime.datetime(2014, 12, 30)
+    end_date = datetime.datetime(2015, 1, 7)
+    option_chain = OptionChain('AAPL', quote_datetime=quote_date, end_datetime=end_date, lazy_loading=True)
+
+    option_chain.on_next(quote_date)
+    assert option_chain._timeslot is None
+
+    assert len(option_chain.expirations) > 0
+    assert option_chain._timeslot is not None
+    assert all(x['quote_datetime'] == quote_date for x in option_chain.options)
+
+
+def test_lazy_option_chain_updates_held_options(daily_file_settings):
+    quote_date = datetime.datetime(2014, 12, 30)
+    end_date = datetime.datetime(2015, 1, 7)
+    option_chain = OptionChain('AAPL', quote_datetime=quote_date, end_datetime=end_date, lazy_loading=True)
+    option_chain.on_next(quote_date)
+    option = Option(**option_chain.options[2])
+
+    nexter = MockEventDispatcher()
+    nexter.bind(next_options=option_chain.on_next_options)
+    next_day = datetime.datetime(2015, 1, 2)
+    option_chain.on_next(next_day)
+    nexter.do_next_options([option])
+
+    assert option.price == 34.3
+    assert option.quote_datetime == next_day
+
+
+def test_option_chain_row_finds_the_option(daily_file_settings):
+    quote_datetime = datetime.datetime(2014, 12, 30)
+    option_chain = OptionChain('AAPL', quote_datetime, datetime.datetime(2014, 12, 31))
+    option_chain.on_next(quote_datetime)
+    expiration = option_chain.nearest_expiration(datetime.date(2015, 1, 10))
+
+    assert expiration == datetime.date(2015, 1, 17)
+    strikes = option_chain.expiration_strikes[expiration]
+    i = strikes.index(110.0)
+    assert option_chain.strike_at_or_above(expiration, 110.1) == strikes[i + 1]
+    assert option_chain.strike_at_or_below(expiration, 110.1) == 110.0
+    row = option_chain.row(expiration, 110.0, 'put')
+    assert row is next(x for x in option_chain.options if x['expiration'] == expiration and x['strike'] == 110.0
+                       and x['option_type'] == 'put')
+    assert option_chain.row(expiration, 110.1, 'put') is None
+
+
+def test_option_chain_row_by_delta_finds_the_nearest_option(daily_file_settings):
+    quote_datetime = datetime.datetime(2014, 12, 30)
+    option_chain = OptionChain('AAPL', quote_datetime, datetime.datetime(2014, 12, 31))
+    option_chain.on_next(quote_datetime)
+    expiration = datetime.date(2015, 1, 17)
+    calls = [x for x in option_chain.options if x['expiration'] == expiration and x['option_type'] == 'call']
+    puts = [x for x in option_chain.options if x['expiration'] == expiration and x['option_type'] == 'put']
+
+    row = option_chain.row_at_or_below_delta(expiration, 'call', 0.3)
+    assert row['delta'] == max(x['delta'] for x in calls if x['delta'] <= 0.3)
+    row = option_chain.row_at_or_above_delta(expiration, 'put', -0.3)
+    assert row['delta'] == min(x['delta'] for x in puts if x['delta'] >= -0.3)
+    assert option_chain.row_at_or_below_delta(expiration, 'call', -1.0) is None
+    assert option_chain.row_at_or_above_delta(expiration, 'put', 1.0) is None
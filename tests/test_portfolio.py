@@ -2,11 +2,15 @@ import datetime
 
 import pytest
 import copy
+from unittest import mock
 
+from options_framework.event_log import INFO, EventLog, MemorySink
 from options_framework.option import Option
 from options_framework.portfolio import OptionPortfolio
+from options_framework.position_book import PositionBook
 from options_framework.option_types import OptionSpreadType, OptionPositionType, OptionStatus
 from options_framework.spreads.single import Single
+from options_framework.spreads.vertical import Vertical
 from options_framework.config import settings
 
 def test_create_portfolio_settings():
@@ -178,3 +182,251 @@ def test_portfolio_value_when_option_value_changes(daily_file_settings):
     assert portfolio.current_value == starting_cash + unrealized_pnl
 
 
+
+
+@pytest.fixture
+def check_portfolio_value():
+    original_setting = settings.get('check_portfolio_value', False)
+    settings['check_portfolio_value'] = True
+    yield
+    settings['check_portfolio_value'] = original_setting
+
+
+def test_portfolio_value_is_kept_up_to_date(daily_file_settings, check_portfolio_value):
+    symbol = 'AAPL'
+    quote_datetime = datetime.datetime(2014, 12, 30, 0, 0)
+    end_datetime = datetime.datetime(2015, 1, 7, 0, 0)
+
+    portfolio = OptionPortfolio(100_000, quote_datetime, end_datetime)
+    portfolio.next(quote_datetime, [symbol])
+    records = [x for x in portfolio.option_chains[symbol].options if x['expiration'] > end_datetime.date()]
+    singles = []
+    for i, record in enumerate(records[:40:4]):
+        single = Single(options=[Option(**record)], spread_type=OptionSpreadType.SINGLE)
+        portfolio.open_position(single, 1 if i % 2 else -1)
+        singles.append(single)
+    assert portfolio.current_value == portfolio._calculate_current_value()
+
+    for day in [datetime.datetime(2014, 12, 31), datetime.datetime(2015, 1, 2), datetime.datetime(2015, 1, 5)]:
+        portfolio.next(day, [symbol])
+        assert portfolio.current_value == portfolio._calculate_current_value()
+        assert sum(portfolio.position_values.values()) == sum(s.current_value for s in portfolio.positions)
+
+    assert len(portfolio.close_values) == 4
+    assert portfolio.close_values[-1] == [datetime.datetime(2015, 1, 5), portfolio.current_value]
+
+    portfolio.close_position(singles[0].position_id)
+    assert singles[0].position_id not in portfolio.position_values
+    assert portfolio.current_value == portfolio._calculate_current_value()
+
+
+def test_only_positions_with_changed_quotes_are_marked(daily_file_settings, check_portfolio_value):
+    symbol = 'AAPL'
+    quote_datetime = datetime.datetime(2014, 12, 30, 0, 0)
+    portfolio = OptionPortfolio(100_000, quote_datetime, datetime.datetime(2015, 1, 7, 0, 0))
+    portfolio.next(quote_datetime, [symbol])
+    records = [x for x in portfolio.option_chains[symbol].options if x['expiration'] > datetime.date(2015, 1, 7)]
+    singles = [Single(options=[Option(**record)], spread_type=OptionSpreadType.SINGLE) for record in records[:20:4]]
+    for single in singles:
+        portfolio.open_position(single, 1)
+
+    marked = []
+    mark_position = portfolio._mark_position
+
+    def record_mark(position):
+        marked.append(position.position_id)
+        mark_position(position)
+
+    portfolio._mark_position = record_mark
+    # the chain has no timeslot between 12/31 and 1/2, so no quote changes
+    portfolio.next(datetime.datetime(2015, 1, 1), [symbol])
+    assert marked == []
+
+    portfolio.next(datetime.datetime(2015, 1, 2), [symbol])
+    repriced = [s.position_id for s in singles if s.option.quote_datetime == datetime.datetime(2015, 1, 2)
+                and s.option.price != s.option.trade_open_info.price]
+    assert repriced and sorted(marked) == sorted(repriced)
+    assert portfolio.current_value == portfolio._calculate_current_value()
+
+
+@pytest.mark.parametrize('vectorised', [True, False])
+def test_portfolio_chains_do_not_check_legs_for_expiration(daily_file_settings, vectorised):
+    original_mode = settings.get('vectorised_updates', True)
+    settings['vectorised_updates'] = vectorised
+    try:
+        symbol = 'AAPL'
+        quote_datetime = datetime.datetime(2014, 12, 30, 0, 0)
+        portfolio = OptionPortfolio(100_000, quote_datetime, datetime.datetime(2015, 1, 7, 0, 0))
+        portfolio.next(quote_datetime, [symbol])
+        records = [x for x in portfolio.option_chains[symbol].options if x['expiration'] > datetime.date(2015, 1, 7)]
+        singles = [Single(options=[Option(**record)], spread_type=OptionSpreadType.SINGLE) for record in records[:6]]
+        for single in singles:
+            portfolio.open_position(single, 1)
+        assert len(portfolio._expiration_heap) == len(portfolio._expiration_times) == len(
+            {single.option.expiration for single in singles})
+
+        with (mock.patch.object(Option, 'is_expired', side_effect=AssertionError('expiration checked')),
+              mock.patch.object(PositionBook, 'expired', side_effect=AssertionError('expiration checked'))):
+            portfolio.next(datetime.datetime(2015, 1, 2), [symbol])
+        assert all(single.option.quote_datetime == datetime.datetime(2015, 1, 2) for single in singles)
+    finally:
+        settings['vectorised_updates'] = original_mode
+
+
+def test_portfolios_flush_equity_curves_to_their_own_folders(tmp_path):
+    pytest.importorskip('pyarrow')
+    original = {name: settings.get(name) for name in ('equity_curve_flush_rows', 'equity_curve_folder')}
+    settings['equity_curve_flush_rows'] = 2
+    settings['equity_curve_folder'] = str(tmp_path)
+    try:
+        quote_datetime = datetime.datetime(2014, 12, 30, 0, 0)
+        folders = []
+        for _ in range(2):
+            portfolio = OptionPortfolio(100_000, quote_datetime, datetime.datetime(2015, 1, 7, 0, 0))
+            for day in range(3):
+                portfolio.close_values.append(quote_datetime + datetime.timedelta(days=day), 100_000.0)
+            folders.append(portfolio.close_values.folder)
+    finally:
+        for name, value in original.items():
+            if value is None:
+                settings.pop(name, None)
+            else:
+                settings[name] = value
+
+    assert folders[0] != folders[1]
+    assert all(folder.parent == tmp_path and len(list(folder.glob('part-*.parquet'))) == 1 for folder in folders)
+
+
+def test_portfolio_value_in_decimal_mode(daily_file_settings, check_portfolio_value):
+    original_mode = settings.get('numeric_mode', 'cents')
+    settings['numeric_mode'] = 'decimal'
+    try:
+        symbol = 'AAPL'
+        quote_datetime = datetime.datetime(2014, 12, 30, 0, 0)
+        portfolio = OptionPortfolio(100_000.37, quote_datetime, datetime.datetime(2015, 1, 7, 0, 0))
+        portfolio.next(quote_datetime, [symbol])
+        records = [x for x in portfolio.option_chains[symbol].options if x['expiration'] > datetime.date(2015, 1, 7)]
+        for i, record in enumerate(records[:30:3]):
+            portfolio.open_position(Single(options=[Option(**record)], spread_type=OptionSpreadType.SINGLE),
+                                    1 if i % 2 else -1)
+        for day in [datetime.datetime(2014, 12, 31), datetime.datetime(2015, 1, 2)]:
+            portfolio.next(day, [symbol])
+            assert portfolio.current_value == portfolio._calculate_current_value()
+    finally:
+        settings['numeric_mode'] = original_mode
+
+
+def test_portfolio_value_check_fails_when_options_change_outside_the_portfolio(daily_file_settings,
+                                                                             check_portfolio_value):
+    symbol = 'AAPL'
+    quote_datetime = datetime.datetime(2014, 12, 30, 0, 0)
+    portfolio = OptionPortfolio(100_000, quote_datetime, datetime.datetime(2015, 1, 7, 0, 0))
+    portfolio.next(quote_datetime, [symbol])
+    option = Option(**portfolio.option_chains[symbol].options[61])
+    portfolio.open_position(Single(options=[option], spread_type=OptionSpreadType.SINGLE), 1)
+
+    option.price += 1
+    with pytest.raises(AssertionError, match='does not match the recalculated value'):
+        portfolio.current_value
+
+
+def test_expired_positions_are_found_and_closed(daily_file_settings):
+    symbol = 'AAPL'
+    quote_datetime = datetime.datetime(2014, 12, 30, 0, 0)
+    portfolio = OptionPortfolio(100_000, quote_datetime, datetime.datetime(2015, 1, 7, 0, 0))
+    portfolio.next(quote_datetime, [symbol])
+    records = [x for x in portfolio.option_chains[symbol].options if x['expiration'] == datetime.date(2015, 1, 2)]
+    expiring = Single(options=[Option(**records[10])], spread_type=OptionSpreadType.SINGLE)
+    portfolio.open_position(expiring, 1)
+    assert portfolio.get_open_position_by_id(expiring.position_id) is expiring
+
+    for day in [datetime.datetime(2014, 12, 31), datetime.datetime(2015, 1, 2), datetime.datetime(2015, 1, 5)]:
+        portfolio.next(day, [symbol])
+
+    assert OptionStatus.EXPIRED in expiring.option.status
+    assert portfolio.get_open_position_by_id(expiring.position_id) is None
+    assert portfolio.get_closed_position_by_id(expiring.position_id) is expiring
+    with pytest.raises(ValueError, match='not in open positions list'):
+        portfolio.close_position(expiring.position_id)
+
+
+def test_expirations_are_settled_when_the_clock_passes_the_close(intraday_file_settings):
+    symbol = 'SPXW'
+    quote_datetime = datetime.datetime(2016, 4, 29, 15, 30)
+    portfolio = OptionPortfolio(1_000_000, quote_datetime, datetime.datetime(2016, 5, 2, 10, 0))
+    portfolio.next(quote_datetime, [symbol])
+    records = [x for x in portfolio.option_chains[symbol].options if x['expiration'] == datetime.date(2016, 4, 29)]
+    expiring = Single(options=[Option(**records[len(records) // 2])], spread_type=OptionSpreadType.SINGLE)
+    portfolio.open_position(expiring, 1)
+    assert portfolio._expiration_heap == [datetime.datetime(2016, 4, 29, 16, 0)]
+
+    portfolio.next(datetime.datetime(2016, 4, 29, 15, 45), [symbol])
+    assert OptionStatus.EXPIRED not in expiring.option.status
+    assert portfolio.get_open_position_by_id(expiring.position_id) is expiring
+
+    portfolio.next(datetime.datetime(2016, 4, 29, 16, 0), [symbol])
+    assert OptionStatus.EXPIRED in expiring.option.status
+    assert OptionStatus.TRADE_IS_CLOSED in expiring.option.status
+    assert portfolio.get_closed_position_by_id(expiring.position_id) is expiring
+    assert portfolio._expiration_heap == []
+
+
+def test_spread_trade_updates_cash_once(daily_file_settings):
+    symbol = 'AAPL'
+    quote_datetime = datetime.datetime(2014, 12, 30, 0, 0)
+    portfolio = OptionPortfolio(100_000, quote_datetime, datetime.datetime(2015, 1, 7, 0, 0))
+    sink = MemorySink()
+    portfolio.event_log = EventLog(level=INFO, sinks=[sink])
+    portfolio.next(quote_datetime, [symbol])
+    vertical = Vertical.create(portfolio.option_chains[symbol], datetime.date(2015, 1, 17), option_type='call',
+                               long_strike=100.0, short_strike=110.0)
+    portfolio.open_position(vertical, 2)
+
+    legs = [o.trade_open_info for o in vertical.options]
+    assert portfolio.cash == 100_000 - sum(leg.premium for leg in legs) - sum(leg.fees for leg in legs)
+    assert [r['event'] for r in sink.records] == ['position_opened']
+    assert sink.records[0]['legs'] == 2
+    assert sink.records[0]['fees'] == 4 * vertical.long_option.fee_per_contract
+
+
+def test_margin_check_does_not_change_cash(daily_file_settings):
+    symbol = 'AAPL'
+    quote_datetime = datetime.datetime(2014, 12, 30, 0, 0)
+    portfolio = OptionPortfolio(100_000, quote_datetime, datetime.datetime(2015, 1, 7, 0, 0))
+    portfolio.next(quote_datetime, [symbol])
+    portfolio.cash = 100
+    vertical = Vertical.create(portfolio.option_chains[symbol], datetime.date(2015, 1, 17), option_type='call',
+                               long_strike=110.0, short_strike=100.0)
+
+    with pytest.raises(ValueError, match='Insufficient margin'):
+        portfolio.open_position(vertical, 1)
+    assert portfolio.cash == 100
+    assert len(portfolio.positions) == 0
+    assert portfolio._transaction is None
+
+
+def test_rejected_position_leaves_legs_unopened(daily_file_settings):
+    symbol = 'AAPL'
+    quote_datetime = datetime.datetime(2014, 12, 30, 0, 0)
+    portfolio = OptionPortfolio(100_000, quote_datetime, datetime.datetime(2015, 1, 7, 0, 0))
+    portfolio.next(quote_datetime, [symbol])
+    portfolio.cash = 100
+    vertical = Vertical.create(portfolio.option_chains[symbol], datetime.date(2015, 1, 17), option_type='call',
+                               long_strike=110.0, short_strike=100.0)
+
+    def leg_states():
+        return [(o.status, o.quantity, o.position_type, o.total_fees, o.trade_open_info, o.event_bus)
+                for o in vertical.options]
+
+    before = leg_states()
+    assert [state[1:3] for state in before] == [(1, OptionPositionType.LONG), (-1, OptionPositionType.SHORT)]
+    with pytest.raises(ValueError, match='Insufficient margin'):
+        portfolio.open_position(vertical, 1)
+    assert leg_states() == before
+
+    # the same legs can be opened once there is enough cash
+    portfolio.cash = 100_000
+    portfolio.open_position(vertical, 1)
+    assert all(OptionStatus.TRADE_IS_OPEN in option.status for option in vertical.options)
+    assert portfolio.cash == pytest.approx(
+        100_000 - vertical.trade_value - sum(option.total_fees for option in vertical.options))
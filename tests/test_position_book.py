@@ -0,0 +1,90 @@
+import datetime
+
+import pytest
+
+from options_framework.option import Option
+from options_framework.option_chain import OptionChain
+from options_framework.option_types import OptionStatus
+from options_framework.position_book import PositionBook
+
+QUOTE_ATTRIBUTES = ['quote_datetime', 'spot_price', 'bid', 'ask', 'price', 'delta', 'gamma', 'theta', 'vega', 'rho',
+                    'open_interest', 'volume', 'implied_volatility', 'status', 'quantity']
+
+
+@pytest.fixture
+def chain(daily_file_settings):
+    option_chain = OptionChain('AAPL', quote_datetime=datetime.datetime(2014, 12, 31),
+                               end_datetime=datetime.datetime(2015, 1, 7))
+    option_chain.on_next(datetime.datetime(2014, 12, 31))
+    return option_chain
+
+
+def open_options(records: list[dict]) -> list[Option]:
+    options = [Option(**record) for record in records]
+    for i, option in enumerate(options):
+        option.open_trade(quantity=1 if i % 2 else -2)
+    return options
+
+
+def test_position_book_update_matches_option_next(chain):
+    records = chain.options[::25]
+    expected, actual = open_options(records), open_options(records)
+    book = PositionBook(actual)
+
+    for quote_datetime in [datetime.datetime(2015, 1, 2), datetime.datetime(2015, 1, 5)]:
+        chain.on_next(quote_datetime)
+        quote_date = quote_datetime.date()
+        open_ids = [o.option_id for o in expected if o.expiration >= quote_date]
+        quotes = chain.timeslot.get_records(open_ids)
+        for option in expected:
+            if option.expiration < quote_date:
+                option.next({'option_id': option.option_id, 'quote_datetime': quote_datetime})
+            elif option.option_id in quotes:
+                option.next(quotes[option.option_id])
+        book.update(quote_datetime, chain.timeslot.get_columns(open_ids))
+
+        for a, b in zip(expected, actual):
+            assert [getattr(a, name) for name in QUOTE_ATTRIBUTES] == [getattr(b, name) for name in QUOTE_ATTRIBUTES]
+
+    # some legs expired on 1/2/2015 and were closed through Option.next
+    assert any(OptionStatus.EXPIRED in o.status for o in actual)
+    assert any(OptionStatus.EXPIRED not in o.status for o in actual)
+
+
+def test_position_book_expired_is_vectorised_is_expired(chain):
+    options = [Option(**record) for record in chain.options[::25]]
+    book = PositionBook(options)
+    for quote_datetime in [datetime.datetime(2015, 1, 2, 9, 31), datetime.datetime(2015, 1, 2, 16, 0)]:
+        expired = book.expired(quote_datetime).tolist()
+        assert expired == [quote_datetime.date() > o.expiration or
+                           (quote_datetime.date() == o.expiration and quote_datetime.time() >= datetime.time(16))
+                           for o in options]
+
+
+def test_position_book_prices_match_options(chain):
+    options = open_options(chain.options[::25])
+    book = PositionBook(options)
+    chain.on_next(datetime.datetime(2015, 1, 2))
+    open_ids = [o.option_id for o in options]
+    book.update(datetime.datetime(2015, 1, 2), chain.timeslot.get_columns(open_ids))
+
+    price_cents = book.price_cents.tolist()
+    for i, option in enumerate(options):
+        if OptionStatus.EXPIRED not in option.status:
+            assert price_cents[i] == round(option.price * 100)
+
+
+def test_position_book_rejects_dates(chain):
+    book = PositionBook([Option(**chain.options[0])])
+    with pytest.raises(ValueError, match='Wrong format for option date'):
+        book.update(datetime.date(2015, 1, 2), chain.timeslot.get_columns([]))
+
+
+def test_on_next_options_uses_position_book(chain):
+    option = Option(**chain.options[2])
+    chain.on_next(datetime.datetime(2015, 1, 2))
+    chain.on_next_options([option])
+
+    assert chain.position_book.holds([option])
+    assert option.price == 34.3
+    assert option.quote_datetime == datetime.datetime(2015, 1, 2)
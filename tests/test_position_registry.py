@@ -0,0 +1,58 @@
+import datetime
+
+import pytest
+
+from options_framework.option import Option
+from options_framework.option_types import OptionSpreadType
+from options_framework.position_registry import PositionRegistry
+from options_framework.spreads.single import Single
+from test_data.test_option_data import daily_option_data
+
+
+@pytest.fixture
+def singles():
+    records = [x for x in daily_option_data if x['quote_datetime'] == datetime.datetime(2014, 12, 30)]
+    return [Single(options=[Option(**record)], spread_type=OptionSpreadType.SINGLE) for record in records[:20]]
+
+
+def test_registry_finds_positions_by_each_index(singles):
+    registry = PositionRegistry()
+    for single in singles:
+        registry.add(single)
+
+    assert len(registry) == len(singles)
+    assert list(registry) == singles
+    for single in singles:
+        assert registry.get(single.position_id) is single
+        assert registry.get_by_instance_id(single.option.instance_id) is single
+        assert single in registry
+    assert registry.get_by_symbol('AAPL') == singles
+    assert registry.has_symbol('AAPL')
+    for expiration in registry.expirations:
+        assert registry.get_by_expiration(expiration) == [s for s in singles if s.option.expiration == expiration]
+
+
+def test_registry_remove_clears_every_index(singles):
+    registry = PositionRegistry()
+    for single in singles:
+        registry.add(single)
+    for single in singles[:-1]:
+        registry.remove(single)
+
+    last = singles[-1]
+    assert list(registry) == [last]
+    assert registry.get(singles[0].position_id) is None
+    assert registry.get_by_instance_id(singles[0].option.instance_id) is None
+    assert registry.expirations == [last.option.expiration]
+    registry.remove(last)
+    assert not registry.has_symbol('AAPL')
+    assert registry.get_by_symbol('AAPL') == []
+
+
+def test_registry_rejects_duplicates_and_unknown_positions(singles):
+    registry = PositionRegistry()
+    registry.add(singles[0])
+    with pytest.raises(ValueError, match='already in the registry'):
+        registry.add(singles[0])
+    with pytest.raises(ValueError, match='not in the registry'):
+        registry.remove(singles[1])
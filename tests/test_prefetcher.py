@@ -0,0 +1,113 @@
+import datetime
+import threading
+
+import pytest
+
+from options_framework.config import settings
+from options_framework.option import Option
+from options_framework.option_chain import OptionChain
+from options_framework.option_types import FilterRange, SelectFilter
+from options_framework.storage.prefetcher import TimeslotPrefetcher
+from options_framework.storage.timeslot import Timeslot
+
+
+@pytest.fixture
+def prefetch_settings():
+    original_enabled = settings.get('prefetch_enabled', False)
+    original_depth = settings.get('prefetch_depth', 2)
+    settings['prefetch_enabled'] = True
+    settings['prefetch_depth'] = 2
+    yield
+    settings['prefetch_enabled'] = original_enabled
+    settings['prefetch_depth'] = original_depth
+
+
+def make_loader():
+    loaded = []
+
+    def load(quote_datetime):
+        loaded.append((quote_datetime, threading.current_thread().name))
+        return Timeslot('AAPL', quote_datetime, _records=[])
+
+    return load, loaded
+
+
+def test_prefetcher_loads_on_worker_thread():
+    load, loaded = make_loader()
+    prefetcher = TimeslotPrefetcher(load, depth=2)
+    quote_datetimes = [datetime.datetime(2015, 1, d) for d in (2, 5, 6)]
+
+    prefetcher.prefetch(quote_datetimes)
+    timeslot = prefetcher.get(quote_datetimes[0])
+    prefetcher.get(quote_datetimes[1])
+    prefetcher.close()
+
+    assert timeslot.quote_datetime == quote_datetimes[0]
+    assert [d for d, _ in loaded] == quote_datetimes[:2]
+    assert all(name.startswith('timeslot-prefetch') for _, name in loaded)
+
+
+def test_prefetcher_loads_timeslot_that_was_not_prefetched():
+    load, loaded = make_loader()
+    prefetcher = TimeslotPrefetcher(load, depth=1)
+    quote_datetime = datetime.datetime(2015, 1, 7)
+
+    assert prefetcher.get(quote_datetime).quote_datetime == quote_datetime
+    prefetcher.close()
+    # after closing, timeslots are loaded on the calling thread
+    assert prefetcher.get(quote_datetime).quote_datetime == quote_datetime
+    assert loaded[-1][1] == threading.current_thread().name
+
+
+def test_prefetcher_runs_calls_on_worker_thread():
+    prefetcher = TimeslotPrefetcher(make_loader()[0], depth=1)
+    assert prefetcher.run(lambda: threading.current_thread().name).startswith('timeslot-prefetch')
+    prefetcher.close()
+    assert prefetcher.run(lambda: threading.current_thread().name) == threading.current_thread().name
+
+
+def test_prefetcher_depth_must_be_positive():
+    with pytest.raises(ValueError):
+        TimeslotPrefetcher(make_loader()[0], depth=0)
+
+
+def test_option_chain_with_prefetch_loads_same_options(daily_file_settings, prefetch_settings):
+    quote_date = datetime.datetime(2014, 12, 30)
+    end_date = datetime.datetime(2015, 1, 7)
+    option_chain = OptionChain('AAPL', quote_datetime=quote_date, end_datetime=end_date)
+    assert option_chain.prefetcher is not None
+
+    for quote_datetime in list(option_chain.datetimes):
+        option_chain.on_next(quote_datetime)
+        assert len(option_chain.options) > 0
+        assert all(x['quote_datetime'] == quote_datetime for x in option_chain.options)
+    option_chain.close()
+
+
+def test_option_chain_with_prefetch_loads_unfiltered_quotes_on_worker(daily_file_settings, prefetch_settings):
+    quote_date = datetime.datetime(2014, 12, 30)
+    end_date = datetime.datetime(2015, 1, 7)
+    whole_chain = OptionChain('AAPL', quote_datetime=quote_date, end_datetime=end_date)
+    whole_chain.on_next(quote_date)
+    select_filter = SelectFilter(expiration_dte=FilterRange(high=10))
+    outside = next(x for x in whole_chain.options if (x['expiration'] - quote_date.date()).days > 10)
+    whole_chain.close()
+
+    option_chain = OptionChain('AAPL', quote_datetime=quote_date, end_datetime=end_date,
+                               select_filter=select_filter)
+    store = option_chain.timeslot_store
+    threads = []
+    load_timeslot = store.load_timeslot
+
+    def record_thread(quote_datetime):
+        threads.append(threading.current_thread().name)
+        return load_timeslot(quote_datetime)
+
+    store.load_timeslot = record_thread
+    option_chain.on_next(quote_date)
+    option = Option(**outside)
+    option_chain.on_next_options([option])
+    option_chain.close()
+
+    assert threads and all(name.startswith('timeslot-prefetch') for name in threads)
+    assert option.quote_datetime == quote_date
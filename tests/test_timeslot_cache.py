@@ -0,0 +1,118 @@
+import datetime
+
+import pytest
+
+from options_framework.config import settings
+from options_framework.option_chain import OptionChain
+from options_framework.storage.numpy_store import NumpyTimeslotStore
+from options_framework.storage.pickle_store import PickleTimeslotStore
+from options_framework.storage.timeslot import Timeslot, records_to_columns
+from options_framework.storage.timeslot_cache import TimeslotCache, get_timeslot_cache
+
+
+@pytest.fixture
+def timeslot_cache_settings():
+    original_bytes = settings.get('timeslot_cache_bytes', 0)
+    settings['timeslot_cache_bytes'] = 50_000_000
+    get_timeslot_cache().clear()
+    yield
+    get_timeslot_cache().clear()
+    settings['timeslot_cache_bytes'] = original_bytes
+
+
+DAILY_STORE = PickleTimeslotStore('AAPL', 'daily', 'data')
+
+
+def make_timeslot(day: int, rows: int = 10) -> Timeslot:
+    records = [{'option_id': f'AAPL{day}{i}', 'strike': 100.0 + i} for i in range(rows)]
+    return Timeslot('AAPL', datetime.datetime(2015, 1, day), _columns=records_to_columns(records))
+
+
+def test_cache_hit_and_miss_counters():
+    cache = TimeslotCache(max_bytes=1_000_000)
+    timeslot = make_timeslot(2)
+
+    assert cache.get(DAILY_STORE, timeslot.quote_datetime) is None
+    cache.put(DAILY_STORE, timeslot)
+
+    assert cache.get(DAILY_STORE, timeslot.quote_datetime) is timeslot
+    assert cache.get(PickleTimeslotStore('AAPL', 'intraday', 'data'), timeslot.quote_datetime) is None
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 2
+
+
+def test_cache_keeps_stores_apart():
+    cache = TimeslotCache(max_bytes=1_000_000)
+    timeslot = make_timeslot(2)
+    cache.put(DAILY_STORE, timeslot)
+
+    assert cache.get(PickleTimeslotStore('AAPL', 'daily', 'data'), timeslot.quote_datetime) is timeslot
+    assert cache.get(PickleTimeslotStore('AAPL', 'daily', 'other_data'), timeslot.quote_datetime) is None
+    assert cache.get(NumpyTimeslotStore('AAPL', 'daily', 'data'), timeslot.quote_datetime) is None
+
+
+def test_cache_evicts_least_recently_used_by_bytes():
+    timeslots = [make_timeslot(day) for day in (2, 5, 6)]
+    cache = TimeslotCache(max_bytes=timeslots[0].nbytes * 2)
+    cache.put(DAILY_STORE, timeslots[0])
+    cache.put(DAILY_STORE, timeslots[1])
+    cache.get(DAILY_STORE, timeslots[0].quote_datetime)
+
+    cache.put(DAILY_STORE, timeslots[2])
+
+    assert cache.evictions == 1
+    assert cache.get(DAILY_STORE, timeslots[1].quote_datetime) is None
+    assert cache.get(DAILY_STORE, timeslots[0].quote_datetime) is timeslots[0]
+    assert cache.current_bytes <= cache.max_bytes
+
+
+def test_cache_does_not_keep_timeslot_larger_than_budget():
+    timeslot = make_timeslot(2, rows=100)
+    cache = TimeslotCache(max_bytes=timeslot.nbytes - 1)
+
+    cache.put(DAILY_STORE, timeslot)
+
+    assert len(cache) == 0
+    assert cache.current_bytes == 0
+
+
+def test_cache_is_off_by_default():
+    assert settings.get('timeslot_cache_bytes', 0) == 0
+    assert get_timeslot_cache() is None
+
+
+def test_option_chains_share_cached_timeslots(daily_file_settings, timeslot_cache_settings):
+    quote_date = datetime.datetime(2014, 12, 30)
+    end_date = datetime.datetime(2015, 1, 7)
+    first = OptionChain('AAPL', quote_datetime=quote_date, end_datetime=end_date)
+    first.on_next(quote_date)
+    second = OptionChain('AAPL', quote_datetime=quote_date, end_datetime=end_date)
+    second.on_next(quote_date)
+
+    assert second.timeslot is first.timeslot
+    assert get_timeslot_cache().hits == 1
+    assert get_timeslot_cache().misses == 1
+
+
+def test_cache_measures_timeslots_again_when_one_is_added():
+    cache = TimeslotCache(max_bytes=10_000_000)
+    first, second = make_timeslot(2, rows=50), make_timeslot(5, rows=50)
+    cache.put(DAILY_STORE, first)
+    columns_bytes = cache.current_bytes
+
+    first.build_records()
+    first.chain_index
+    cache.put(DAILY_STORE, second)
+
+    assert first.nbytes > columns_bytes
+    assert cache.current_bytes == first.nbytes + second.nbytes
+
+
+def test_option_chain_caches_timeslot_with_its_records(daily_file_settings, timeslot_cache_settings):
+    quote_date = datetime.datetime(2014, 12, 30)
+    chain = OptionChain('AAPL', quote_datetime=quote_date, end_datetime=datetime.datetime(2015, 1, 7))
+    assert not chain.lazy_loading
+    chain.on_next(quote_date)
+
+    assert chain.timeslot._records is not None
+    assert get_timeslot_cache().current_bytes == chain.timeslot.nbytes
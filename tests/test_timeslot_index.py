@@ -0,0 +1,79 @@
+import datetime
+
+import pytest
+
+from options_framework.storage.pickle_store import PickleTimeslotStore
+from options_framework.storage.timeslot_index import to_epoch_minutes, from_epoch_minutes
+
+
+@pytest.fixture
+def source_store(daily_file_settings):
+    return PickleTimeslotStore('AAPL')
+
+
+@pytest.fixture
+def december_store(tmp_path, source_store):
+    store = PickleTimeslotStore('AAPL', options_directory=tmp_path)
+    store.write_timeslots(source_store.iter_timeslots(datetime.datetime(2014, 12, 1), datetime.datetime(2014, 12, 31)))
+    return store
+
+
+def test_epoch_minutes_round_trip():
+    quote_datetime = datetime.datetime(2016, 4, 28, 10, 45)
+    assert from_epoch_minutes(to_epoch_minutes(quote_datetime)) == quote_datetime
+
+
+def test_index_is_saved_when_first_used(december_store):
+    assert not december_store.index.path.exists()
+
+    datetimes = december_store.get_datetimes(datetime.datetime.min, datetime.datetime.max)
+
+    assert december_store.index.path.exists()
+    assert datetimes == [datetime.datetime(2014, 12, 30), datetime.datetime(2014, 12, 31)]
+
+
+def test_saved_index_is_used_without_scanning_months(december_store, monkeypatch):
+    december_store.get_datetimes(datetime.datetime.min, datetime.datetime.max)
+
+    store = PickleTimeslotStore('AAPL', options_directory=december_store.options_directory)
+
+    def fail_scan(month):
+        raise AssertionError(f'{month} should not be scanned')
+
+    monkeypatch.setattr(store, 'scan_month', fail_scan)
+    datetimes = store.get_datetimes(datetime.datetime.min, datetime.datetime.max)
+
+    assert datetimes == [datetime.datetime(2014, 12, 30), datetime.datetime(2014, 12, 31)]
+
+
+def test_only_new_months_are_scanned(december_store, source_store, monkeypatch):
+    december_store.get_datetimes(datetime.datetime.min, datetime.datetime.max)
+    december_store.write_timeslots(source_store.iter_timeslots(datetime.datetime(2015, 1, 1),
+                                                               datetime.datetime(2015, 1, 31)))
+
+    store = PickleTimeslotStore('AAPL', options_directory=december_store.options_directory)
+    scanned = []
+    scan_month = store.scan_month
+
+    def record_scan(month):
+        scanned.append(month)
+        return scan_month(month)
+
+    monkeypatch.setattr(store, 'scan_month', record_scan)
+    datetimes = store.get_datetimes(datetime.datetime.min, datetime.datetime.max)
+
+    assert scanned == ['2015_01']
+    assert datetimes == source_store.get_datetimes(datetime.datetime.min, datetime.datetime.max)
+
+
+def test_index_date_range_query(december_store, source_store):
+    december_store.write_timeslots(source_store.iter_timeslots(datetime.datetime(2015, 1, 1),
+                                                               datetime.datetime(2015, 1, 31)))
+    start = datetime.datetime(2014, 12, 31)
+    end = datetime.datetime(2015, 1, 5, 23, 59)
+
+    datetimes = december_store.index.get_datetimes(start, end)
+
+    assert datetimes == [datetime.datetime(2014, 12, 31), datetime.datetime(2015, 1, 2), datetime.datetime(2015, 1, 5)]
+    assert december_store.index.find(datetime.datetime(2015, 1, 3)) is None
+    assert december_store.index.find(datetime.datetime(2015, 1, 2)) is not None
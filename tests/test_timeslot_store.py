@@ -0,0 +1,305 @@
+import datetime
+
+import pytest
+
+from options_framework.config import settings
+from options_framework.option_chain import OptionChain
+from options_framework.option_types import SelectFilter, FilterRange
+from options_framework.storage.numpy_store import NumpyTimeslotStore
+from options_framework.storage.pickle_store import PickleTimeslotStore
+from options_framework.storage.timeslot import Timeslot, records_to_columns, columns_to_records
+from options_framework.storage.timeslot_store import get_timeslot_store, copy_timeslots
+
+pa = pytest.importorskip('pyarrow')
+from options_framework.storage.arrow_store import ArrowTimeslotStore
+
+
+@pytest.fixture
+def arrow_store(tmp_path, daily_file_settings):
+    source = PickleTimeslotStore('AAPL')
+    target = ArrowTimeslotStore('AAPL', options_directory=tmp_path)
+    copy_timeslots(source, target)
+    return source, target
+
+
+@pytest.fixture
+def arrow_data_store_settings(tmp_path):
+    original_store = settings.get('data_store', 'pickle')
+    original_directory = settings['options_directory']
+    settings['data_store'] = 'arrow'
+    settings['options_directory'] = str(tmp_path)
+    yield
+    settings['data_store'] = original_store
+    settings['options_directory'] = original_directory
+
+
+def test_get_timeslot_store_uses_data_store_setting(daily_file_settings):
+    store = get_timeslot_store('AAPL')
+    assert isinstance(store, PickleTimeslotStore)
+    assert store.folder.name == 'timeslots'
+
+    store = get_timeslot_store('AAPL', data_store='arrow')
+    assert isinstance(store, ArrowTimeslotStore)
+
+    with pytest.raises(ValueError):
+        get_timeslot_store('AAPL', data_store='csv')
+
+
+def test_timeslot_records_and_columns_round_trip(daily_file_settings):
+    quote_datetime = datetime.datetime(2014, 12, 30, 0, 0)
+    timeslot = PickleTimeslotStore('AAPL').load_timeslot(quote_datetime)
+
+    columns = records_to_columns(timeslot.records)
+    records = columns_to_records('AAPL', quote_datetime, columns)
+
+    assert records == timeslot.records
+    assert type(records[0]['expiration']) == datetime.date
+    assert type(records[0]['strike']) == float
+    assert type(records[0]['open_interest']) == int
+
+
+def test_timeslot_requires_records_or_columns():
+    with pytest.raises(ValueError):
+        Timeslot('AAPL', datetime.datetime(2014, 12, 30, 0, 0))
+
+
+def test_timeslot_get_record_by_option_id(daily_file_settings):
+    quote_datetime = datetime.datetime(2014, 12, 30, 0, 0)
+    timeslot = PickleTimeslotStore('AAPL').load_timeslot(quote_datetime)
+    record = timeslot.records[25]
+
+    assert timeslot.get_record(record['option_id']) is record
+    assert timeslot.get_record('not an option') is None
+
+    columnar = Timeslot('AAPL', quote_datetime, _columns=records_to_columns(timeslot.records))
+    assert columnar.get_record(record['option_id']) == record
+
+
+def test_timeslot_get_row_builds_one_record(daily_file_settings):
+    quote_datetime = datetime.datetime(2014, 12, 30, 0, 0)
+    timeslot = PickleTimeslotStore('AAPL').load_timeslot(quote_datetime)
+    assert timeslot.get_row(25) is timeslot.records[25]
+
+    columnar = Timeslot('AAPL', quote_datetime, _columns=records_to_columns(timeslot.records))
+    assert columnar.get_row(25) == timeslot.records[25]
+    assert columnar.get_row(-1) == timeslot.records[-1]
+    assert columnar._records is None
+
+
+def test_pickle_store_raises_when_timeslot_not_found(daily_file_settings):
+    store = PickleTimeslotStore('AAPL')
+    with pytest.raises(ValueError):
+        store.load_timeslot(datetime.datetime(2014, 12, 29, 0, 0))
+
+
+def test_arrow_store_has_same_datetimes_as_pickle_store(arrow_store):
+    source, target = arrow_store
+    start, end = datetime.datetime(2014, 12, 31, 0, 0), datetime.datetime(2015, 1, 6, 0, 0)
+
+    assert target.month_file('2014_12').exists()
+    assert target.month_file('2015_01').exists()
+    assert target.get_datetimes(start, end) == source.get_datetimes(start, end)
+
+
+def test_arrow_store_loads_same_records_as_pickle_store(arrow_store):
+    source, target = arrow_store
+    quote_datetime = datetime.datetime(2015, 1, 2, 0, 0)
+
+    expected = source.load_timeslot(quote_datetime).records
+    timeslot = target.load_timeslot(quote_datetime)
+
+    assert len(timeslot) == len(expected)
+    assert timeslot.records == expected
+
+
+def test_arrow_store_columns_are_zero_copy(arrow_store):
+    _, target = arrow_store
+    timeslot = target.load_timeslot(datetime.datetime(2015, 1, 2, 0, 0))
+
+    assert not timeslot.columns['strike'].flags.owndata
+    assert not timeslot.columns['strike'].flags.writeable
+
+
+def test_arrow_store_timeslot_is_measured_without_converting_columns(arrow_store):
+    _, target = arrow_store
+    timeslot = target.load_timeslot(datetime.datetime(2014, 12, 30))
+
+    assert timeslot.nbytes > 0
+    assert timeslot._columns._arrays == {}
+
+
+def test_arrow_store_raises_when_timeslot_not_found(arrow_store):
+    _, target = arrow_store
+    with pytest.raises(ValueError):
+        target.load_timeslot(datetime.datetime(2015, 1, 3, 0, 0))
+    with pytest.raises(ValueError):
+        target.load_timeslot(datetime.datetime(2015, 3, 2, 0, 0))
+
+
+def test_option_chain_loads_from_arrow_store(arrow_store, arrow_data_store_settings):
+    quote_datetime = datetime.datetime(2014, 12, 31, 0, 0)
+    end_datetime = datetime.datetime(2015, 1, 5, 0, 0)
+    option_chain = OptionChain('AAPL', quote_datetime=quote_datetime, end_datetime=end_datetime)
+
+    assert isinstance(option_chain.timeslot_store, ArrowTimeslotStore)
+    assert option_chain.datetimes[0] == quote_datetime
+
+    option_chain.on_next(quote_datetime)
+
+    assert len(option_chain.options) > 0
+    assert len(option_chain.expiration_strikes[option_chain.expirations[0]]) > 0
+
+
+@pytest.fixture
+def numpy_store(tmp_path, daily_file_settings):
+    source = PickleTimeslotStore('AAPL')
+    target = NumpyTimeslotStore('AAPL', options_directory=tmp_path)
+    copy_timeslots(source, target)
+    return source, target
+
+
+def test_numpy_store_has_same_datetimes_as_pickle_store(numpy_store):
+    source, target = numpy_store
+    start, end = datetime.datetime(2014, 12, 31, 0, 0), datetime.datetime(2015, 1, 6, 0, 0)
+
+    assert target.chain_file('2014_12').exists()
+    assert target.index_file('2015_01').exists()
+    assert target.get_datetimes(start, end) == source.get_datetimes(start, end)
+
+
+def test_numpy_store_loads_same_records_as_pickle_store(numpy_store):
+    source, target = numpy_store
+    quote_datetime = datetime.datetime(2014, 12, 31, 0, 0)
+
+    expected = source.load_timeslot(quote_datetime).records
+    timeslot = target.load_timeslot(quote_datetime)
+
+    assert len(timeslot) == len(expected)
+    assert timeslot.records == expected
+
+
+def test_numpy_store_timeslot_is_slice_of_memory_map(numpy_store):
+    _, target = numpy_store
+    timeslot = target.load_timeslot(datetime.datetime(2015, 1, 5, 0, 0))
+
+    strikes = timeslot.columns['strike']
+    assert strikes.base is not None
+    assert not strikes.flags.writeable
+
+
+def test_numpy_store_timeslot_is_measured_without_decoding_columns(numpy_store):
+    _, target = numpy_store
+    timeslot = target.load_timeslot(datetime.datetime(2014, 12, 30))
+
+    assert timeslot.nbytes == timeslot._columns._rows.nbytes
+    assert timeslot._columns._decoded == {}
+
+
+def test_numpy_store_raises_when_timeslot_not_found(numpy_store):
+    _, target = numpy_store
+    with pytest.raises(ValueError):
+        target.load_timeslot(datetime.datetime(2015, 1, 3, 0, 0))
+    with pytest.raises(ValueError):
+        target.load_timeslot(datetime.datetime(2015, 3, 2, 0, 0))
+
+
+def test_numpy_store_get_records_does_not_build_all_records(numpy_store):
+    source, target = numpy_store
+    quote_datetime = datetime.datetime(2015, 1, 2, 0, 0)
+    expected = source.load_timeslot(quote_datetime).records[10:13]
+    timeslot = target.load_timeslot(quote_datetime)
+
+    option_quotes = timeslot.get_records([r['option_id'] for r in expected] + ['not an option'])
+
+    assert option_quotes == {r['option_id']: r for r in expected}
+    assert timeslot._records is None
+
+
+def expected_filtered_records(records, select_filter, quote_datetime):
+    spot_price = records[0]['spot_price']
+    low_strike, high_strike = select_filter.strike_range(spot_price)
+    first_expiration, last_expiration = select_filter.expiration_days(quote_datetime)
+    return sorted([r for r in records
+                   if first_expiration <= (r['expiration'] - datetime.date(1970, 1, 1)).days <= last_expiration
+                   and low_strike <= r['strike'] <= high_strike],
+                  key=lambda r: (r['expiration'], r['strike']))
+
+
+def test_load_filtered_by_expiration_dte_and_strike_offset(numpy_store, arrow_store):
+    source, _ = numpy_store
+    quote_datetime = datetime.datetime(2015, 1, 2, 0, 0)
+    select_filter = SelectFilter(expiration_dte=FilterRange(high=20), strike_offset=FilterRange(low=5, high=10))
+    expected = expected_filtered_records(source.load_timeslot(quote_datetime).records, select_filter,
+                                         quote_datetime)
+    assert 0 < len(expected) < len(source.load_timeslot(quote_datetime))
+
+    for store in (source, numpy_store[1], arrow_store[1]):
+        records = store.load_filtered(quote_datetime, select_filter).records
+        assert sorted(records, key=lambda r: (r['expiration'], r['strike'])) == expected
+
+
+def test_load_filtered_with_open_ranges(numpy_store):
+    _, target = numpy_store
+    quote_datetime = datetime.datetime(2015, 1, 2, 0, 0)
+
+    timeslot = target.load_filtered(quote_datetime, SelectFilter(expiration_dte=FilterRange(low=1000)))
+    assert len(timeslot) == 0
+    timeslot = target.load_filtered(quote_datetime, SelectFilter())
+    assert len(timeslot) == len(target.load_timeslot(quote_datetime))
+
+
+def test_option_chain_with_select_filter(numpy_store, daily_file_settings):
+    quote_date = datetime.datetime(2014, 12, 30)
+    select_filter = SelectFilter(expiration_dte=FilterRange(high=10), strike_offset=FilterRange(low=3, high=3))
+    option_chain = OptionChain('AAPL', quote_datetime=quote_date, end_datetime=datetime.datetime(2015, 1, 7),
+                               select_filter=select_filter)
+    option_chain.on_next(quote_date)
+
+    assert option_chain.expirations == [datetime.date(2015, 1, 2), datetime.date(2015, 1, 9)]
+    assert all(110 <= x['strike'] <= 116 for x in option_chain.options)
+
+
+@pytest.mark.parametrize('compression', [None, 'zstd', 'lz4'])
+def test_compact_arrow_store_loads_same_records(tmp_path, daily_file_settings, compression):
+    source = PickleTimeslotStore('AAPL')
+    target = ArrowTimeslotStore('AAPL', options_directory=tmp_path, compression=compression, encoding='compact')
+    copy_timeslots(source, target)
+    store = ArrowTimeslotStore('AAPL', options_directory=tmp_path)
+
+    def rounded(records):
+        return [{k: round(v, 4) if type(v) == float else v for k, v in r.items()} for r in records]
+
+    for quote_datetime in source.get_datetimes(datetime.datetime.min, datetime.datetime.max):
+        records = store.load_timeslot(quote_datetime).records
+        assert rounded(records) == rounded(source.load_timeslot(quote_datetime).records)
+        assert records[0].keys() == source.load_timeslot(quote_datetime).records[0].keys()
+
+    schema = store._open_month('2015_01').schema
+    assert pa.types.is_dictionary(schema.field('option_id').type)
+    assert schema.field('bid').type == pa.int32()
+
+
+def test_compact_arrow_store_is_smaller(tmp_path, daily_file_settings):
+    source = PickleTimeslotStore('AAPL')
+    plain = ArrowTimeslotStore('AAPL', options_directory=tmp_path.joinpath('plain'))
+    compact = ArrowTimeslotStore('AAPL', options_directory=tmp_path.joinpath('compact'), compression='zstd',
+                                 encoding='compact')
+    copy_timeslots(source, plain)
+    copy_timeslots(source, compact)
+
+    assert compact.month_file('2015_01').stat().st_size * 3 < plain.month_file('2015_01').stat().st_size
+
+
+def test_compact_arrow_store_rejects_values_with_more_decimals(tmp_path):
+    records = [{'option_id': 'AAPL20150102C00010000', 'strike': 100.0, 'expiration': datetime.date(2015, 1, 2),
+                'option_type': 'call', 'spot_price': 112.52, 'bid': 12.51234}]
+    timeslot = Timeslot('AAPL', datetime.datetime(2014, 12, 30), _records=records)
+    store = ArrowTimeslotStore('AAPL', options_directory=tmp_path, encoding='compact')
+
+    with pytest.raises(ValueError):
+        store.write_timeslots([timeslot])
+
+
+def test_arrow_store_rejects_unknown_compression(tmp_path):
+    with pytest.raises(ValueError):
+        ArrowTimeslotStore('AAPL', options_directory=tmp_path, compression='gzip2')
@@ -84,3 +84,15 @@ def test_get_put_credit_spread(option_chain_data):
     assert vertical.short_option.strike == short_strike
     assert vertical.position_type == OptionPositionType.SHORT
 
+
+
+def test_get_vertical_gets_next_expiration_when_expiration_is_not_in_chain(option_chain_data):
+    option_chain = option_chain_data('daily', datetime.datetime(2014, 12, 30, 0, 0))
+
+    vertical = Vertical.create(option_chain, datetime.date(2015, 1, 10), option_type='put', long_strike=110.5,
+                               short_strike=100.5)
+
+    assert vertical.long_option.expiration == datetime.date(2015, 1, 17)
+    assert vertical.long_option.strike == 110.0
+    assert vertical.short_option.strike == 100.0
+    assert vertical.position_type == OptionPositionType.LONG